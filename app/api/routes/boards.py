@@ -6,7 +6,7 @@ from datetime import datetime
 from bson import ObjectId
 from bson.errors import InvalidId
 from app.models.board_reply import BoardReply
-from app.services.embedding_service import get_embedding
+from app.services.embedding_service import aget_embedding
 from app.api.routes.auth import get_current_user
 import os
 
@@ -32,7 +32,7 @@ async def create_post(department: str, payload: dict = Body(...), current_user =
     inserted_id = str(result.inserted_id)
 
     try:
-        vector = get_embedding(f"{post_doc['title']} {post_doc['content']}")
+        vector = await aget_embedding(f"{post_doc['title']} {post_doc['content']}")
         await db.board_vectors.insert_one({
             "post_id": inserted_id,
             "vector": vector,
@@ -84,7 +84,7 @@ async def add_reply(post_id: str, payload: dict = Body(...), current_user = Depe
     try:
         post = await db.boards.find_one({"_id": obj_id})
         if post:
-            vector = get_embedding(reply["content"])
+            vector = await aget_embedding(reply["content"])
             reply_doc = BoardReply(
                 post_id=str(post["_id"]),
                 department=post["department"],
@@ -20,3 +20,70 @@ async def debug_model(req: DebugRequest) -> Dict[str, Any]:
         "output": f"[{req.model}] '{req.text}' → 분석 결과 예시",
         "timestamp": datetime.utcnow().isoformat()
     }
+
+@router.get("/inference")
+async def inference_metrics() -> Dict[str, Any]:
+    """추론 실행기 + 모델별 마이크로배칭 큐 지표 (큐 깊이/상한, 거절 수, 평균 배치 크기, 대기/배치 시간)"""
+    from app.services.inference_runtime import get_inference_runtime
+    from app.services.inference_executor import get_inference_executor
+    return {
+        "executor": get_inference_executor().metrics(),
+        "batchers": get_inference_runtime().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/colab")
+async def colab_metrics() -> Dict[str, Any]:
+    """Colab 클라이언트: 연결 풀, 서킷 브레이커 상태, 헤징 검색 결과 출처"""
+    from app.services.colab_client import get_colab_client
+    return {
+        "colab": get_colab_client().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/caches")
+async def cache_metrics() -> Dict[str, Any]:
+    """검색 캐시 적중/미스 지표"""
+    from app.services.image_search.text_embedding_cache import get_text_embedding_cache
+    from app.services.image_search.crop_store import get_crop_store
+    from app.services.image_search.upload_cache import get_upload_cache
+    from app.services.image_search.derivative_cache import get_derivative_cache
+    text_cache = get_text_embedding_cache()
+    return {
+        "text_embedding": text_cache.metrics() if text_cache else None,
+        "separated_crops": get_crop_store().metrics(),
+        "upload_analysis": get_upload_cache().metrics(),
+        "image_derivatives": get_derivative_cache().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/catalog")
+async def catalog_metrics() -> Dict[str, Any]:
+    """카탈로그 변경 로그(WAL) / tombstone / 압축 상태 + 이미지 목록 스냅샷"""
+    import app.services.image_search as image_search
+    from app.services.image_search.catalog_snapshot import get_snapshot_watcher
+    service = image_search._search_service
+    return {
+        "catalog": service.catalog_store.metrics() if service else None,
+        "list_snapshot": get_snapshot_watcher().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/memory")
+async def memory_metrics() -> Dict[str, Any]:
+    """프로세스 RSS + 이미지 검색 구성요소별 메모리 (힙 / mmap 공유 페이지)"""
+    import app.services.image_search as image_search
+    service = image_search._search_service
+    return {
+        "memory": service.memory_report() if service else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/models")
+async def model_metrics() -> Dict[str, Any]:
+    """모델 레지스트리: 모델별 로드 여부, 파라미터 메모리, 로드 시간, 유휴 시간"""
+    from app.services.model_registry import get_model_registry
+    return {
+        "models": get_model_registry().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
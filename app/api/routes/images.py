@@ -1,23 +1,50 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, Response
 from typing import Optional, List
 from pathlib import Path
 import os
 import io
+import time
+import zipfile
 
 from app.services.image_search import generate_image, EnhancedImageSearchService, get_search_service
+from app.services.image_search.product_catalog import product_id_from_filename
+from app.services.image_search.catalog_snapshot import get_catalog_snapshot
+from app.services.image_search.search_filters import normalize_filters
+from app.services.image_search.upload_ingest import (
+    MAX_UPLOAD_BYTES, UploadTooLarge, decode_uploads, ingest_upload, read_upload,
+)
+from app.services.image_search.crop_store import get_crop_store
+from app.services.image_search.derivative_cache import (
+    DEFAULT_SIZE, DERIVATIVE_SIZES, get_derivative_cache, media_type, negotiate_format,
+)
+from app.core.config import COLAB_HEDGE_DELAY_MS, IMAGE_BATCH_MAX_FILES
+from app.core.responses import ORJSONResponse
+from app.services.inference_executor import InferenceQueueFull, run_inference
+from app.services.colab_client import get_colab_client
 from app.services.gemini_service import gemini_service
 from app.utils.translate import translate_fashion_query_ko2en  # 한국어 쿼리 번역 유틸
 
 router = APIRouter()
 
-# Colab AI 검색을 위한 환경변수
-COLAB_BASE_URL = os.getenv("COLAB_BASE_URL")
-
 # 이미지 디렉토리 경로
 IMAGES_DIR = Path(__file__).parent.parent.parent / "img_search" / "only_product_images"
 
+ZIP_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# 배치 검색 zip 상한 (압축 파일 크기, 압축 해제 합계 각각)
+ZIP_MAX_BYTES = MAX_UPLOAD_BYTES * 4
+
+# 상품 이미지 응답 공통 헤더 (브라우저 캐시 + CORS)
+IMAGE_CACHE_HEADERS = {
+    "Cache-Control": "public, max-age=3600",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
 
 # 공통 유틸
 def _clamp_limit(n: int) -> int:
@@ -37,8 +64,40 @@ def _safe_image_path(filename: str) -> Path:
         raise HTTPException(status_code=404, detail="Image not found")
     return file_path
 
+async def _ingest_image(file: UploadFile, purpose: str):
+    """업로드 → 용도별 해상도 RGB 이미지 (크기 초과 / 빈 파일 / 형식 오류는 400)"""
+    try:
+        return await ingest_upload(file, purpose)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _search_filters(
+    category: Optional[str] = None,
+    gender: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    color: Optional[str] = None,
+    fit: Optional[str] = None,
+    pattern: Optional[str] = None,
+) -> dict:
+    """검색 필터 쿼리 파라미터 → 정리된 필터 dict (값은 콤마로 여러 개 지정)"""
+    try:
+        return normalize_filters({
+            "category_l1": category,
+            "gender": gender,
+            "brand": brand,
+            "price_min": price_min,
+            "price_max": price_max,
+            "color": color,
+            "fit": fit,
+            "pattern": pattern,
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 def _format_response(images: list, query_original: str, query_used: str) -> dict:
-    """응답 구조 통일"""
+    """응답 구조 통일 (라우트는 ORJSONResponse 로 감싸 반환: NumPy 값도 그대로 직렬화)"""
     return {
         "queryOriginal": query_original,
         "queryUsed": query_used,
@@ -46,39 +105,47 @@ def _format_response(images: list, query_original: str, query_used: str) -> dict
         "totalCount": len(images),
     }
 
-async def _colab_ai_search(original_q: str, limit: int) -> dict:
-    """Colab AI 검색 함수 (images_v1.py와 동일)"""
-    try:
-        import httpx
-        
-        #  한국어 → 영어 직역
-        base_query = translate_fashion_query_ko2en(original_q)
-        
-        #  Colab LLM 호출
-        query_used = base_query
-        async with httpx.AsyncClient(timeout=20) as client:
-            res = await client.post(
-                f"{COLAB_BASE_URL}/fashion-query",
-                json={"query": original_q, "base_query": base_query},
-            )
-        if res.status_code == 200:
-            colab_data = res.json()
-            query_used = colab_data.get("query_used", base_query).strip()
-        
-        
-        query_used = " ".join(query_used.split()[:10])
-        
-        print(f"[Colab AI] original='{original_q}' | used='{query_used}'")
-        
-        # CLIP 검색
-        result = await generate_image(query_used, limit)
+async def _colab_clip_search(original_q: str, base_query: str, limit: int,
+                             filters: Optional[dict], colab_data: dict) -> dict:
+    """Colab LLM 질의 보정 결과(/fashion-query 응답)로 CLIP 검색"""
+    query_used = str(colab_data.get("query_used") or base_query).strip()
+    query_used = " ".join(query_used.split()[:10])
+    
+    print(f"[Colab AI] original='{original_q}' | used='{query_used}'")
+    
+    # CLIP 검색
+    result = await generate_image(query_used, limit, filters)
+    images = result.get("images", [])[:limit]
+    
+    return _format_response(images, original_q, query_used)
+
+async def _local_clip_search(original_q: str, query_used: str, limit: int,
+                             filters: Optional[dict] = None) -> Optional[dict]:
+    """로컬 CLIP 검색 (직역 질의). 결과가 없으면 None (필터가 있으면 빈 결과)"""
+    result = await generate_image(query_used, limit, filters)
+    if result and result.get("images"):
         images = result.get("images", [])[:limit]
-        
+        print(f"[CLIP] 검색 성공: {len(images)}개")
         return _format_response(images, original_q, query_used)
-        
-    except Exception as e:
-        print(f"Colab AI 검색 오류: {e}")
-        raise
+    if filters:
+        # 필터 조건에 맞는 상품이 없으면 빈 결과
+        return _format_response([], original_q, query_used)
+    return None
+
+async def _hedged_search(original_q: str, base_query: str, limit: int,
+                         filters: Optional[dict] = None) -> Optional[dict]:
+    """
+    Colab AI 검색 + 로컬 CLIP 헤징 (ColabClient.hedge)
+
+    Colab 이 COLAB_HEDGE_DELAY_MS 안에 끝나지 않거나 실패하면 로컬 CLIP 검색을 함께 실행하고
+    먼저 나온 결과를 사용한다 (남은 쪽은 취소). 서킷이 open 이면 로컬만 실행한다.
+    """
+    return await get_colab_client().hedge(
+        "/fashion-query", {"query": original_q, "base_query": base_query},
+        lambda colab_data: _colab_clip_search(original_q, base_query, limit, filters, colab_data),
+        lambda: _local_clip_search(original_q, base_query, limit, filters),
+        COLAB_HEDGE_DELAY_MS / 1000,
+    )
 
 
 # 라우트
@@ -86,18 +153,16 @@ async def _colab_ai_search(original_q: str, limit: int) -> dict:
 async def list_images(
     query: Optional[str] = Query(None, description="검색 쿼리"),
     limit: int = Query(9, description="반환할 이미지 개수 (최대 9)"),
+    offset: int = Query(0, ge=0, description="쿼리 없이 목록 조회 시 시작 위치 (파일명 순)"),
 ):
-    """이미지 목록 반환 (파일명 기반 간단 필터)"""
+    """이미지 목록 반환 (쿼리가 있으면 AI 검색, 없으면 이미지 목록 스냅샷의 페이지)"""
     try:
         limit = _clamp_limit(limit)
         original_q = (query or "").strip()
-        query_used = translate_fashion_query_ko2en(original_q) if original_q else original_q
+        query_used = await run_inference(translate_fashion_query_ko2en, original_q) if original_q else original_q
 
-        # 파일 목록 불러오기
-        image_files = [
-            f for f in os.listdir(IMAGES_DIR)
-            if f.endswith(".jpg") and not f.endswith(".jpg:Zone.Identifier")
-        ]
+        # 파일 목록 / 상품 카탈로그 스냅샷 (디렉터리·CSV 가 바뀐 경우에만 다시 로드)
+        snapshot = await run_in_threadpool(get_catalog_snapshot)
 
         # AI 검색 사용 (실제 유사도 점수 기반)
         if query_used:
@@ -105,107 +170,82 @@ async def list_images(
             result = await generate_image(query_used, limit)
             images = result.get("images", [])
             
-            # 실제 상품 메타데이터 추가
-            product_df = None
-            try:
-                import pandas as pd
-                product_df = pd.read_csv("app/img_search/product.csv")
-            except Exception as e:
-                print(f"상품 메타데이터 로드 실패: {e}")
+            # 실제 상품 메타데이터 추가 (스냅샷 상품 카탈로그, O(1) 조회)
+            catalog = snapshot.products
             
             # 각 이미지에 실제 메타데이터 추가
             for image in images:
                 filename = image.get("filename", "")
-                base_name = filename[:-4] if filename.endswith(".jpg") else filename
-                parts = base_name.split("_")
-                product_id = parts[0] if parts else ""
-                
-                if product_df is not None and product_id:
-                    try:
-                        product_row = product_df[product_df["product_id"].astype(str) == product_id]
-                        if not product_row.empty:
-                            row = product_row.iloc[0]
-                            image["title"] = str(row.get("product_name", image.get("title", filename)))
-                            image["description"] = f"브랜드: {row.get('brand', '')} | 가격: {row.get('price', 0):,}원 | 평점: {row.get('rating_avg', 0):.1f}"
-                            tags = [
-                                str(row.get("brand", "")),
-                                str(row.get("category_l1", "")),
-                                str(row.get("gender", ""))
-                            ]
-                            image["tags"] = [tag for tag in tags if tag and tag != "nan"]
-                    except Exception as e:
-                        print(f"상품 정보 처리 실패 {product_id}: {e}")
-        else:
-            # 쿼리가 없는 경우 기본 목록
-            image_files = image_files[:limit]
-            images = []
-            for idx, filename in enumerate(image_files):
-                images.append({
-                    "id": str(idx + 1),
-                    "filename": filename,
-                    "url": f"/api/images/file/{filename}",
-                    "title": filename,
-                    "description": "",
-                    "tags": [],
-                    "relevance": 1.0,  # 기본 관련도 (쿼리 없음)
-                })
+                product_id = product_id_from_filename(filename)
+                info = catalog.get(product_id) if product_id else {}
+                if info:
+                    image["title"] = info["product_name"] or image.get("title", filename)
+                    image["description"] = f"브랜드: {info['brand']} | 가격: {info['price']:,}원 | 평점: {info['rating_avg']:.1f}"
+                    tags = [info["brand"], info["category_l1"], info["gender"]]
+                    image["tags"] = [tag for tag in tags if tag]
+            return ORJSONResponse(_format_response(images, original_q, query_used))
+
+        # 쿼리가 없는 경우 기본 목록 (스냅샷 페이지)
+        images = []
+        for idx, filename in enumerate(snapshot.page(offset, limit)):
+            images.append({
+                "id": str(offset + idx + 1),
+                "filename": filename,
+                "url": f"/api/images/file/{filename}",
+                "title": filename,
+                "description": "",
+                "tags": [],
+                "relevance": 1.0,  # 기본 관련도 (쿼리 없음)
+            })
 
-        return _format_response(images, original_q, query_used)
+        response = _format_response(images, original_q, query_used)
+        response.update({
+            "offset": offset,
+            "total": len(snapshot),
+            "hasMore": offset + len(images) < len(snapshot),
+        })
+        return ORJSONResponse(response)
 
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/file/{filename}")
-async def get_image(filename: str):
-    """특정 이미지 파일 반환 (품질 향상)"""
+async def get_image(
+    filename: str,
+    size: str = Query(DEFAULT_SIZE, description="파생본 크기: display(기본) | thumb | grid | detail"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """특정 이미지 파일 반환 (크기/포맷별 파생본, 디스크 캐시 + ETag/304, Accept 에 webp 가 있으면 webp)"""
+    if size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=400, detail=f"size 는 {', '.join(DERIVATIVE_SIZES)} 중 하나여야 합니다")
     file_path = _safe_image_path(filename)
+    fmt = negotiate_format(accept)
+    cache = get_derivative_cache()
+    headers = {**IMAGE_CACHE_HEADERS, "Vary": "Accept"}
+    
+    # ETag 는 원본 stat 으로 계산되므로 304 는 렌더링 없이 응답
+    if cache.not_modified(str(file_path), if_none_match, size, fmt):
+        return Response(status_code=304, headers={"ETag": cache.etag(str(file_path), size, fmt), **headers})
     
-    # 이미지 품질 향상을 위한 처리
     try:
-        from PIL import Image
-        import io
-        
-        # 원본 이미지 로드
-        with Image.open(file_path) as img:
-            # RGB 모드로 변환
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 이미지 크기가 작으면 업스케일링
-            if img.width < 600 or img.height < 600:
-                # 비율 유지하면서 최소 600px로 업스케일링
-                ratio = max(600 / img.width, 600 / img.height)
-                new_size = (int(img.width * ratio), int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # 고품질 JPEG로 변환
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='JPEG', quality=95, optimize=True)
-            img_byte_arr.seek(0)
-            
-            return Response(
-                content=img_byte_arr.getvalue(),
-                media_type="image/jpeg",
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            )
+        # 사전 생성/이전 요청으로 만들어진 파생본이 없을 때만 렌더링 (이벤트 루프 밖에서)
+        derivative_path, etag, _ = await run_in_threadpool(cache.get_or_render, str(file_path), size, fmt)
+        return FileResponse(
+            path=derivative_path,
+            media_type=media_type(fmt),
+            headers={"ETag": etag, **headers},
+        )
     except Exception as e:
         print(f"이미지 처리 실패, 원본 반환: {e}")
         # 처리 실패 시 원본 반환
         return FileResponse(
             path=str(file_path),
             media_type="image/jpeg",
-            headers={
-                "Cache-Control": "public, max-age=3600",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET",
-                "Access-Control-Allow-Headers": "*",
-            },
+            headers=IMAGE_CACHE_HEADERS,
         )
 
 
@@ -228,188 +268,265 @@ async def download_image(filename: str):
 
 
 @router.get("/search")
-async def search_images(q: str, limit: int = 9):
-    """강화된 폴백 시스템: 1순위 Colab AI → 2순위 CLIP 검색"""
+async def search_images(
+    q: str,
+    limit: int = 9,
+    category: Optional[str] = Query(None, description="category_l1 필터 (콤마 구분)"),
+    gender: Optional[str] = Query(None, description="성별 필터"),
+    brand: Optional[str] = Query(None, description="브랜드 필터 (콤마 구분)"),
+    price_min: Optional[int] = Query(None, description="최소 가격"),
+    price_max: Optional[int] = Query(None, description="최대 가격"),
+    color: Optional[str] = Query(None, description="캡션 색상 필터 (콤마 구분)"),
+    fit: Optional[str] = Query(None, description="캡션 핏 필터 (콤마 구분)"),
+    pattern: Optional[str] = Query(None, description="캡션 패턴 필터 (콤마 구분)"),
+):
+    """강화된 폴백 시스템: 1순위 Colab AI (서킷 브레이커) → 지연/실패 시 로컬 CLIP 검색 헤징"""
     try:
         limit = _clamp_limit(limit)
+        filters = _search_filters(category, gender, brand, price_min, price_max, color, fit, pattern)
         original_q = (q or "").strip()
         if not original_q:
             raise HTTPException(status_code=400, detail="검색어가 필요합니다.")
 
         print(f"[검색 시작] 쿼리: {original_q}, 제한: {limit}")
 
-        # 1순위: Colab AI 검색
-        if COLAB_BASE_URL:
-            try:
-                print(f"[1순위] Colab AI 검색 시도: {original_q}")
-                result = await _colab_ai_search(original_q, limit)
-                if result and result.get("images"):
-                    print(f"[1순위] Colab AI 검색 성공: {len(result['images'])}개")
-                    return result
-            except Exception as e:
-                print(f"[1순위] Colab AI 검색 실패: {e}")
-
-        # 2순위: CLIP 검색
-        print(f"[2순위] CLIP 검색 시도: {original_q}")
-        query_used = translate_fashion_query_ko2en(original_q)
-        result = await generate_image(query_used, limit)
-        
-        if result and result.get("images"):
-            images = result.get("images", [])[:limit]
-            print(f"[2순위] CLIP 검색 성공: {len(images)}개")
-            return _format_response(images, original_q, query_used)
-        else:
+        # Colab AI(연결 풀 + 서킷 브레이커) 우선, 지연/실패 시 로컬 CLIP 검색 헤징
+        base_query = await run_inference(translate_fashion_query_ko2en, original_q)
+        result = await _hedged_search(original_q, base_query, limit, filters)
+        if result is None:
             raise HTTPException(status_code=500, detail="CLIP 검색 결과가 없습니다.")
+        return ORJSONResponse(result)
 
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"검색 실패: {str(e)}")
 
 
 @router.post("/search-by-image")
-async def search_images_by_file(file: UploadFile = File(...), limit: int = 9):
-    """이미지 파일로 검색 API"""
+async def search_images_by_file(
+    file: UploadFile = File(...),
+    limit: int = 9,
+    category: Optional[str] = None,
+    gender: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    color: Optional[str] = None,
+    fit: Optional[str] = None,
+    pattern: Optional[str] = None,
+):
+    """이미지 파일로 검색 API (선택: 메타데이터 필터)"""
     try:
         limit = _clamp_limit(limit)
+        filters = _search_filters(category, gender, brand, price_min, price_max, color, fit, pattern)
 
         # 이미지 파일 검증
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="이미지 파일만 업로드할 수 있습니다.")
 
-        # 파일 크기 제한 (10MB)
-        if file.size and file.size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="파일 크기는 10MB를 초과할 수 없습니다.")
-
         print(f"[ImageSearch] Uploaded file: {file.filename} | Size: {file.size} bytes")
 
-        # 이미지 파일을 PIL Image로 변환
-        from PIL import Image
-        
-        # 파일 포인터를 처음으로 이동
-        await file.seek(0)
-        image_data = await file.read()
-        
-        # 이미지 데이터 검증
-        if not image_data:
-            raise HTTPException(status_code=400, detail="이미지 파일이 비어있습니다.")
-        
-        image = Image.open(io.BytesIO(image_data))
-        
-        # 이미지 형식 검증
-        if image.format not in ['JPEG', 'PNG', 'WEBP']:
-            raise HTTPException(status_code=400, detail="지원하지 않는 이미지 형식입니다. JPEG, PNG, WEBP만 지원됩니다.")
-        
-        # 실제 이미지 검색 수행 (고화질 이미지 우선 선택)
-        service = get_search_service()
-        search_results = service.search_by_image(image, limit)
-        
-        # 고화질 이미지 우선 선택하도록 결과 필터링
-        formatted_images = []
-        for result in search_results:
-            # 이미지 크기 확인 및 고화질 우선 선택
-            img_file = result.get("url", "").replace("/api/images/file/", "")
-            img_path = f"app/img_search/only_product_images/{img_file}"
-            
-            try:
-                from PIL import Image
-                with Image.open(img_path) as img:
-                    width, height = img.size
-                    # 고화질 기준: 500x600 이상
-                    if width >= 500 and height >= 600:
-                        formatted_images.append(result)
-                    elif len(formatted_images) < limit:  # 고화질이 부족하면 중화질도 포함
-                        formatted_images.append(result)
-            except:
-                # 이미지 열기 실패 시 그대로 추가
-                formatted_images.append(result)
-            
-            if len(formatted_images) >= limit:
-                break
+        # 크기 제한(10MB) 스트리밍 읽기 + 검색 해상도로 축소 디코딩 + EXIF 회전
+        image = await _ingest_image(file, "search")
+
+        # 실제 이미지 검색 수행 (고화질 이미지 우선 선택: 카탈로그에 기록된 크기로 랭킹 단계에서 처리)
+        service = await run_inference(get_search_service)
+        formatted_images = await service.search_by_image_async(image, limit, filters, prefer_high_res=True)
         
-        return {
+        return ORJSONResponse({
             "query": f"이미지: {file.filename}",
             "totalCount": len(formatted_images),
             "searchTime": 0.0,
             "images": formatted_images
-        }
+        })
 
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"이미지 검색 실패: {e}")
         raise HTTPException(status_code=500, detail=f"이미지 검색 실패: {str(e)}")
 
 
 
+def _read_zip_images(data: bytes, limit: int) -> list:
+    """zip 안의 이미지 파일 → [(파일명, 바이트)] (폴더/숨김 파일 제외, 개수/파일 크기/해제 합계 제한)"""
+    entries = []
+    total = 0
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name or name.startswith(".") \
+                        or not name.lower().endswith(ZIP_IMAGE_EXTENSIONS):
+                    continue
+                if len(entries) >= limit:
+                    raise HTTPException(status_code=400, detail=f"이미지는 최대 {limit}개까지 검색할 수 있습니다.")
+                if info.file_size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=400, detail=f"{name}: 파일 크기는 10MB를 초과할 수 없습니다.")
+                total += info.file_size
+                if total > ZIP_MAX_BYTES:
+                    raise HTTPException(status_code=400,
+                                        detail=f"zip 압축 해제 크기는 {ZIP_MAX_BYTES // (1024 * 1024)}MB를 초과할 수 없습니다.")
+                entries.append((name, archive.read(info)))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="올바른 zip 파일이 아닙니다.")
+    return entries
+
+
+@router.post("/search-by-image-batch")
+async def search_images_by_files(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    limit: int = 9,
+    category: Optional[str] = None,
+    gender: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    color: Optional[str] = None,
+    fit: Optional[str] = None,
+    pattern: Optional[str] = None,
+):
+    """
+    여러 이미지로 한 번에 검색 API (files 여러 개 또는 archive zip)
+
+    디코딩은 병렬, CLIP 임베딩은 배치 forward, FAISS 는 다중 질의 검색 한 번으로 처리한다.
+    실패한 이미지는 해당 항목의 error 로 표시하고 나머지는 그대로 검색한다.
+    """
+    try:
+        start_time = time.time()
+        limit = _clamp_limit(limit)
+        filters = _search_filters(category, gender, brand, price_min, price_max, color, fit, pattern)
+
+        # 개수 초과는 읽기 전에 거절 (파일당 최대 10MB 를 모두 메모리에 올리지 않도록)
+        if len(files or []) > IMAGE_BATCH_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"이미지는 최대 {IMAGE_BATCH_MAX_FILES}개까지 검색할 수 있습니다.")
+
+        uploads = []
+        for file in files or []:
+            try:
+                data = await read_upload(file)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+            except ValueError:
+                data = b""  # 빈 파일은 해당 항목의 error 로 표시
+            uploads.append((file.filename, data))
+        if archive is not None:
+            try:
+                data = await read_upload(archive, ZIP_MAX_BYTES)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{archive.filename}: {e}")
+            uploads.extend(await run_inference(_read_zip_images, data, IMAGE_BATCH_MAX_FILES - len(uploads)))
+
+        if not uploads:
+            raise HTTPException(status_code=400, detail="검색할 이미지가 없습니다.")
+        if len(uploads) > IMAGE_BATCH_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"이미지는 최대 {IMAGE_BATCH_MAX_FILES}개까지 검색할 수 있습니다.")
+
+        print(f"[ImageSearch] 배치 검색: {len(uploads)}개 이미지")
+
+        decoded = await run_inference(decode_uploads, [data for _, data in uploads])
+        valid = [i for i, image in enumerate(decoded) if not isinstance(image, str)]
+
+        service = await run_inference(get_search_service)
+        batch_results = await run_inference(
+            service.search_by_image_batch, [decoded[i] for i in valid], limit, filters
+        ) if valid else []
+        images_by_upload = dict(zip(valid, batch_results))
+
+        results = []
+        for i, (filename, _) in enumerate(uploads):
+            images = images_by_upload.get(i, [])
+            results.append({
+                "index": i,
+                "filename": filename,
+                "totalCount": len(images),
+                "images": images,
+                "error": decoded[i] if isinstance(decoded[i], str) else None,
+            })
+
+        return ORJSONResponse({
+            "totalCount": len(results),
+            "succeeded": len(valid),
+            "searchTime": round(time.time() - start_time, 3),
+            "results": results,
+        })
+
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"배치 이미지 검색 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"배치 이미지 검색 실패: {str(e)}")
+
+
 @router.post("/search-by-image-advanced")
 async def search_images_by_file_advanced(
     file: UploadFile = File(...), 
     limit: int = 9,
-    clothing_type: str = "all"
+    clothing_type: str = "all",
+    category: Optional[str] = None,
+    gender: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    color: Optional[str] = None,
+    fit: Optional[str] = None,
+    pattern: Optional[str] = None,
 ):
-    """실제 고급 이미지 검색 API (인체 분할 + 의류 영역 추출 + 카테고리 분류)"""
+    """실제 고급 이미지 검색 API (인체 분할 + 의류 영역 추출 + 카테고리 분류, 선택: 메타데이터 필터)"""
     try:
         limit = _clamp_limit(limit)
+        filters = _search_filters(category, gender, brand, price_min, price_max, color, fit, pattern)
         
         # 이미지 파일 검증
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="이미지 파일만 업로드할 수 있습니다.")
         
-        # 파일 크기 제한 (10MB)
-        if file.size and file.size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="파일 크기는 10MB를 초과할 수 없습니다.")
-        
         print(f"[AdvancedImageSearch] Uploaded file: {file.filename} | Size: {file.size} bytes")
         
-        # 이미지 파일을 PIL Image로 변환
-        from PIL import Image
-        
-        # 파일 포인터를 처음으로 이동
-        await file.seek(0)
-        image_data = await file.read()
-        
-        # 이미지 데이터 검증
-        if not image_data:
-            raise HTTPException(status_code=400, detail="이미지 파일이 비어있습니다.")
-        
-        image = Image.open(io.BytesIO(image_data))
-        
-        # 이미지 형식 검증
-        if image.format not in ['JPEG', 'PNG', 'WEBP']:
-            raise HTTPException(status_code=400, detail="지원하지 않는 이미지 형식입니다. JPEG, PNG, WEBP만 지원됩니다.")
+        # 크기 제한(10MB) 스트리밍 읽기 + U2NET 추론 해상도로 축소 디코딩 + EXIF 회전
+        image = await _ingest_image(file, "advanced")
         
         # 실제 고급 이미지 검색 수행 (상의/하의 구분)
-        service = get_search_service()
-        search_response = service.search_by_image_advanced(image, limit, clothing_type)
+        service = await run_inference(get_search_service)
+        search_response = await run_inference(service.search_by_image_advanced, image, limit, clothing_type, filters)
         
         # 새로운 응답 구조로 변환
         search_results = search_response.get("results", [])
         separated_images = search_response.get("separated_images", [])
         search_type = search_response.get("search_type", clothing_type)
         
-        # 텍스트 검색과 동일한 응답 구조로 변환
+        # 텍스트 검색과 동일한 응답 구조로 변환 (값 타입 변환은 ORJSONResponse 직렬화 단계에서 처리)
         formatted_images = []
         for result in search_results:
             formatted_images.append({
-                "id": str(result.get("id", "")),
-                "filename": str(result.get("title", "")),  # title을 filename으로 사용
-                "url": str(result.get("url", "")),
-                "title": str(result.get("title", "")),
+                "id": result.get("id", ""),
+                "filename": result.get("title", ""),  # title을 filename으로 사용
+                "url": result.get("url", ""),
+                "title": result.get("title", ""),
                 "description": f"고급 AI 이미지 검색 결과",
                 "tags": ["고급검색", "인체분할", "카테고리분류"],
-                "relevance": float(result.get("similarity", 0.0)),
+                "relevance": result.get("similarity", 0.0),
                 # 텍스트 검색과 동일한 구조
-                "similarity": float(result.get("similarity", 0.0)),
-                "product_name": str(result.get("product_name", "")),
-                "price": int(result.get("price", 0)),
-                "rating_avg": float(result.get("rating_avg", 0.0)),
-                "brand": str(result.get("brand", "")),
+                "similarity": result.get("similarity", 0.0),
+                "product_name": result.get("product_name", ""),
+                "price": result.get("price", 0),
+                "rating_avg": result.get("rating_avg", 0.0),
+                "brand": result.get("brand", ""),
                 # 고급 기능 추가 정보
-                "clothing_category": str(result.get("clothing_category", "")),
-                "category_confidence": float(result.get("category_confidence", 0.0)),
-                "detailed_analysis": service._convert_analysis_to_json_safe(result.get("detailed_analysis", {}))
+                "clothing_category": result.get("clothing_category", ""),
+                "category_confidence": result.get("category_confidence", 0.0),
+                "detailed_analysis": result.get("detailed_analysis", {})
             })
         
-        return {
+        return ORJSONResponse({
             "query": f"고급 이미지 검색: {file.filename}",
             "totalCount": len(formatted_images),
             "searchTime": 0.0,
@@ -418,10 +535,12 @@ async def search_images_by_file_advanced(
             "separated_images": separated_images,
             "search_type": search_type,
             "advanced_search": True
-        }
+        })
         
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"고급 이미지 검색 실패: {e}")
         raise HTTPException(status_code=500, detail=f"고급 이미지 검색 실패: {str(e)}")
@@ -440,26 +559,10 @@ async def add_image_to_catalog(
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="이미지 파일만 업로드할 수 있습니다.")
         
-        # 파일 크기 제한 (10MB)
-        if file.size and file.size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="파일 크기는 10MB를 초과할 수 없습니다.")
-        
         print(f"[CatalogAdd] Adding image: {file.filename}")
         
-        # 이미지 파일을 PIL Image로 변환
-        from PIL import Image
-        
-        await file.seek(0)
-        image_data = await file.read()
-        
-        if not image_data:
-            raise HTTPException(status_code=400, detail="이미지 파일이 비어있습니다.")
-        
-        image = Image.open(io.BytesIO(image_data))
-        
-        # 이미지 형식 검증
-        if image.format not in ['JPEG', 'PNG', 'WEBP']:
-            raise HTTPException(status_code=400, detail="지원하지 않는 이미지 형식입니다. JPEG, PNG, WEBP만 지원됩니다.")
+        # 크기 제한(10MB) 스트리밍 읽기 + 카탈로그 저장 해상도로 축소 디코딩 + EXIF 회전
+        image = await _ingest_image(file, "catalog")
         
         # 메타데이터 준비
         metadata = {
@@ -471,8 +574,8 @@ async def add_image_to_catalog(
         }
         
         # 실제 카탈로그에 추가
-        service = get_search_service()
-        result = service.add_image_to_catalog(image, metadata)
+        service = await run_inference(get_search_service)
+        result = await run_inference(service.add_image_to_catalog, image, metadata)
         
         if result["success"]:
             return result
@@ -481,10 +584,56 @@ async def add_image_to_catalog(
         
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"카탈로그 추가 실패: {e}")
         raise HTTPException(status_code=500, detail=f"카탈로그 추가 실패: {str(e)}")
 
+@router.put("/catalog/update/{image_id}")
+async def update_image_in_catalog(
+    image_id: str,
+    file: UploadFile = File(...),
+    brand: Optional[str] = None,
+    title: Optional[str] = None,
+    price: Optional[float] = None,
+    url: Optional[str] = None
+):
+    """카탈로그 이미지 교체 (같은 image_id 유지)"""
+    try:
+        if not file.content_type or not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="이미지 파일만 업로드할 수 있습니다.")
+        
+        print(f"[CatalogUpdate] Updating image: {image_id} <- {file.filename}")
+        
+        image = await _ingest_image(file, "catalog")
+        
+        metadata = {
+            "brand": brand,
+            "title": title,
+            "price": price,
+            "url": url,
+            "filename": file.filename
+        }
+        
+        service = await run_inference(get_search_service)
+        result = await run_inference(service.update_image_in_catalog, image_id, image, metadata)
+        
+        if result["success"]:
+            return result
+        elif result.get("error") == "not_found":
+            raise HTTPException(status_code=404, detail=result["message"])
+        else:
+            raise HTTPException(status_code=500, detail=result["message"])
+        
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"카탈로그 수정 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"카탈로그 수정 실패: {str(e)}")
+
 @router.delete("/catalog/delete/{image_id}")
 async def delete_image_from_catalog(image_id: str):
     """실제 카탈로그에서 이미지 제거"""
@@ -492,16 +641,20 @@ async def delete_image_from_catalog(image_id: str):
         print(f"[CatalogDelete] Removing image: {image_id}")
         
         # 실제 카탈로그에서 제거
-        service = get_search_service()
-        result = service.remove_image_from_catalog(image_id)
+        service = await run_inference(get_search_service)
+        result = await run_inference(service.remove_image_from_catalog, image_id)
         
         if result["success"]:
             return result
+        elif result.get("error") == "not_found":
+            raise HTTPException(status_code=404, detail=result["message"])
         else:
             raise HTTPException(status_code=500, detail=result["message"])
         
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"카탈로그 제거 실패: {e}")
         raise HTTPException(status_code=500, detail=f"카탈로그 제거 실패: {str(e)}")
@@ -541,10 +694,14 @@ async def compose_fashion_images(
 
         print(f"[Fashion Compose] 모델: {model_image.filename}, 의류 개수: {len(clothing_images)}")
 
+        # 크기 제한(10MB) 스트리밍 읽기 + 합성 입력 해상도로 축소 디코딩 + EXIF 회전
+        model_pil = await _ingest_image(model_image, "compose")
+        clothing_pils = [await _ingest_image(f, "compose") for f in clothing_images]
+
         # Gemini 서비스로 이미지 합성 요청
         gemini_result = await gemini_service.compose_fashion_images(
-            model_image=model_image,
-            clothing_images=clothing_images,
+            model_image=model_pil,
+            clothing_images=clothing_pils,
             custom_prompt=custom_prompt
         )
 
@@ -606,28 +763,28 @@ async def get_generated_image(filename: str):
 
 @router.get("/separated/{filename}")
 async def get_separated_image(filename: str):
-    """분리된 이미지 파일 반환"""
+    """분리된 이미지 반환 (분리 이미지 저장소 메모리 → 디스크 순)"""
     try:
-        # 분리된 이미지 디렉토리
-        separated_dir = Path(__file__).parent.parent.parent / "img_search" / "separated_images"
-
         if ".." in filename or "/" in filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
 
-        file_path = separated_dir / filename
-        if not file_path.exists() or not file_path.is_file():
+        data = get_crop_store().get(filename)
+        if data is None:
             raise HTTPException(status_code=404, detail="Separated image not found")
 
-        return FileResponse(
-            path=str(file_path),
+        return Response(
+            content=data,
             media_type="image/jpeg",
             headers={
+                # 파일명이 내용 해시라 같은 이름은 항상 같은 이미지
                 "Cache-Control": "public, max-age=3600",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "GET",
                 "Access-Control-Allow-Headers": "*",
             },
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"분리된 이미지 로드 실패: {str(e)}")
 
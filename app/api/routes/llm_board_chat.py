@@ -4,15 +4,25 @@ from app.db.mongodb import db
 from datetime import datetime
 import httpx, os
 import torch
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
+from app.services.inference_runtime import get_batcher
+from app.services.model_registry import get_model
+from app.services.inference_executor import InferenceQueueFull, run_inference
 
 router = APIRouter(prefix="/llm", tags=["LLMBoardChat"])
 
 COLAB_BASE_URL = os.getenv("COLAB_BASE_URL")
 COLAB_BOARD_API = f"{COLAB_BASE_URL}/board-chat"
 
-# 🔹 임베딩 모델 로딩 (ko-sroberta-multitask)
-embedder = SentenceTransformer("jhgan/ko-sroberta-multitask")
+# 🔹 임베딩 모델 (ko-sroberta-multitask, 모델 레지스트리에서 embedding_service 와 공유)
+def encode_texts(texts: list, **kwargs):
+    return get_model("ko-sroberta").encode(list(texts), **kwargs)
+
+# 🔹 질문 임베딩 마이크로배칭 (동시 요청을 한 번의 encode 로 처리)
+query_batcher = get_batcher(
+    "board-chat-embedder",
+    lambda questions: list(encode_texts(questions, convert_to_tensor=True)),
+)
 
 async def save_board_chat_log(question: str, answer: str, department: str = None):
     try:
@@ -52,9 +62,12 @@ async def board_chat(payload: dict = Body(...)):
         docs.append((str(p["_id"]), base, p.get("department")))
 
     # 3️⃣ 임베딩 기반 유사도 검색
-    query_vec = embedder.encode(question, convert_to_tensor=True)
-    doc_texts = [d[1] for d in docs]
-    doc_vecs = embedder.encode(doc_texts, convert_to_tensor=True)
+    try:
+        query_vec = await query_batcher.submit(question)
+        doc_texts = [d[1] for d in docs]
+        doc_vecs = await run_inference(encode_texts, doc_texts, convert_to_tensor=True)
+    except InferenceQueueFull as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=503)
 
     cos_scores = util.cos_sim(query_vec, doc_vecs)[0]
     scored_docs = [(docs[i][0], docs[i][1], docs[i][2], float(cos_scores[i])) for i in range(len(docs))]
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from bson import ObjectId  # ✅ ObjectId 변환용
 
 from app.langgraph.workflows import workflow
 from app.db.mongodb import run_aggregation, insert_result
@@ -12,6 +11,7 @@ from app.services.qa_model import answer_question
 from app.services.report_service import generate_report
 from app.services.analysis_helpers import summarize_results
 from app.api.routes.auth import get_current_user
+from app.core.responses import ORJSONResponse
 
 router = APIRouter()
 
@@ -20,20 +20,6 @@ class QueryIn(BaseModel):
     userId: Optional[str] = None  # 호환성을 위해 옵셔널로 유지
 
 
-# ✅ Mongo 결과 정규화 함수 (ObjectId → str 변환)
-def normalize_mongo_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    normalized = []
-    for d in docs:
-        clean = {}
-        for k, v in d.items():
-            if isinstance(v, ObjectId):
-                clean[k] = str(v)
-            else:
-                clean[k] = v
-        normalized.append(clean)
-    return normalized
-
-
 @router.post("/")
 async def run_query(body: QueryIn, current_user: dict = Depends(get_current_user)):
     state = workflow.invoke({"query": body.query})
@@ -44,8 +30,8 @@ async def run_query(body: QueryIn, current_user: dict = Depends(get_current_user
     if "mongo_results" in state:
         collection = state["mongo_results"]["collection"]
         pipeline = state["mongo_results"]["pipeline"]
+        # ObjectId / datetime / Decimal128 은 응답 직렬화(ORJSONResponse)에서 처리 (중첩 필드 포함)
         mongo_results = await run_aggregation(collection, pipeline)
-        mongo_results = normalize_mongo_docs(mongo_results)  # ✅ ObjectId 처리
 
     # RAG
     rag_docs = await rag_search(body.query, top_k=5)
@@ -119,7 +105,7 @@ async def run_query(body: QueryIn, current_user: dict = Depends(get_current_user
     }
     await insert_result(result_doc)
 
-    return {
+    return ORJSONResponse({
         "status": "success",
         "query": body.query,
         "mongodb_results": result_doc["output"]["mongodb_results"],
@@ -127,4 +113,4 @@ async def run_query(body: QueryIn, current_user: dict = Depends(get_current_user
         "ai_analysis": result_doc["output"]["ai_analysis"],
         "visualizations": viz,
         "report": report
-    }
+    })
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List, Dict, Any
 from app.db.mongodb import results_collection
 from bson import ObjectId
+from app.core.responses import ORJSONResponse
 
 router = APIRouter()
 
@@ -9,11 +10,8 @@ router = APIRouter()
 async def list_results(userId: str, limit: int = 20):
     cursor = results_collection.find({"userId": userId}).sort("createdAt", -1).limit(limit)
     data: List[Dict[str, Any]] = [doc async for doc in cursor]
-    # ObjectId 등 직렬화는 프런트에서 필요 시 처리 or 여기서 str 변환
-    for d in data:
-        if "_id" in d:
-            d["_id"] = str(d["_id"])
-    return {"status":"ok", "count": len(data), "items": data}
+    # ObjectId / datetime 등은 ORJSONResponse 직렬화에서 처리 (중첩 필드 포함)
+    return ORJSONResponse({"status":"ok", "count": len(data), "items": data})
 
 @router.get("/{result_id}")
 async def get_result_by_id(result_id: str, userId: str = Query(...)):
@@ -34,10 +32,7 @@ async def get_result_by_id(result_id: str, userId: str = Query(...)):
         if not result:
             raise HTTPException(status_code=404, detail="Result not found or access denied")
         
-        # ObjectId를 문자열로 변환
-        result["_id"] = str(result["_id"])
-        
-        return {"status": "ok", "data": result}
+        return ORJSONResponse({"status": "ok", "data": result})
     
     except HTTPException:
         raise
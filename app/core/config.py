@@ -17,4 +17,105 @@ VECTOR_DB_DIR = os.getenv("VECTOR_DB_DIR", "./chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-small")
 
 # Colab
-COLAB_BASE_URL = os.getenv("COLAB_BASE_URL", "")
\ No newline at end of file
+COLAB_BASE_URL = os.getenv("COLAB_BASE_URL", "")
+# Colab 호출 (GET /api/images/search 의 LLM 질의 보정, 지표: GET /debug/colab)
+#  - 연결 풀 재사용, 연속 실패 COLAB_BREAKER_FAILURES 회면 COLAB_BREAKER_RESET_SECONDS 동안 호출 중단 후 시험 호출
+#  - COLAB_HEDGE_DELAY_MS 안에 Colab 결과가 없으면 로컬 CLIP 검색을 동시에 시작해 먼저 끝난 결과 사용
+COLAB_TIMEOUT_SECONDS = float(os.getenv("COLAB_TIMEOUT_SECONDS", "20"))
+COLAB_CONNECT_TIMEOUT_SECONDS = float(os.getenv("COLAB_CONNECT_TIMEOUT_SECONDS", "3"))
+COLAB_MAX_CONNECTIONS = int(os.getenv("COLAB_MAX_CONNECTIONS", "20"))
+COLAB_BREAKER_FAILURES = int(os.getenv("COLAB_BREAKER_FAILURES", "3"))
+COLAB_BREAKER_RESET_SECONDS = float(os.getenv("COLAB_BREAKER_RESET_SECONDS", "30"))
+COLAB_HEDGE_DELAY_MS = float(os.getenv("COLAB_HEDGE_DELAY_MS", "1500"))
+
+# Image search (FAISS 인덱스)
+#  - IMAGE_INDEX_TYPE: flat | ivf_flat | ivf_pq | hnsw | sq_fp16 | sq_int8 | pq
+IMAGE_INDEX_TYPE = os.getenv("IMAGE_INDEX_TYPE", "flat")
+IMAGE_INDEX_NLIST = int(os.getenv("IMAGE_INDEX_NLIST", "256"))
+IMAGE_INDEX_NPROBE = int(os.getenv("IMAGE_INDEX_NPROBE", "16"))
+IMAGE_INDEX_PQ_M = int(os.getenv("IMAGE_INDEX_PQ_M", "64"))
+IMAGE_INDEX_PQ_NBITS = int(os.getenv("IMAGE_INDEX_PQ_NBITS", "8"))
+IMAGE_INDEX_HNSW_M = int(os.getenv("IMAGE_INDEX_HNSW_M", "32"))
+IMAGE_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("IMAGE_INDEX_HNSW_EF_CONSTRUCTION", "200"))
+IMAGE_INDEX_HNSW_EF_SEARCH = int(os.getenv("IMAGE_INDEX_HNSW_EF_SEARCH", "64"))
+# 압축 저장: IMAGE_INDEX_TYPE=sq_fp16 | sq_int8 | pq, 아티팩트 임베딩 dtype(float32 | float16)
+IMAGE_EMBEDDING_DTYPE = os.getenv("IMAGE_EMBEDDING_DTYPE", "float32")
+# processed/faiss_index.bin 을 읽기 전용 mmap 으로 로드 (워커 간 페이지 캐시 공유)
+IMAGE_INDEX_MMAP = os.getenv("IMAGE_INDEX_MMAP", "true").lower() == "true"
+
+# Image catalog 바이너리 아티팩트 (python -m app.services.image_search.catalog_artifact build)
+IMAGE_CATALOG_DIR = os.getenv("IMAGE_CATALOG_DIR", "app/img_search/catalog")
+IMAGE_CATALOG_VERIFY = os.getenv("IMAGE_CATALOG_VERIFY", "false").lower() == "true"
+# 카탈로그 변경 로그(WAL) 위치와 자동 압축 주기 (레코드 수, 0 이면 자동 압축 안 함)
+IMAGE_CATALOG_WAL_DIR = os.getenv("IMAGE_CATALOG_WAL_DIR", os.path.join(IMAGE_CATALOG_DIR, "wal"))
+IMAGE_CATALOG_COMPACT_EVERY = int(os.getenv("IMAGE_CATALOG_COMPACT_EVERY", "500"))
+# CSV 경로에서 손실 압축 인덱스(sq/pq)를 쓸 때 원본 DataFrame 대신 보관하는 float32 스냅샷 임베딩
+IMAGE_SOURCE_EMBEDDINGS_PATH = os.getenv("IMAGE_SOURCE_EMBEDDINGS_PATH", "app/img_search/cache/source_embeddings.npy")
+
+# 상품 단위 검색 (<product_id>_<n>.jpg 이미지를 상품별로 묶어 top-k 고유 상품 반환)
+#  - IMAGE_PRODUCT_POOLING: max (상품 내 최고 유사도) | mean (상품 평균 벡터)
+IMAGE_PRODUCT_POOLING = os.getenv("IMAGE_PRODUCT_POOLING", "max")
+# 필터 통과 이미지가 이 수 이하면 ANN 대신 해당 행만 정확 계산 (선택도 높은 필터의 지연/재현율 유지)
+IMAGE_FILTER_EXACT_MAX = int(os.getenv("IMAGE_FILTER_EXACT_MAX", "4096"))
+
+# 배치 이미지 검색 (POST /api/images/search-by-image-batch)
+#  - IMAGE_BATCH_MAX_FILES: 요청당 최대 이미지 수 (zip 포함)
+#  - IMAGE_BATCH_EMBED_SIZE: CLIP get_image_features 한 번에 넣는 이미지 수
+#  - IMAGE_DECODE_WORKERS: 업로드 이미지 병렬 디코딩 스레드 수
+IMAGE_BATCH_MAX_FILES = int(os.getenv("IMAGE_BATCH_MAX_FILES", "64"))
+IMAGE_BATCH_EMBED_SIZE = int(os.getenv("IMAGE_BATCH_EMBED_SIZE", "32"))
+IMAGE_DECODE_WORKERS = int(os.getenv("IMAGE_DECODE_WORKERS", "4"))
+
+# 업로드 이미지 수신/디코딩 (검색 / 고급 검색 / 카탈로그 추가·수정 / 패션 합성 공통)
+#  - *_DECODE_SIDE: 용도별 디코딩 목표 (짧은 변 기준, JPEG 은 draft 로 DCT 단계에서 축소). 0 이면 원본
+#    고급 검색은 U2NET_MAX_SIDE 를 사용
+#  - UPLOAD_MAX_PIXELS: 디코딩 화소 수 상한 (압축 폭탄 차단)
+UPLOAD_SEARCH_DECODE_SIDE = int(os.getenv("UPLOAD_SEARCH_DECODE_SIDE", "448"))
+UPLOAD_CATALOG_DECODE_SIDE = int(os.getenv("UPLOAD_CATALOG_DECODE_SIDE", "1600"))
+UPLOAD_COMPOSE_DECODE_SIDE = int(os.getenv("UPLOAD_COMPOSE_DECODE_SIDE", "1024"))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", "40000000"))
+
+# 분리된 의류 이미지 저장소 (GET /api/images/separated/{filename})
+#  - 메모리 상한 / TTL, CROP_STORE_PERSIST=true 면 디렉터리에 비동기 저장
+#  - CROP_PERSIST_MAX_AGE_SECONDS 보다 오래된 디렉터리 파일은 자동 정리
+CROP_STORE_MAX_MB = float(os.getenv("CROP_STORE_MAX_MB", "64"))
+CROP_STORE_TTL_SECONDS = float(os.getenv("CROP_STORE_TTL_SECONDS", "1800"))
+CROP_STORE_PERSIST = os.getenv("CROP_STORE_PERSIST", "false").lower() == "true"
+CROP_PERSIST_MAX_AGE_SECONDS = float(os.getenv("CROP_PERSIST_MAX_AGE_SECONDS", "86400"))
+CROP_JPEG_QUALITY = int(os.getenv("CROP_JPEG_QUALITY", "85"))
+
+# 업로드 이미지 분석 캐시 (고급 이미지 검색: 영역 마스크 / 영역 임베딩 / 결과)
+#  - 디코딩 픽셀 SHA1 키, UPLOAD_CACHE_PHASH_DISTANCE 이하 dHash 근접 중복도 재사용 (0 이면 끔)
+UPLOAD_CACHE_MAX_MB = float(os.getenv("UPLOAD_CACHE_MAX_MB", "32"))
+UPLOAD_CACHE_PHASH_DISTANCE = int(os.getenv("UPLOAD_CACHE_PHASH_DISTANCE", "4"))
+
+# 추론 마이크로배칭 (CLIP / U2NET / sentence-transformers / FAISS)
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+# 배처별 대기 항목 상한 (넘으면 InferenceQueueFull → 503)
+INFERENCE_BATCH_MAX_PENDING = int(os.getenv("INFERENCE_BATCH_MAX_PENDING", "256"))
+U2NET_MAX_BATCH_SIZE = int(os.getenv("U2NET_MAX_BATCH_SIZE", "4"))
+# U2NET 입력 긴 변 상한 (비율 유지 축소 후 추론, 클래스 맵만 원본 크기로 복원). 0 이면 원본 해상도
+U2NET_MAX_SIDE = int(os.getenv("U2NET_MAX_SIDE", "768"))
+
+# CLIP 텍스트 질의 임베딩 캐시 (LRU + SQLite)
+TEXT_EMBED_CACHE_PATH = os.getenv("TEXT_EMBED_CACHE_PATH", "app/img_search/cache/text_embeddings.sqlite3")
+TEXT_EMBED_CACHE_SIZE = int(os.getenv("TEXT_EMBED_CACHE_SIZE", "4096"))
+
+# 상품 이미지 파생본 캐시 (GET /api/images/file/{filename}?size=, ETag/304, Accept 로 webp)
+#  - IMAGE_DERIVATIVE_WORKERS: 사전 생성 CLI 프로세스 수 (0 이면 CPU 수)
+IMAGE_DERIVATIVE_DIR = os.getenv("IMAGE_DERIVATIVE_DIR", "app/img_search/cache/derivatives")
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", "0"))
+
+# 추론 실행기 (이벤트 루프 밖에서 torch/FAISS 실행)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", str(max(1, (os.cpu_count() or 2) // INFERENCE_WORKERS))))
+
+# 모델 레지스트리 (app/services/model_registry.py)
+#  - MODEL_PRELOAD: 서버 시작 시 로드할 모델 (나머지는 첫 사용 시): clip, ko-sroberta, qa-generator, m2m100, u2net
+#  - MODEL_MEMORY_LIMIT_MB: 파라미터 메모리 합계 상한 (0 이면 무제한), 초과 시 유휴 모델부터 언로드
+#  - MODEL_IDLE_SECONDS: 이 시간 이상 쓰이지 않아야 언로드 대상
+MODEL_PRELOAD = [m.strip() for m in os.getenv("MODEL_PRELOAD", "qa-generator,ko-sroberta").split(",") if m.strip()]
+MODEL_MEMORY_LIMIT_MB = float(os.getenv("MODEL_MEMORY_LIMIT_MB", "0"))
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "300"))
@@ -0,0 +1,48 @@
+"""
+orjson 기반 공통 JSON 응답
+
+NumPy 배열/스칼라, ObjectId, Decimal128 은 default 훅, datetime 은 orjson 기본 지원으로 직렬화 단계에서 처리한다.
+  - ORJSONResponse(...) 를 직접 반환하는 라우트만 이 훅의 혜택을 받는다. 응답 dict 를 다시 돌며
+    str()/float()/int() 로 바꾸는 변환이 필요 없고 FastAPI jsonable_encoder 순회도 생략된다
+    (Mongo 문서 / NumPy 값을 담는 검색·조회 라우트는 반드시 직접 반환)
+  - app 기본 응답 클래스로도 등록되어 있지만, dict 를 반환하는 라우트는 FastAPI 가 먼저 jsonable_encoder 를
+    거치므로 ObjectId / np.int64 등이 섞여 있으면 그 단계에서 실패한다 (기본 타입만 담긴 dict 는 문제 없음)
+"""
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def orjson_default(obj: Any) -> Any:
+    """orjson 이 기본 지원하지 않는 타입 변환 (중첩 위치에 있어도 적용됨)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        # OPT_SERIALIZE_NUMPY 가 지원하지 않는 dtype (object, 비연속 배열 등)
+        return obj.tolist()
+    if isinstance(obj, Decimal128):
+        obj = obj.to_decimal()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"JSON 으로 직렬화할 수 없는 타입: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson 직렬화 응답 (app 기본 응답 클래스)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -2,7 +2,6 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from datetime import datetime
 from pymongo import ReturnDocument
 from app.core.config import MONGO_URI, DB_NAME
-from bson import ObjectId
 from typing import Optional
 
 
@@ -51,20 +50,6 @@ async def get_db(db_name: Optional[str] = None) -> AsyncIOMotorDatabase:
         _mongo_client = AsyncIOMotorClient(MONGO_URI)
     return _mongo_client[db_name or DB_NAME]
 
-def to_plain_dict(doc):
-    """
-    FastAPI 응답 직렬화용: ObjectId → str 로 바꿔주는 간단 헬퍼
-    """
-    if not doc:
-        return doc
-    out = {}
-    for k, v in doc.items():
-        if isinstance(v, ObjectId):
-            out[k] = str(v)
-        else:
-            out[k] = v
-    return out
-
 async def get_collection(name: str):
     """
     MongoDB 컬렉션 핸들을 반환
@@ -2,7 +2,8 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import auth, ingest, query, result, debug, analytics, report_generator, visualization, integrated_system, images , llm_analysis, collections, boards, llm_board_chat
-from app.services.ai_model_service import ai_model_service
+from app.services.model_registry import get_model_registry
+from app.core.responses import ORJSONResponse
 
 # Load environment variables
 load_dotenv()
@@ -10,7 +11,9 @@ load_dotenv()
 app = FastAPI(
     title="Musinsa AI Backend",
     description="Musinsa AI 서비스용 백엔드 API",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson 직렬화 (NumPy / ObjectId / Decimal128 / datetime 직접 처리)
+    default_response_class=ORJSONResponse
 )
 
 # CORS 설정 (개발 환경용)
@@ -54,4 +57,11 @@ async def root():
 
 @app.on_event("startup")
 async def startup_event():
-    ai_model_service.load_models()
+    # MODEL_PRELOAD 모델만 미리 로드 (나머지는 첫 사용 시)
+    get_model_registry().preload()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Colab 연결 풀 정리
+    from app.services.colab_client import get_colab_client
+    await get_colab_client().aclose()
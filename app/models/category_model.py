@@ -1,4 +1,5 @@
 # 실제 작동하는 의류 카테고리 분류 모델 (CLIP 기반)
+import numpy as np
 import torch
 from PIL import Image
 from transformers import CLIPProcessor, CLIPModel
@@ -7,67 +8,78 @@ import torch.nn.functional as F
 class ClothingCategoryModel:
     """실제 작동하는 의류 카테고리 분류 모델"""
     
-    def __init__(self):
-        """CLIP 모델 초기화"""
+    def __init__(self, model: CLIPModel = None, processor: CLIPProcessor = None):
+        """
+        CLIP 모델 초기화
+
+        model/processor 를 넘기지 않으면 모델 레지스트리의 공유 CLIP 을 사용한다
+        (검색 서비스와 같은 체크포인트를 두 번 로드하지 않음).
+        """
+        # 의류 카테고리 정의 (더 구체적이고 한국어 의류에 특화)
+        self.categories = [
+            "T-shirt", "Shirt", "Blouse", "Sweater", "Hoodie", "Jacket", "Coat", "Top", "Blouse",  # 상의
+            "Jeans", "Pants", "Shorts", "Skirt", "Trousers", "Leggings", "Tights", "Bottom", "Trouser",  # 하의
+            "Dress", "Jumpsuit", "One-piece",  # 원피스류
+            "Shoes", "Sneakers", "Boots", "Sandals",  # 신발
+            "Bag", "Backpack", "Handbag",  # 가방
+            "Hat", "Cap", "Beanie"  # 모자
+        ]
+        self.text_embeds = None
+        
         try:
-            # OpenAI CLIP 모델 로드
+            # OpenAI CLIP 모델 (레지스트리 공유 인스턴스)
             self.model_name = "openai/clip-vit-base-patch32"
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            
-            self.processor = CLIPProcessor.from_pretrained(self.model_name)
-            self.model = CLIPModel.from_pretrained(self.model_name).to(self.device).eval()
+            if model is None or processor is None:
+                from app.services.model_registry import get_model
+                model, processor = get_model("clip")
+            self.processor = processor
+            self.model = model.eval()
+            self.device = next(model.parameters()).device
             
-            # 의류 카테고리 정의 (더 구체적이고 한국어 의류에 특화)
-            self.categories = [
-                "T-shirt", "Shirt", "Blouse", "Sweater", "Hoodie", "Jacket", "Coat", "Top", "Blouse",  # 상의
-                "Jeans", "Pants", "Shorts", "Skirt", "Trousers", "Leggings", "Tights", "Bottom", "Trouser",  # 하의
-                "Dress", "Jumpsuit", "One-piece",  # 원피스류
-                "Shoes", "Sneakers", "Boots", "Sandals",  # 신발
-                "Bag", "Backpack", "Handbag",  # 가방
-                "Hat", "Cap", "Beanie"  # 모자
-            ]
+            # 라벨 텍스트 임베딩은 고정이므로 로드 시 한 번만 계산 (L2 정규화)
+            text_inputs = self.processor(text=self.categories, return_tensors="pt", padding=True).to(self.device)
+            with torch.no_grad():
+                text_embeds = self.model.get_text_features(**text_inputs)
+            self.text_embeds = F.normalize(text_embeds, p=2, dim=-1).cpu().numpy().astype(np.float32)
             
-            print(f"CLIP 카테고리 분류 모델 로드 완료: {self.model_name}")
+            print(f"CLIP 카테고리 분류 모델 로드 완료: {self.model_name} (라벨 {len(self.categories)}개)")
             
         except Exception as e:
             print(f"CLIP 모델 로드 실패: {e}")
             self.model = None
             self.processor = None
     
+    def classify_embeddings(self, image_embeds: np.ndarray, topk: int = 2) -> list:
+        """
+        L2 정규화된 CLIP 이미지 임베딩 (N, D) → 행별 top-k 카테고리 목록
+
+        검색용 임베딩(get_image_features + 정규화)과 같은 벡터이므로 vision forward 를 공유할 수 있다.
+        """
+        k = min(topk, len(self.categories))
+        if self.text_embeds is None:
+            return [[{"label": "Unknown", "score": 0.0}] * k for _ in range(len(image_embeds))]
+        
+        similarity = np.asarray(image_embeds, dtype=np.float32).reshape(-1, self.text_embeds.shape[1]) @ self.text_embeds.T
+        results = []
+        for row in similarity:
+            top = np.argsort(-row, kind="stable")[:k]
+            results.append([{"label": self.categories[i], "score": float(row[i])} for i in top])
+        return results
+    
     def predict_clothing_category(self, img: Image.Image, topk: int = 2) -> list:
         """실제 의류 카테고리 분류 수행"""
-        if self.model is None or self.processor is None:
+        if self.model is None or self.processor is None or self.text_embeds is None:
             # 모델 로드 실패 시 더미 결과 반환
             return [{"label": "Unknown", "score": 0.0}] * min(topk, len(self.categories))
         
         try:
-            # CLIP으로 카테고리 분류
-            inputs = self.processor(
-                text=self.categories, 
-                images=img, 
-                return_tensors="pt", 
-                padding=True
-            ).to(self.device)
+            # CLIP 이미지 임베딩 → 미리 계산한 라벨 임베딩과 유사도
+            inputs = self.processor(images=img, return_tensors="pt").to(self.device)
             
             with torch.no_grad():
-                outputs = self.model(**inputs)
-                
-                # 유사도 계산 (PyTorch 호환성 수정)
-                image_embeds = outputs.image_embeds / outputs.image_embeds.norm(p=2, dim=-1, keepdim=True)
-                text_embeds = outputs.text_embeds / outputs.text_embeds.norm(p=2, dim=-1, keepdim=True)
-                similarity = torch.matmul(image_embeds, text_embeds.T)
-                
-                # top-k 추출
-                topk_scores, topk_indices = torch.topk(similarity[0], k=min(topk, len(self.categories)))
-                
-                results = []
-                for j, i in enumerate(topk_indices):
-                    results.append({
-                        "label": self.categories[i.item()], 
-                        "score": float(topk_scores[j].item())
-                    })
-                
-                return results
+                image_embeds = F.normalize(self.model.get_image_features(**inputs), p=2, dim=-1)
+            
+            return self.classify_embeddings(image_embeds.cpu().numpy(), topk)[0]
                 
         except Exception as e:
             print(f"카테고리 분류 실패: {e}")
@@ -109,6 +121,18 @@ def get_category_model():
         _category_model = ClothingCategoryModel()
     return _category_model
 
+def init_category_model(model: CLIPModel, processor: CLIPProcessor) -> ClothingCategoryModel:
+    """이미 로드된 CLIP 을 공유하는 카테고리 모델로 초기화 (체크포인트 중복 로드 방지)"""
+    global _category_model
+    if _category_model is None or _category_model.model is not model:
+        _category_model = ClothingCategoryModel(model, processor)
+    return _category_model
+
+def classify_clothing_embeddings(image_embeds: np.ndarray, topk: int = 2) -> list:
+    """편의 함수: 정규화된 CLIP 이미지 임베딩으로 카테고리 분류 (행별 결과 목록)"""
+    model = get_category_model()
+    return model.classify_embeddings(image_embeds, topk)
+
 def predict_clothing_category(img: Image.Image, topk: int = 2) -> list:
     """편의 함수: 의류 카테고리 분류"""
     model = get_category_model()
@@ -3,12 +3,17 @@
 U2NET 기반 의류 전용 분할 모델
 """
 import torch
-import torch.nn.functional as F
 import torchvision.transforms as transforms
 from PIL import Image
 import numpy as np
 import os
 import sys
+from typing import List
+
+from app.core.config import U2NET_MAX_BATCH_SIZE, U2NET_MAX_SIDE
+from app.models.segmentation_postprocess import ClothingRegions
+from app.services.inference_runtime import get_batcher
+from app.services.model_registry import get_model
 
 # cloth-segmentation 모듈 경로 추가
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../cloth-segmentation'))
@@ -22,37 +27,60 @@ except ImportError as e:
     print(f"cloth_segmentation 모듈 import 실패: {e}")
     CLOTH_SEGMENTATION_AVAILABLE = False
 
+# U2NET 은 5번 다운샘플(1/32)하므로 입력을 32 배수로 패딩
+U2NET_STRIDE = 32
+U2NET_CHECKPOINT = os.path.join(
+    os.path.dirname(__file__), '../../cloth-segmentation/trained_checkpoint/cloth_segm_u2net_latest.pth'
+)
+
+
+def load_u2net():
+    """U2NET 체크포인트 로드 (모델 레지스트리 'u2net' 로더)"""
+    if not CLOTH_SEGMENTATION_AVAILABLE:
+        raise RuntimeError("cloth_segmentation 모듈을 사용할 수 없습니다")
+    if not os.path.exists(U2NET_CHECKPOINT):
+        raise FileNotFoundError(f"모델 파일이 없습니다: {U2NET_CHECKPOINT}")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = U2NET(in_ch=3, out_ch=4)
+    model = load_checkpoint_mgpu(model, U2NET_CHECKPOINT)
+    return model.to(device).eval()
+
+
+def resize_for_inference(image: Image.Image, max_side: int) -> Image.Image:
+    """긴 변이 max_side 를 넘으면 비율 유지 축소 (max_side <= 0 이면 그대로)"""
+    w, h = image.size
+    if max_side <= 0 or max(w, h) <= max_side:
+        return image
+    scale = max_side / max(w, h)
+    return image.resize((max(1, round(w * scale)), max(1, round(h * scale))), resample=Image.BILINEAR)
+
 
 class ClothSegmentationModel:
     """의류 세그멘테이션 모델 클래스"""
     
-    def __init__(self):
+    def __init__(self, max_side: int = U2NET_MAX_SIDE):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = None
+        self.max_side = max_side
         self.transform = None
+        self.batcher = None
         self.initialized = False
         
         if CLOTH_SEGMENTATION_AVAILABLE:
             self._initialize_model()
     
+    @property
+    def model(self):
+        """U2NET 공유 인스턴스 (모델 레지스트리, 언로드됐으면 다시 로드)"""
+        return get_model("u2net")
+    
     def _initialize_model(self):
         """모델 초기화"""
         try:
-            # 모델 경로 설정
-            checkpoint_path = os.path.join(
-                os.path.dirname(__file__), 
-                '../../cloth-segmentation/trained_checkpoint/cloth_segm_u2net_latest.pth'
-            )
-            
-            if not os.path.exists(checkpoint_path):
-                print(f"모델 파일이 없습니다: {checkpoint_path}")
+            # U2NET 모델 로드 (모델 레지스트리)
+            if not os.path.exists(U2NET_CHECKPOINT):
+                print(f"모델 파일이 없습니다: {U2NET_CHECKPOINT}")
                 return
-            
-            # U2NET 모델 로드
-            self.model = U2NET(in_ch=3, out_ch=4)
-            self.model = load_checkpoint_mgpu(self.model, checkpoint_path)
-            self.model = self.model.to(self.device)
-            self.model = self.model.eval()
+            get_model("u2net")
             
             # 전처리 변환 설정
             self.transform = transforms.Compose([
@@ -60,193 +88,134 @@ class ClothSegmentationModel:
                 Normalize_image(0.5, 0.5)
             ])
             
+            # 동시 요청 마이크로배칭 (고해상도 패딩 메모리를 고려해 작은 배치)
+            self.batcher = get_batcher("u2net", self._segment_batch, max_batch_size=U2NET_MAX_BATCH_SIZE)
+            
             self.initialized = True
-            print(f"ClothSegmentationModel 초기화 완료 (device: {self.device})")
+            print(f"ClothSegmentationModel 초기화 완료 (device: {self.device}, "
+                  f"추론 해상도: {self.max_side if self.max_side > 0 else '원본'})")
             
         except Exception as e:
             print(f"ClothSegmentationModel 초기화 실패: {e}")
             self.initialized = False
     
-    def segment_clothes(self, image: Image.Image) -> np.ndarray:
-        """
-        의류 세그멘테이션 수행
-        
-        Args:
-            image: PIL Image 객체
-            
-        Returns:
-            np.ndarray: 세그멘테이션 마스크 (0=배경, 1=상의, 2=하의, 3=전신)
-        """
+    def segment_labels(self, image: Image.Image) -> np.ndarray:
+        """추론 해상도 클래스 맵 (원본 크기로 복원하지 않음, 후처리는 ClothingRegions 로)"""
         if not self.initialized:
             raise RuntimeError("ClothSegmentationModel이 초기화되지 않았습니다")
         
         try:
-            # 원본 크기 저장
-            orig_size = image.size  # (W, H)
-            
-            # 이미지 전처리
-            image_tensor = self.transform(image)
-            image_tensor = torch.unsqueeze(image_tensor, 0)
+            return self.batcher.submit_sync(image)
+        except Exception as e:
+            print(f"의류 세그멘테이션 실패: {e}")
+            raise
+    
+    def _segment_batch(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """배처 flush 용: 설정된 추론 해상도로 배치 추론 (클래스 맵은 추론 해상도 그대로)"""
+        return self.segment_batch(images, self.max_side, upsample=False)
+    
+    def segment_batch(self, images: List[Image.Image], max_side: int, upsample: bool = True) -> List[np.ndarray]:
+        """
+        U2NET 배치 추론
+        긴 변을 max_side 이하로 축소한 뒤, 각 이미지를 자기 크기의 32 배수로 0(정규화 후 중간값)
+        패딩하고 패딩 크기가 같은 이미지끼리만 묶어 추론한다. 다른 크기 이미지와 섞여
+        패딩이 늘어나지 않으므로, 한 이미지의 결과는 같은 배치의 다른 요청과 무관하다.
+        upsample=True 면 클래스 맵을 원본 크기로 복원한다.
+        """
+        tensors = [self.transform(resize_for_inference(img, max_side)) for img in images]
+        
+        # 패딩 크기 (h, w) 별 그룹
+        groups = {}
+        for i, t in enumerate(tensors):
+            padded = (-(-t.shape[1] // U2NET_STRIDE) * U2NET_STRIDE, -(-t.shape[2] // U2NET_STRIDE) * U2NET_STRIDE)
+            groups.setdefault(padded, []).append(i)
+        
+        labels = [None] * len(tensors)
+        for (pad_h, pad_w), indices in groups.items():
+            batch = torch.zeros((len(indices), tensors[indices[0]].shape[0], pad_h, pad_w))
+            for j, i in enumerate(indices):
+                batch[j, :, :tensors[i].shape[1], :tensors[i].shape[2]] = tensors[i]
             
             # 추론 수행
             with torch.no_grad():
-                output_tensor = self.model(image_tensor.to(self.device))
-                output_tensor = F.log_softmax(output_tensor[0], dim=1)
-                output_tensor = torch.max(output_tensor, dim=1, keepdim=True)[1]
-                output_tensor = torch.squeeze(output_tensor, dim=0)
-                output_tensor = torch.squeeze(output_tensor, dim=0)
-                output_arr = output_tensor.cpu().numpy()
+                output_tensor = self.model(batch.to(self.device))
+                group_labels = torch.argmax(output_tensor[0], dim=1).cpu().numpy().astype(np.uint8)
             
+            for j, i in enumerate(indices):
+                labels[i] = np.ascontiguousarray(group_labels[j, :tensors[i].shape[1], :tensors[i].shape[2]])
+        
+        if upsample:
             # 원본 크기로 복원
-            mask_img = Image.fromarray(output_arr.astype("uint8"), mode="L")
-            mask_img = mask_img.resize(orig_size, resample=Image.NEAREST)
-            final_mask = np.array(mask_img)
-            
-            print(f"의류 세그멘테이션 완료: {orig_size} -> {final_mask.shape}")
-            return final_mask
-            
-        except Exception as e:
-            print(f"의류 세그멘테이션 실패: {e}")
-            raise
+            labels = [np.array(Image.fromarray(arr, mode="L").resize(img.size, resample=Image.NEAREST))
+                      for img, arr in zip(images, labels)]
+        return labels
     
-    def _opencv_color_analysis(self, image: Image.Image) -> dict:
+    def _opencv_color_analysis(self, image: Image.Image) -> ClothingRegions:
         """
-        OpenCV 색상 분석을 사용한 간단한 의류 분할
+        간단한 상하 분할 폴백 (상단 60% 상의 / 하단 40% 하의)
         
         Args:
             image: PIL Image 객체
             
         Returns:
-            dict: {'top': top_mask, 'bottom': bottom_mask, 'full_body': full_body_mask}
+            ClothingRegions: 'top', 'bottom', 'full_body' 영역 (행 단위 마스크)
         """
-        try:
-            import cv2
-            
-            # PIL을 OpenCV 형식으로 변환
-            img_array = np.array(image)
-            if len(img_array.shape) == 3:
-                img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            else:
-                img_cv = img_array
-            
-            h, w = img_cv.shape[:2]
-            
-            # 간단한 상하 분할 (중앙선 기준)
-            center_y = h // 2
-            
-            # 상의 영역 (상단 60%)
-            top_mask = np.zeros((h, w), dtype=np.uint8)
-            top_mask[:int(h * 0.6), :] = 1
-            
-            # 하의 영역 (하단 40%)
-            bottom_mask = np.zeros((h, w), dtype=np.uint8)
-            bottom_mask[int(h * 0.6):, :] = 1
-            
-            # 전체 의류 영역
-            full_body_mask = np.ones((h, w), dtype=np.uint8)
-            
-            print(f"OpenCV 색상 분석 완료: 상의 {top_mask.sum()}, 하의 {bottom_mask.sum()}")
-            
-            return {
-                'top': top_mask,
-                'bottom': bottom_mask,
-                'full_body': full_body_mask
-            }
-            
-        except Exception as e:
-            print(f"OpenCV 색상 분석 실패: {e}")
-            raise
+        w, h = image.size
+        
+        # 행 단위 (h, 1) 마스크: 열 방향은 이미지 전체로 펼쳐진다
+        rows = np.arange(h)[:, None]
+        top_mask = rows < int(h * 0.6)
+        regions = ClothingRegions({
+            'top': top_mask,
+            'bottom': ~top_mask,
+            'full_body': np.ones((h, 1), dtype=bool),
+        }, (w, h))
+        regions.fallback = True
+        
+        print(f"상하 분할 폴백 완료: 상의 {regions.pixel_count('top')}, 하의 {regions.pixel_count('bottom')}")
+        return regions
 
-    def get_clothing_regions(self, image: Image.Image) -> dict:
+    def get_clothing_regions(self, image: Image.Image) -> ClothingRegions:
         """
         의류 영역별 마스크 반환 (폴백 시스템 포함)
         
+        마스크/픽셀 수/바운딩 박스는 추론 해상도에서 계산하고, 원본 해상도로는
+        crop_region() 이 크롭 구간만 펼친다.
+        
         Args:
             image: PIL Image 객체
             
         Returns:
-            dict: {'top': top_mask, 'bottom': bottom_mask, 'full_body': full_body_mask}
+            ClothingRegions: 'top', 'bottom', 'full_body' 영역 (regions[key] 는 원본 크기 마스크)
         """
         try:
-            # 의류 세그멘테이션 수행
-            mask = self.segment_clothes(image)
+            # 의류 세그멘테이션 수행 (추론 해상도 클래스 맵)
+            labels = self.segment_labels(image)
             
-            # 각 클래스별 마스크 생성
-            top_mask = (mask == 1).astype(np.uint8)  # 상의
-            bottom_mask = (mask == 2).astype(np.uint8)  # 하의
-            full_body_mask = ((mask == 1) | (mask == 2) | (mask == 3)).astype(np.uint8)  # 전체 의류
+            # 디버깅: 각 클래스별 픽셀 수 출력 (추론 해상도)
+            counts = np.bincount(labels.ravel(), minlength=4)
+            print(f"클래스 분포 ({labels.shape[1]}x{labels.shape[0]}): " +
+                  ", ".join(f"{cls}={count}" for cls, count in enumerate(counts) if count))
             
-            # 디버깅: 각 클래스별 픽셀 수 출력
-            print(f"원본 마스크 클래스 분포:")
-            unique_classes, counts = np.unique(mask, return_counts=True)
-            for cls, count in zip(unique_classes, counts):
-                print(f"  클래스 {cls}: {count} 픽셀")
-            
-            print(f"의류 영역 분할 완료 - 상의: {top_mask.sum()}, 하의: {bottom_mask.sum()}, 전체: {full_body_mask.sum()}")
-            
-            # 하의 영역이 너무 작거나 잘못된 영역을 잡았을 때 보정
-            if bottom_mask.sum() < 20000:  # 20,000 픽셀 미만 (임계값 상향)
-                print(f"⚠️ 하의 영역이 너무 작습니다 ({bottom_mask.sum()} 픽셀) - 흰색 의류 특화 처리")
-                
-                # 흰색 의류 특화 처리: 전체 의류 영역에서 상의를 제외한 나머지를 하의로 재분류
-                bottom_corrected = full_body_mask.copy()
-                bottom_corrected[top_mask > 0] = 0  # 상의 영역 제거
-                
-                # 상의 영역이 너무 크면 하단 일부를 하의로 이동
-                if top_mask.sum() > 100000:  # 상의가 매우 크면
-                    h, w = top_mask.shape
-                    # 상의 하단 30%를 하의로 이동 (흰색 의류는 더 넓게)
-                    top_bottom_region = int(h * 0.7)
-                    
-                    # 상의 하단을 하의로 재분류
-                    bottom_corrected[top_bottom_region:, :] = top_mask[top_bottom_region:, :]
-                    
-                    # 상의 마스크에서 하단 제거
-                    top_corrected = top_mask.copy()
-                    top_corrected[top_bottom_region:, :] = 0
-                    
-                    print(f"흰색 의류 하의 영역 재분할: {bottom_mask.sum()} → {bottom_corrected.sum()} 픽셀")
-                    
-                    return {
-                        'top': top_corrected,
-                        'bottom': bottom_corrected,
-                        'full_body': full_body_mask
-                    }
-                else:
-                    print(f"흰색 의류 하의 영역 재구성: {bottom_mask.sum()} → {bottom_corrected.sum()} 픽셀")
-                    
-                    return {
-                        'top': top_mask,
-                        'bottom': bottom_corrected,
-                        'full_body': full_body_mask
-                    }
-            
-            return {
-                'top': top_mask,
-                'bottom': bottom_mask,
-                'full_body': full_body_mask
-            }
+            # 각 영역 마스크 + 흰색 의류 하의 보정
+            regions = ClothingRegions.from_labels(labels, image.size)
+            print(f"의류 영역 분할 완료 - 상의: {regions.pixel_count('top')}, "
+                  f"하의: {regions.pixel_count('bottom')}, 전체: {regions.pixel_count('full_body')}")
+            return regions
             
         except Exception as e:
             print(f"cloth-segmentation 모델 실패: {e}")
-            print("OpenCV 색상 분석으로 폴백합니다...")
+            print("상하 분할로 폴백합니다...")
             
-            # 2순위: OpenCV 색상 분석
+            # 2순위: 상하 분할
             try:
                 return self._opencv_color_analysis(image)
             except Exception as e2:
-                print(f"OpenCV 색상 분석도 실패: {e2}")
+                print(f"상하 분할도 실패: {e2}")
                 print("기본 검색으로 폴백합니다...")
                 
                 # 3순위: 기본 검색 (전체 이미지)
-                h, w = np.array(image).shape[:2]
-                full_mask = np.ones((h, w), dtype=np.uint8)
-                
-                return {
-                    'top': full_mask,
-                    'bottom': full_mask,
-                    'full_body': full_mask
-                }
+                return ClothingRegions.full(image.size)
 
 
 # 전역 모델 인스턴스
@@ -259,7 +228,7 @@ def get_cloth_segmentation_model() -> ClothSegmentationModel:
         _cloth_segmentation_model = ClothSegmentationModel()
     return _cloth_segmentation_model
 
-def get_clothing_regions_cloth_segmentation(image: Image.Image) -> dict:
+def get_clothing_regions_cloth_segmentation(image: Image.Image) -> ClothingRegions:
     """
     의류 세그멘테이션 모델을 사용한 의류 영역 분할
     기존 get_clothing_regions() 함수와 동일한 인터페이스
@@ -0,0 +1,121 @@
+"""
+U2NET 추론 해상도 벤치마크: 원본 해상도 대비 지연시간 / 마스크 IoU 비교
+
+사용 예:
+    python -m app.models.segmentation_benchmark --images app/img_search/only_product_images --limit 50
+    python -m app.models.segmentation_benchmark --images fixtures/ --sizes 512,768,1024 --json seg.json
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Any
+
+from .cloth_segmentation_model import ClothSegmentationModel
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+CLASS_NAMES = {1: "top", 2: "bottom", 3: "full_body"}
+
+
+def load_fixtures(image_dir: str, limit: int) -> List[Image.Image]:
+    """벤치마크용 이미지 로드 (파일명 순, RGB)"""
+    names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    return [Image.open(os.path.join(image_dir, n)).convert("RGB") for n in names]
+
+
+def mask_iou(reference: np.ndarray, mask: np.ndarray) -> Dict[str, float]:
+    """
+    클래스별 IoU + 의류 전체(배경 아님) IoU
+
+    두 마스크 모두에 없는 클래스는 제외한다 (빈 집합 IoU 정의 안 함).
+    """
+    ious = {}
+    for cls, name in CLASS_NAMES.items():
+        a, b = reference == cls, mask == cls
+        union = np.logical_or(a, b).sum()
+        if union:
+            ious[name] = float(np.logical_and(a, b).sum() / union)
+    a, b = reference > 0, mask > 0
+    union = np.logical_or(a, b).sum()
+    ious["clothing"] = float(np.logical_and(a, b).sum() / union) if union else 1.0
+    return ious
+
+
+def measure(model: ClothSegmentationModel, images: List[Image.Image], max_side: int) -> Dict[str, Any]:
+    """서비스와 같은 배치 1 추론으로 지연시간 측정"""
+    model.segment_batch(images[:1], max_side)  # 워밍업
+    latencies, masks = [], []
+    for image in images:
+        t0 = time.perf_counter()
+        masks.append(model.segment_batch([image], max_side)[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "masks": masks,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_benchmark(model: ClothSegmentationModel, images: List[Image.Image],
+                  sizes: List[int]) -> List[Dict[str, Any]]:
+    """추론 해상도별 지연시간 + 원본 해상도 마스크 대비 IoU"""
+    baseline = measure(model, images, 0)
+    rows = [{
+        "max_side": "original", "p50_ms": baseline["p50_ms"], "p99_ms": baseline["p99_ms"],
+        "speedup": 1.0, "miou": 1.0, "clothing_iou": 1.0, "min_clothing_iou": 1.0,
+    }]
+
+    for max_side in sizes:
+        measured = measure(model, images, max_side)
+        ious = [mask_iou(ref, m) for ref, m in zip(baseline["masks"], measured["masks"])]
+        class_ious = [v for iou in ious for k, v in iou.items() if k != "clothing"]
+        clothing = [iou["clothing"] for iou in ious]
+        rows.append({
+            "max_side": max_side,
+            "p50_ms": measured["p50_ms"],
+            "p99_ms": measured["p99_ms"],
+            "speedup": baseline["p50_ms"] / measured["p50_ms"] if measured["p50_ms"] else 0.0,
+            "miou": float(np.mean(class_ious)) if class_ious else 1.0,
+            "clothing_iou": float(np.mean(clothing)),
+            "min_clothing_iou": float(np.min(clothing)),
+        })
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], images: List[Image.Image]):
+    sizes = [max(img.size) for img in images]
+    print(f"\n이미지 {len(images)}개 (긴 변 중앙값 {int(np.median(sizes))}px), 원본 해상도 마스크 기준")
+    print(f"{'max_side':<10} {'p50(ms)':>9} {'p99(ms)':>9} {'speedup':>8} {'mIoU':>7} {'cloth':>7} {'min':>7}")
+    for r in rows:
+        print(f"{str(r['max_side']):<10} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['speedup']:>7.2f}x "
+              f"{r['miou']:>7.4f} {r['clothing_iou']:>7.4f} {r['min_clothing_iou']:>7.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="U2NET 추론 해상도별 지연시간/마스크 IoU 벤치마크")
+    parser.add_argument("--images", default="app/img_search/only_product_images", help="fixture 이미지 디렉터리")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--sizes", default="512,768,1024", help="비교할 긴 변 상한 (쉼표 구분)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    model = ClothSegmentationModel()
+    if not model.initialized:
+        raise SystemExit("ClothSegmentationModel 을 초기화할 수 없습니다 (체크포인트/모듈 확인)")
+
+    images = load_fixtures(args.images, args.limit)
+    if not images:
+        raise SystemExit(f"이미지가 없습니다: {args.images}")
+
+    rows = run_benchmark(model, images, [int(s) for s in args.sizes.split(",") if s.strip()])
+    print_report(rows, images)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
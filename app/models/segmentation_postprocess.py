@@ -0,0 +1,220 @@
+"""
+의류 세그멘테이션 후처리 / 크롭 엔진
+
+U2NET 클래스 맵(0=배경, 1=상의, 2=하의, 3=전신)을 추론 해상도 그대로 받아
+영역 마스크, 픽셀 수, 바운딩 박스를 저해상도에서 계산한다. 원본 해상도로는
+크롭할 박스 구간의 마스크만 최근접 보간으로 펼치고, 배경 합성은 크롭 배열에
+제자리(in-place)로 한다 (전체 크기 마스크/3채널 스택 없음).
+
+마이크로 벤치마크 (기존 전체 해상도 경로 대비):
+    python -m app.models.segmentation_postprocess --size 3000x4000 --infer 768
+"""
+import argparse
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+REGION_KEYS = ("top", "bottom", "full_body")
+
+# 흰색 의류 보정 기준 (원본 해상도 픽셀 수)
+MIN_BOTTOM_PIXELS = 20000
+LARGE_TOP_PIXELS = 100000
+TOP_BOTTOM_SPLIT = 0.7
+
+
+class ClothingRegions:
+    """
+    영역별 저해상도 bool 마스크 + 원본 크기
+
+    regions['top'] 처럼 인덱싱하면 원본 해상도 uint8 마스크를 만들어 준다 (기존 dict 인터페이스 호환).
+    크롭은 crop_region() 을 사용한다.
+    """
+
+    def __init__(self, masks: Dict[str, np.ndarray], size: Tuple[int, int]):
+        self.masks = masks
+        self.size = size  # (W, H)
+        h, w = next(iter(masks.values())).shape
+        self.shape = (h, w)
+        self.scale_y = size[1] / h
+        self.scale_x = size[0] / w
+        self.fallback = False  # 세그멘테이션 실패로 만든 대체 영역인지 (캐시하지 않음)
+
+    @classmethod
+    def from_labels(cls, labels: np.ndarray, size: Tuple[int, int]) -> "ClothingRegions":
+        """클래스 맵 → 상의/하의/전체 의류 마스크 (흰색 의류 하의 보정 포함)"""
+        regions = cls({
+            "top": labels == 1,
+            "bottom": labels == 2,
+            "full_body": labels > 0,
+        }, size)
+        regions._correct_white_garment()
+        return regions
+
+    @classmethod
+    def full(cls, size: Tuple[int, int]) -> "ClothingRegions":
+        """모든 영역이 이미지 전체인 폴백"""
+        mask = np.ones((1, 1), dtype=bool)
+        regions = cls({key: mask for key in REGION_KEYS}, size)
+        regions.fallback = True
+        return regions
+
+    def keys(self):
+        return self.masks.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.masks)
+
+    def __contains__(self, key) -> bool:
+        return key in self.masks
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        box = (0, 0, self.size[0], self.size[1])
+        return self.mask_window(key, box).astype(np.uint8)
+
+    def pixel_count(self, key: str) -> int:
+        """원본 해상도 기준 영역 픽셀 수 (저해상도 개수 × 면적 배율)"""
+        return int(np.count_nonzero(self.masks[key]) * self.scale_x * self.scale_y)
+
+    def _correct_white_garment(self):
+        """하의 영역이 너무 작으면 (흰색 하의를 배경/상의로 잡은 경우) 전체 의류에서 상의를 뺀 영역을 하의로"""
+        bottom_pixels = self.pixel_count("bottom")
+        if bottom_pixels >= MIN_BOTTOM_PIXELS:
+            return
+        print(f"⚠️ 하의 영역이 너무 작습니다 ({bottom_pixels} 픽셀) - 흰색 의류 특화 처리")
+
+        top = self.masks["top"]
+        bottom = self.masks["full_body"] & ~top
+        if self.pixel_count("top") > LARGE_TOP_PIXELS:
+            # 상의 하단 30%를 하의로 이동 (흰색 의류는 더 넓게)
+            split = int(self.shape[0] * TOP_BOTTOM_SPLIT)
+            bottom[split:] = top[split:]
+            top = top.copy()
+            top[split:] = False
+            self.masks["top"] = top
+        self.masks["bottom"] = bottom
+        print(f"흰색 의류 하의 영역 재구성: {bottom_pixels} → {self.pixel_count('bottom')} 픽셀")
+
+    def class_counts(self) -> Dict[str, int]:
+        """영역별 원본 해상도 픽셀 수 (로그용)"""
+        return {key: self.pixel_count(key) for key in self.masks}
+
+    def bbox(self, key: str) -> Optional[Tuple[int, int, int, int]]:
+        """영역의 원본 좌표 바운딩 박스 (x1, y1, x2, y2), 끝은 미포함. 빈 영역이면 None"""
+        mask = self.masks[key]
+        rows = np.flatnonzero(mask.any(axis=1))
+        if len(rows) == 0:
+            return None
+        cols = np.flatnonzero(mask.any(axis=0))
+        # 원본 화소 y 는 저해상도 행 int((y + 0.5) / scale) 로 매핑 → 그 행 구간에 들어오는 원본 화소 범위
+        def span(first, last, scale, limit):
+            start = max(0, int(np.ceil(first * scale - 0.5)))
+            end = min(limit, int(np.ceil((last + 1) * scale - 0.5)))
+            return start, max(end, start + 1)
+        x1, x2 = span(cols[0], cols[-1], self.scale_x, self.size[0])
+        y1, y2 = span(rows[0], rows[-1], self.scale_y, self.size[1])
+        return x1, y1, x2, y2
+
+    def mask_window(self, key: str, box: Tuple[int, int, int, int]) -> np.ndarray:
+        """원본 좌표 box 구간만 최근접 보간으로 펼친 bool 마스크 (PIL NEAREST 와 같은 화소 중심 규칙)"""
+        x1, y1, x2, y2 = box
+        h, w = self.shape
+        src_rows = np.minimum(((np.arange(y1, y2) + 0.5) / self.scale_y).astype(np.int64), h - 1)
+        src_cols = np.minimum(((np.arange(x1, x2) + 0.5) / self.scale_x).astype(np.int64), w - 1)
+        return self.masks[key][src_rows[:, None], src_cols[None, :]]
+
+
+def crop_region(image: Image.Image, regions: ClothingRegions, key: str) -> np.ndarray:
+    """
+    영역 바운딩 박스로 크롭하고 영역 밖을 흰색으로 채운 RGB 배열 (영역이 비면 원본 전체)
+    """
+    box = regions.bbox(key)
+    if box is None:
+        print(f"{key} 마스크가 비어있음 - 전체 이미지 반환")
+        return np.array(image)
+
+    cropped = np.array(image.crop(box))  # 박스 구간만 복사 (쓰기 가능)
+    mask = regions.mask_window(key, box)
+    cropped[~mask] = 255
+    print(f"{key} 바운딩 박스: {box[:2]} ~ {box[2:]}, 분리된 이미지 크기: {cropped.shape}")
+    return cropped
+
+
+# 마이크로 벤치마크
+def _legacy_crop(np_img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """기존 경로: 전체 해상도 np.where 박스 + 3채널 스택 합성"""
+    y_idx, x_idx = np.where(mask)
+    y1, y2 = y_idx.min(), y_idx.max()
+    x1, x2 = x_idx.min(), x_idx.max()
+    cropped = np_img[y1:y2, x1:x2]
+    mask_3c = np.stack([mask[y1:y2, x1:x2]] * 3, axis=-1)
+    return np.where(mask_3c, cropped, np.ones_like(cropped, dtype=np.uint8) * 255)
+
+
+def _legacy_pipeline(image: Image.Image, labels: np.ndarray) -> list:
+    """기존 경로: 클래스 맵 원본 크기 복원 → 영역 마스크 → np.unique → 영역별 크롭"""
+    full = np.array(Image.fromarray(labels).resize(image.size, resample=Image.NEAREST))
+    top = (full == 1).astype(np.uint8)
+    bottom = (full == 2).astype(np.uint8)
+    np.unique(full, return_counts=True)
+    np_img = np.array(image)
+    return [_legacy_crop(np_img, top), _legacy_crop(np.array(image), bottom)]
+
+
+def _new_pipeline(image: Image.Image, labels: np.ndarray) -> list:
+    regions = ClothingRegions.from_labels(labels, image.size)
+    return [crop_region(image, regions, "top"), crop_region(image, regions, "bottom")]
+
+
+def synthetic_case(width: int, height: int, infer_side: int, seed: int = 0) -> Tuple[Image.Image, np.ndarray]:
+    """사진 크기 이미지 + 추론 해상도 클래스 맵 (상의 상단 / 하의 하단 타원)"""
+    rng = np.random.default_rng(seed)
+    image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    scale = min(1.0, infer_side / max(width, height))
+    h, w = max(1, round(height * scale)), max(1, round(width * scale))
+    yy, xx = np.mgrid[0:h, 0:w]
+    labels = np.zeros((h, w), dtype=np.uint8)
+    labels[((yy - h * 0.3) / (h * 0.22)) ** 2 + ((xx - w * 0.5) / (w * 0.3)) ** 2 < 1] = 1
+    labels[((yy - h * 0.72) / (h * 0.2)) ** 2 + ((xx - w * 0.5) / (w * 0.22)) ** 2 < 1] = 2
+    return image, labels
+
+
+def benchmark(width: int, height: int, infer_side: int, repeat: int = 5) -> Dict[str, float]:
+    """기존/신규 후처리+크롭 지연시간 (ms, 최솟값) 및 원본 해상도 마스크 일치율"""
+    image, labels = synthetic_case(width, height, infer_side)
+    timings = {}
+    for name, fn in (("legacy", _legacy_pipeline), ("lowres", _new_pipeline)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(image, labels)
+            best = min(best, time.perf_counter() - t0)
+        timings[f"{name}_ms"] = best * 1000
+
+    # 원본 해상도 마스크 일치율 (기존: 클래스 맵 전체 복원 / 신규: 저해상도 마스크 펼침)
+    full = np.array(Image.fromarray(labels).resize(image.size, resample=Image.NEAREST))
+    regions = ClothingRegions.from_labels(labels, image.size)
+    agreement = [float(np.mean(regions[key].astype(bool) == (full == cls)))
+                 for key, cls in (("top", 1), ("bottom", 2))]
+    timings["speedup"] = timings["legacy_ms"] / timings["lowres_ms"]
+    timings["pixel_agreement"] = float(np.mean(agreement))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="세그멘테이션 후처리/크롭 마이크로 벤치마크")
+    parser.add_argument("--size", default="3000x4000", help="원본 이미지 크기 WxH")
+    parser.add_argument("--infer", type=int, default=768, help="추론 해상도 (긴 변)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    result = benchmark(width, height, args.infer, args.repeat)
+    print(f"\n원본 {width}x{height}, 추론 긴 변 {args.infer}px")
+    print(f"기존(전체 해상도) {result['legacy_ms']:.1f}ms → 저해상도 {result['lowres_ms']:.1f}ms "
+          f"({result['speedup']:.1f}x), 마스크 일치율 {result['pixel_agreement']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,35 @@
-from transformers import GPT2LMHeadModel, GPT2Tokenizer, pipeline
-import torch
 import warnings
 warnings.filterwarnings("ignore")
 
+from app.services.model_registry import QA_GENERATOR_MODEL_NAME, get_model
+
 class AIModelService:
+    """Q&A 생성 모델 접근자 (인스턴스는 모델 레지스트리 'qa-generator' 가 관리)"""
+
     def __init__(self):
         self.device = -1  # CPU 전용
-        self.models = {}
-        self.tokenizers = {}
 
-    def load_models(self):
-        model_name = "gpt2"   #  원래 yunki_master.zip 에 있던 기본 모델
-        tok = GPT2Tokenizer.from_pretrained(model_name)
-        model = GPT2LMHeadModel.from_pretrained(model_name)
-
-        qa_pipe = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tok,
-            device=self.device
-        )
+    def _qa_generator(self) -> dict:
+        """{'pipe', 'tok'} (첫 접근 시 로드, 로드 실패 시 빈 dict)"""
+        try:
+            pipe, tok = get_model("qa-generator")
+        except Exception:
+            return {}
+        return {"pipe": pipe, "tok": tok}
+
+    @property
+    def models(self) -> dict:
+        qa = self._qa_generator()
+        return {"qa_generator": qa["pipe"]} if qa else {}
 
-        self.models["qa_generator"] = qa_pipe
-        self.tokenizers["qa_generator"] = tok
+    @property
+    def tokenizers(self) -> dict:
+        qa = self._qa_generator()
+        return {"qa_generator": qa["tok"]} if qa else {}
 
-        print(f"[OK] Q&A model loaded: {model_name}")
+    def load_models(self):
+        get_model("qa-generator")
+        print(f"[OK] Q&A model loaded: {QA_GENERATOR_MODEL_NAME}")
 
     def generate_answer(self, prompt: str, max_new_tokens: int = 200):
         pipe = self.models["qa_generator"]
@@ -0,0 +1,268 @@
+"""
+Colab(ngrok) LLM 서버 호출 클라이언트
+
+요청마다 httpx.AsyncClient 를 새로 만들지 않고 프로세스 전역의 연결 풀을 재사용한다.
+서킷 브레이커로 연속 실패 시 Colab 호출을 끊어 두었다가 일정 시간 뒤 한 요청만 시험 호출해 복구를 확인한다.
+  - closed   : 정상 호출. 연속 실패가 COLAB_BREAKER_FAILURES 에 도달하면 open
+  - open     : 호출하지 않고 ColabUnavailable. COLAB_BREAKER_RESET_SECONDS 가 지나면 half_open
+  - half_open: 시험 호출 한 건만 허용. 성공하면 closed, 실패하면 다시 open
+헤징(hedge)에서 로컬 결과를 먼저 쓸 때 Colab 이 아직 응답하지 않았으면 실패로 센다 (멈춘 터널도 서킷이 열림).
+그 밖의 취소(클라이언트 연결 종료 등)는 실패로 세지 않는다.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import (
+    COLAB_BASE_URL, COLAB_BREAKER_FAILURES, COLAB_BREAKER_RESET_SECONDS,
+    COLAB_CONNECT_TIMEOUT_SECONDS, COLAB_MAX_CONNECTIONS, COLAB_TIMEOUT_SECONDS,
+)
+
+
+class ColabUnavailable(RuntimeError):
+    """Colab 서버 호출 불가 (미설정 / 서킷 open / 호출 실패)"""
+
+
+class CircuitBreaker:
+    """연속 실패 횟수 기반 서킷 브레이커 (스레드 안전)"""
+
+    def __init__(self, failure_threshold: int = COLAB_BREAKER_FAILURES,
+                 reset_seconds: float = COLAB_BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"allowed": 0, "rejected": 0, "successes": 0, "failures": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def _advance(self):
+        """open 상태에서 재시도 시간이 지나면 half_open (락 보유 상태에서 호출)"""
+        if self._state == "open" and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = "half_open"
+            self._probing = False
+
+    def allow(self) -> bool:
+        """호출 허용 여부 (half_open 이면 시험 호출 한 건만 허용)"""
+        with self._lock:
+            self._advance()
+            if self._state == "closed" or (self._state == "half_open" and not self._probing):
+                if self._state == "half_open":
+                    self._probing = True
+                self.stats["allowed"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.stats["opened"] += 1
+                self._state = "open"
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def release(self):
+        """결과 없이 끝난 호출(취소) 정리: half_open 시험 호출 자리를 반납"""
+        with self._lock:
+            self._probing = False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._advance()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                **self.stats,
+            }
+
+
+class ColabClient:
+    """연결 풀 재사용 + 서킷 브레이커가 적용된 Colab JSON 호출"""
+
+    def __init__(self, base_url: str = COLAB_BASE_URL, timeout: float = COLAB_TIMEOUT_SECONDS,
+                 connect_timeout: float = COLAB_CONNECT_TIMEOUT_SECONDS,
+                 max_connections: int = COLAB_MAX_CONNECTIONS,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        # 헤징 검색 결과 (어느 쪽 결과를 썼는지)
+        self.search_stats = {"colab": 0, "local": 0, "local_only": 0, "hedged": 0, "abandoned": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url)
+
+    def available(self) -> bool:
+        """설정되어 있고 서킷이 open 이 아닌지 (시험 호출 자리는 잡지 않음)"""
+        return self.enabled and self.breaker.state != "open"
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # 이벤트 루프 안에서만 호출되므로 별도 락 없이 지연 생성
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def post_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST 후 JSON 응답 반환
+
+        Raises:
+            ColabUnavailable: 미설정 / 서킷 open / 연결·타임아웃 오류 / 200 이 아닌 응답 / JSON 아님
+        """
+        if not self.enabled:
+            raise ColabUnavailable("COLAB_BASE_URL 이 설정되지 않았습니다.")
+        if not self.breaker.allow():
+            raise ColabUnavailable("Colab 서킷 open: 재시도 대기 중")
+
+        try:
+            res = await self._get_client().post(path, json=payload)
+            data = res.json() if res.status_code == 200 else None
+        except (httpx.HTTPError, ValueError) as e:
+            self.breaker.record_failure()
+            raise ColabUnavailable(f"Colab 호출 실패: {e.__class__.__name__}: {e}") from e
+        except BaseException:
+            # 취소 등 결과 없이 끝난 호출: half_open 시험 호출 자리만 반납
+            self.breaker.release()
+            raise
+
+        # 200 이 아니면 실패 (꺼진 ngrok 터널은 404/502 등으로 응답)
+        if data is None:
+            self.breaker.record_failure()
+            raise ColabUnavailable(f"Colab 응답 오류: {res.status_code}")
+        self.breaker.record_success()
+        return data
+
+    def record_search(self, source: str, hedged: bool):
+        """헤징 검색에서 사용한 결과 출처 기록 (source: colab | local | local_only)"""
+        self.search_stats[source] += 1
+        if hedged:
+            self.search_stats["hedged"] += 1
+
+    def record_abandoned(self):
+        """로컬 결과를 쓰느라 버린, 아직 응답 없는 Colab 호출을 서킷 브레이커에 실패로 기록"""
+        self.search_stats["abandoned"] += 1
+        self.breaker.record_failure()
+
+    async def hedge(self, path: str, payload: Dict[str, Any],
+                    on_response: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                    local_search: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                    delay_s: float) -> Optional[Dict[str, Any]]:
+        """
+        Colab 호출 + 로컬 검색 헤징
+
+        Colab 이 delay_s 안에 끝나지 않거나 실패하면 local_search 를 함께 실행하고 먼저 나온 결과를 쓴다.
+        남은 쪽은 취소한다. 서킷이 open 이면 로컬만 실행한다.
+          - on_response(Colab 응답 JSON): 결과 dict. images 가 비었거나 예외면 Colab 실패로 보고 로컬 결과 사용
+          - local_search(): 결과 dict 또는 None (None 이면 남은 Colab 결과를 기다림)
+          - 로컬 결과를 쓸 때 Colab HTTP 호출이 아직 응답 전이면 record_abandoned (실패 1회)
+        """
+        if not self.available():
+            self.record_search("local_only", hedged=False)
+            return await local_search()
+
+        colab_call = asyncio.create_task(self.post_json(path, payload))
+
+        async def colab_search():
+            return await on_response(await colab_call)
+
+        colab_task = asyncio.create_task(colab_search())
+        local_task = None
+        pending = {colab_task}
+        timeout = delay_s
+        hedged = False
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                start_local = False
+                if not done:
+                    print(f"[헤징] Colab 응답 {delay_s * 1000:.0f}ms 초과, 로컬 검색 동시 실행")
+                    hedged = True
+                    start_local = True
+                # 동시에 끝났으면 Colab 결과 우선
+                for task in sorted(done, key=lambda t: t is not colab_task):
+                    if task is colab_task:
+                        try:
+                            result = task.result()
+                            if result.get("images"):
+                                print(f"[Colab AI] 검색 성공: {len(result['images'])}개")
+                                self.record_search("colab", hedged)
+                                return result
+                        except Exception as e:
+                            print(f"[Colab AI] 검색 실패: {e}")
+                        start_local = local_task is None
+                    else:
+                        result = task.result()
+                        # 로컬 결과가 없으면 남은 Colab 결과를 기다림
+                        if result is not None or not pending:
+                            if not colab_call.done():
+                                self.record_abandoned()
+                            self.record_search("local", hedged)
+                            return result
+                if start_local:
+                    local_task = asyncio.create_task(local_search())
+                    pending.add(local_task)
+                    timeout = None
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            # colab_search 가 시작 전에 취소되면 호출 태스크가 남으므로 직접 취소
+            if not colab_call.done():
+                colab_call.cancel()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pool_open": self._client is not None and not self._client.is_closed,
+            "timeout_seconds": self.timeout.read,
+            "connect_timeout_seconds": self.timeout.connect,
+            "max_connections": self.limits.max_connections,
+            "breaker": self.breaker.metrics(),
+            "search": dict(self.search_stats),
+        }
+
+
+# 전역 클라이언트 인스턴스
+_colab_client = None
+_colab_client_lock = threading.Lock()
+
+def get_colab_client() -> ColabClient:
+    """Colab 클라이언트 인스턴스 반환 (싱글톤 패턴)"""
+    global _colab_client
+    with _colab_client_lock:
+        if _colab_client is None:
+            _colab_client = ColabClient()
+    return _colab_client
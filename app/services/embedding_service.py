@@ -1,15 +1,32 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
-# 한국어 특화 임베딩 모델
-MODEL_NAME = "jhgan/ko-sroberta-multitask"
-embedder = SentenceTransformer(MODEL_NAME)
+from app.services.inference_runtime import get_batcher
+from app.services.model_registry import KO_SROBERTA_MODEL_NAME, get_model
+
+# 한국어 특화 임베딩 모델 (모델 레지스트리 공유 인스턴스, llm_board_chat 과 같은 모델)
+MODEL_NAME = KO_SROBERTA_MODEL_NAME
+
+def get_embeddings(texts: list) -> list:
+    """
+    여러 텍스트를 한 번의 배치 forward로 벡터화
+    """
+    return list(get_model("ko-sroberta").encode(list(texts)))
+
+# 동시 호출 마이크로배칭 큐
+_batcher = get_batcher("ko-sroberta", get_embeddings)
 
 def get_embedding(text: str) -> list:
     """
     입력 텍스트를 벡터로 변환하여 리스트 반환
     """
-    vec = embedder.encode([text])[0]
+    vec = _batcher.submit_sync(text)
+    return vec.tolist()
+
+async def aget_embedding(text: str) -> list:
+    """
+    get_embedding 의 비동기 버전 (라우트에서 await)
+    """
+    vec = await _batcher.submit(text)
     return vec.tolist()
 
 def cosine_similarity(vec1, vec2) -> float:
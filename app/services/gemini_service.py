@@ -4,7 +4,7 @@ import asyncio
 import uuid
 import json
 from typing import List, Optional
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 import google.generativeai as genai
 from google.generativeai import types
 from PIL import Image
@@ -27,11 +27,13 @@ class GeminiService:
         self.model = genai.GenerativeModel(self.model_name)
 
     async def compose_fashion_images(self,
-                                     model_image: UploadFile,
-                                     clothing_images: List[UploadFile],
+                                     model_image: Image.Image,
+                                     clothing_images: List[Image.Image],
                                      custom_prompt: Optional[str] = None) -> dict:
         """
         패션 모델에게 옷을 착용시키는 이미지 합성 (나노바나나용 단순화)
+
+        이미지는 업로드 공통 처리(upload_ingest.ingest_upload)에서 디코딩된 RGB 이미지를 받는다.
         """
         try:
             # 프롬프트 구성
@@ -58,19 +60,8 @@ class GeminiService:
 
                     Create a natural, cohesive fashion photograph where all the items work together as a complete styled look."""
 
-            # 이미지들을 PIL Image로 변환
-            images = []
-
-            # 모델 이미지 처리
-            model_content = await model_image.read()
-            model_img = Image.open(io.BytesIO(model_content))
-            images.append(model_img)
-
-            # 의류 이미지들 처리
-            for clothing_img in clothing_images:
-                clothing_content = await clothing_img.read()
-                clothing_pil = Image.open(io.BytesIO(clothing_content))
-                images.append(clothing_pil)
+            model_img = model_image
+            images = [model_img] + list(clothing_images)
 
             # Gemini API 호출
             def generate_content():
@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import faiss
 import torch
+import threading
 import time
 from PIL import Image
 from typing import Dict, List, Any, Optional
@@ -11,10 +12,25 @@ from typing import Dict, List, Any, Optional
 from .data_loader import DataLoader
 from .image_processor import ImageProcessor
 from .product_analyzer import ProductAnalyzer
-from .utils import convert_analysis_to_json_safe as _convert_analysis_to_json_safe, format_analysis_for_frontend as _format_analysis_for_frontend
+from .product_index import ProductIndex
+from .product_catalog import product_id_from_filename
+from .catalog_store import new_image_id
+from .search_filters import SearchFilterIndex, normalize_filters, filter_cache_key
+from .text_embedding_cache import init_text_embedding_cache
+from .memory_report import memory_report, format_summary
+from .upload_cache import UploadAnalysis, get_upload_cache
+from .image_info import is_high_res, probe_image
+from .utils import format_analysis_for_frontend as _format_analysis_for_frontend
 
 # 실기능 모델 임포트
-from app.models.category_model import predict_clothing_category, is_top_or_bottom, get_category_model
+from app.services.inference_runtime import get_batcher
+from app.services.inference_executor import run_inference
+from app.core.config import IMAGE_PRODUCT_POOLING, IMAGE_BATCH_EMBED_SIZE
+from app.models.category_model import init_category_model, classify_clothing_embeddings
+from app.models.segmentation_postprocess import ClothingRegions, crop_region
+
+# 고화질 우선 선택 시 후보 배수 (top_k × 배수만큼 뽑아 고화질부터 채움)
+HIGH_RES_CANDIDATE_FACTOR = 2
 
 class EnhancedImageSearchService:
     """이미지 검색 서비스 (분리된 모듈들로 구성)"""
@@ -28,16 +44,19 @@ class EnhancedImageSearchService:
         # 분리된 모듈들 초기화
         self.data_loader = DataLoader(self.image_dir)
         self.data_loader.load_data()
+        self.catalog_store = self.data_loader.load_catalog_store()
         self.data_loader.load_product_metadata()
         self.data_loader.load_clip_model()
         
         # ImageProcessor에 CLIP 모델 설정
         from .image_processor import set_clip_models
         set_clip_models(self.data_loader.clip_processor, self.data_loader.clip_model)
+        # 카테고리 분류도 같은 CLIP 체크포인트 공유 (라벨 텍스트 임베딩은 여기서 한 번만 계산)
+        init_category_model(self.data_loader.clip_model, self.data_loader.clip_processor)
         
         # ProductAnalyzer에 유틸 함수들 설정
         from .product_analyzer import set_utils_functions
-        set_utils_functions(_convert_analysis_to_json_safe, _format_analysis_for_frontend)
+        set_utils_functions(_format_analysis_for_frontend)
         
         # ImageProcessor와 ProductAnalyzer 인스턴스 생성
         self.image_processor = ImageProcessor()
@@ -46,98 +65,145 @@ class EnhancedImageSearchService:
         # 데이터 접근을 위한 속성들
         self.metadata = self.data_loader.metadata
         self.index = self.data_loader.index
-        self.product_df = self.data_loader.product_df
-        self.merged = self.data_loader.merged
+        self.product_catalog = self.data_loader.product_catalog
         self.clip_model = self.data_loader.clip_model
         self.clip_processor = self.data_loader.clip_processor
         
+        # 상품 단위 검색 레이어 (같은 상품의 여러 이미지를 하나로 묶음)
+        self.product_index = ProductIndex(
+            self.index,
+            self.data_loader.catalog_image_files(),
+            embeddings=self.data_loader.catalog_embeddings(allow_copy=IMAGE_PRODUCT_POOLING == "mean"),
+        )
+        for row in self.catalog_store.deleted:
+            self.product_index.remove_row(row)
+        
+        # 인덱스 변경(add)과 검색이 겹치지 않도록 보호 (검색은 배처 flush 에서만 수행)
+        self._index_lock = threading.RLock()
+        
+        # 메타데이터 필터 색인 (category_l1 / gender / brand / 가격 / 캡션 속성)
+        self.filter_index = SearchFilterIndex(
+            self.product_index.row_product_ids(),
+            self.product_catalog,
+            self.data_loader.catalog_captions(),
+        )
+        
+        # 검색 레이어 구성이 끝났으므로 원본 병합 DataFrame 해제
+        self.data_loader.release_sources()
+        
+        # 마이크로배칭 큐 (동시 요청을 한 번의 forward / index.search 로 처리)
+        self.text_batcher = get_batcher("clip-text", self._encode_texts)
+        self.search_batcher = get_batcher("faiss-search", self._search_batch)
+        
+        # 텍스트 질의 임베딩 캐시 (LRU + 디스크, CLIP 모델 지문 기준 자동 무효화)
+        self.text_cache = init_text_embedding_cache(self.clip_model, self.data_loader.clip_model_name)
+        
+        print(format_summary(self.memory_report()))
         print("EnhancedImageSearchService 초기화 완료!")
     
-    def _convert_analysis_to_json_safe(self, data: Any) -> Any:
-        """numpy 타입을 JSON 직렬화 가능한 타입으로 변환"""
-        return _convert_analysis_to_json_safe(data)
+    def memory_report(self) -> Dict[str, Any]:
+        """구성요소별 메모리 사용량 (memory_report.memory_report)"""
+        with self._index_lock:
+            return memory_report(self)
+    
+    def _encode_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """CLIP 텍스트 배치 임베딩 (각 (1, D), L2 정규화)"""
+        inputs = self.clip_processor(text=list(texts), return_tensors="pt", padding=True)
+        with torch.no_grad():
+            text_emb = self.clip_model.get_text_features(**inputs).cpu().numpy().astype(np.float32)
+        text_emb = text_emb / np.linalg.norm(text_emb, axis=1, keepdims=True)
+        return [text_emb[i:i + 1] for i in range(len(text_emb))]
+    
+    def _search_batch(self, requests: List[tuple]) -> List[list]:
+        """(질의 임베딩 (1, D), k, 필터) 목록을 필터별 다중 질의 상품 검색으로 처리"""
+        groups: Dict[tuple, List[int]] = {}
+        for i, (_, _, filters) in enumerate(requests):
+            groups.setdefault(filter_cache_key(filters), []).append(i)
+        
+        results: List[list] = [None] * len(requests)
+        with self._index_lock:
+            ntotal = self.index.ntotal
+            live = self.catalog_store.live_mask(ntotal)
+            for members in groups.values():
+                filters = requests[members[0]][2]
+                mask = self.filter_index.mask(filters, ntotal)
+                if live is not None:
+                    # 삭제(tombstone)된 행 제외
+                    mask = live if mask is None else (mask & live)
+                queries = np.vstack([np.asarray(requests[i][0], dtype=np.float32) for i in members])
+                max_k = max(requests[i][1] for i in members)
+                hits = self.product_index.search(queries, max_k, mask)
+                for i, h in zip(members, hits):
+                    results[i] = h[:requests[i][1]]
+        return results
+    
+    def _faiss_search(self, query_emb: np.ndarray, k: int, filters: Optional[Dict[str, Any]] = None) -> list:
+        """상품 단위 FAISS 검색 (동기 경로, 동시 호출은 배치로 합쳐짐) → ProductHit 목록"""
+        return self.search_batcher.submit_sync((query_emb, k, normalize_filters(filters)))
     
-    async def search_existing_images(self, query_text: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        """텍스트로 기존 이미지 검색"""
+    def _hit_info(self, hit) -> tuple:
+        """검색 결과의 (이미지 파일명, 캡션, 상품 정보)"""
+        info = self.data_loader.get_image_file_info(hit.row)
+        product_info = self.data_loader.get_product_info(hit.product_id) or {}
+        return info["img_file"], info["caption"], product_info
+    
+    async def search_existing_images(self, query_text: str, top_k: int = 10,
+                                     filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """텍스트로 기존 이미지 검색 (filters: search_filters 형식의 메타데이터 필터)"""
         start_time = time.time()
         
         print(f"검색 쿼리: '{query_text}'")
+        filters = normalize_filters(filters)
         
-        # 텍스트 → 임베딩
-        inputs = self.clip_processor(text=[query_text], return_tensors="pt", padding=True)
-        with torch.no_grad():
-            query_emb = self.clip_model.get_text_features(**inputs).cpu().numpy().astype(np.float32)
+        # 텍스트 → 임베딩 (캐시 우선, 미스 시 마이크로배칭 forward)
+        # (SQLite 2단 조회/기록은 캐시 I/O 스레드에서 수행해 이벤트 루프를 막지 않음)
+        query_emb = await self.text_cache.aget(query_text)
+        if query_emb is None:
+            query_emb = await self.text_batcher.submit(query_text)
+            self.text_cache.put_async(query_text, query_emb)
         
-        # 정규화
-        query_emb = query_emb / np.linalg.norm(query_emb, axis=1, keepdims=True)
+        # FAISS 검색 (상품 단위 top-k, 상품별 최고 유사 이미지)
+        hits = await self.search_batcher.submit((query_emb, top_k, filters))
         
-        # FAISS 검색
-        search_k = min(top_k * 5, self.index.ntotal)
-        D, I = self.index.search(query_emb, k=search_k)
-        
-        print(f"FAISS 검색 완료: {len(I[0])}개 후보")
+        print(f"FAISS 검색 완료: {len(hits)}개 상품" + (f" (필터: {filters})" if filters else ""))
         
-        # 중복 제거 및 결과 생성
-        unique_results = []
-        seen = set()
+        # 결과 생성 (응답 항목 그대로 반환, NumPy 값은 ORJSONResponse 직렬화 단계에서 변환)
+        # 상세 분석: 고정 항목은 테이블 조회, 경쟁력만 묶음 계산
+        infos = [self._hit_info(hit) for hit in hits]
+        analyses = self.product_analyzer.analyze_batch(
+            [hit.product_id for hit in hits], [hit.score for hit in hits],
+            [{**info[2], "filename": info[0]} for info in infos], frontend=False
+        )
         
-        for i, idx in enumerate(I[0]):
-            if hasattr(self, 'metadata') and self.metadata:
-                # 처리된 데이터 사용
-                img_file = self.metadata['image_files'][idx]
-                caption = self.metadata['captions'][idx]
-            else:
-                # 원본 CSV 데이터 사용
-                img_file = self.merged.iloc[idx]["image_file"]
-                caption = self.merged.iloc[idx].get("predicted_caption", self.merged.iloc[idx].get("caption", ""))
+        results = []
+        for i, (hit, (img_file, caption, product_info)) in enumerate(zip(hits, infos)):
+            similarity_score = hit.score
             
-            if img_file not in seen:
-                seen.add(img_file)
-                
-                # 유사도 점수
-                similarity_score = D[0][i]
-                
-                # 상품 메타데이터 가져오기
-                product_id = img_file.split("_")[0]
-                product_info = self.data_loader.get_product_info(product_id) or {}
-                
-                result_item = {
-                    "id": str(len(unique_results) + 1),
-                    "filename": img_file,
-                    "image_file": img_file,
-                    "caption": caption,
-                    "similarity": float(similarity_score),
-                    "image_path": os.path.join(self.image_dir, img_file),
-                    "url": f"/api/images/file/{img_file}",
-                    "title": caption,
-                    "description": f"AI 생성 캡션: {caption}",
-                    "tags": ["AI추천", "패션"],
-                    "relevance": similarity_score
-                }
-                
-                # 메타데이터 추가
-                result_item.update(product_info)
-                
-                print(f"결과 {len(unique_results)+1}: {img_file} - 유사도: {similarity_score:.3f} - {caption[:50]}...")
-                
-                unique_results.append(result_item)
-            if len(unique_results) == top_k:
-                break
+            results.append({
+                "id": str(i + 1),
+                "filename": img_file,
+                "url": f"/api/images/file/{img_file}",
+                "title": caption,
+                "description": f"AI 생성 캡션: {caption}",
+                "tags": ["AI추천", "패션"],
+                "relevance": similarity_score,
+                "similarity": similarity_score,
+                "product_name": product_info.get("product_name", ""),
+                "price": product_info.get("price", 0),
+                "rating_avg": product_info.get("rating_avg", 0.0),
+                "brand": product_info.get("brand", ""),
+                "detailed_analysis": analyses[i],
+            })
+            
+            print(f"결과 {i + 1}: {img_file} - 유사도: {similarity_score:.3f} - {caption[:50]}...")
         
         search_time = time.time() - start_time
-        print(f"검색 완료: {len(unique_results)}개 결과 ({search_time:.2f}초)")
-        
-        # 각 검색 결과에 상세 분석 정보 추가
-        enhanced_results = []
-        for result in unique_results:
-            enhanced_result = result.copy()
-            detailed_analysis = await self.product_analyzer._analyze_single_product(result)
-            enhanced_result["detailed_analysis"] = detailed_analysis
-            enhanced_results.append(enhanced_result)
+        print(f"검색 완료: {len(results)}개 결과 ({search_time:.2f}초)")
         
-        return enhanced_results
+        return results
     
-    def search_by_image(self, image: Image.Image, top_k: int = 9) -> List[Dict[str, Any]]:
+    def search_by_image(self, image: Image.Image, top_k: int = 9,
+                        filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """이미지로 검색"""
         start_time = time.time()
         
@@ -148,58 +214,118 @@ class EnhancedImageSearchService:
         image_embedding = self.image_processor.get_image_embedding(processed_image)
         
         # FAISS 검색
-        search_k = min(top_k * 5, self.index.ntotal)
-        D, I = self.index.search(image_embedding, k=search_k)
+        hits = self._faiss_search(image_embedding, top_k, filters)
         
-        print(f"FAISS 검색 완료: {len(I[0])}개 후보")
+        unique_results = self._build_image_results(hits)
         
-        # 중복 제거 및 결과 생성
-        unique_results = []
-        seen = set()
+        search_time = time.time() - start_time
+        print(f"이미지 검색 완료: {len(unique_results)}개 결과, {search_time:.2f}초")
         
-        for i, idx in enumerate(I[0]):
-            if hasattr(self, 'metadata') and self.metadata:
-                img_file = self.metadata['image_files'][idx]
-                caption = self.metadata['captions'][idx]
-            else:
-                img_file = self.merged.iloc[idx]["image_file"]
-                caption = self.merged.iloc[idx].get("predicted_caption", self.merged.iloc[idx].get("caption", ""))
-            
-            if img_file not in seen:
-                seen.add(img_file)
-                
-                similarity_score = D[0][i]
-                product_id = img_file.split("_")[0]
-                product_info = self.data_loader.get_product_info(product_id) or {}
-                
-                result = {
-                    "id": f"{product_id}_{i}",
-                    "title": str(product_info.get("product_name", caption[:50] if caption else "상품명 없음")),
-                    "url": f"/api/images/file/{img_file}",
-                    "similarity": float(similarity_score),
-                    "product_name": str(product_info.get("product_name", "")),
-                    "price": int(product_info.get("price", 0)),
-                    "rating_avg": float(product_info.get("rating_avg", 0.0)),
-                    "brand": str(product_info.get("brand", "")),
-                    "clothing_category": "Unknown",
-                    "category_confidence": 0.0,
-                    "detailed_analysis": _convert_analysis_to_json_safe(_format_analysis_for_frontend(
-                        product_info, similarity_score, self.product_analyzer
-                    ))
-                }
-                print(f"이미지 URL 생성: {result['url']} (파일: {img_file})")
-                
-                unique_results.append(result)
-                
-                if len(unique_results) >= top_k:
-                    break
+        return unique_results
+    
+    async def search_by_image_async(self, image: Image.Image, top_k: int = 9,
+                                    filters: Optional[Dict[str, Any]] = None,
+                                    prefer_high_res: bool = False) -> List[Dict[str, Any]]:
+        """
+        이미지로 검색 (비동기, CLIP/FAISS 마이크로배칭 큐 사용)
+        prefer_high_res=True 면 후보를 2배로 뽑아 고화질(500x600 이상) 이미지를 우선 선택
+        """
+        start_time = time.time()
+        filters = normalize_filters(filters)
+        
+        processed_image = self.image_processor.preprocess_image(image)
+        image_embedding = await self.image_processor.embed_image(processed_image)
+        
+        k = top_k * HIGH_RES_CANDIDATE_FACTOR if prefer_high_res else top_k
+        hits = await self.search_batcher.submit((image_embedding, k, filters))
+        if prefer_high_res:
+            hits = self._prefer_high_res(hits, top_k)
+        
+        unique_results = self._build_image_results(hits)
         
         search_time = time.time() - start_time
         print(f"이미지 검색 완료: {len(unique_results)}개 결과, {search_time:.2f}초")
         
         return unique_results
     
-    def _get_clothing_regions_with_fallback(self, image: Image.Image) -> dict:
+    def search_by_image_batch(self, images: List[Image.Image], top_k: int = 9,
+                              filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        여러 이미지로 한 번에 검색 (이미지별 결과 목록, 입력 순서 유지)
+
+        CLIP 은 IMAGE_BATCH_EMBED_SIZE 단위 배치 forward, FAISS 는 다중 질의 search 한 번으로 처리한다.
+        """
+        start_time = time.time()
+        if not images:
+            return []
+        filters = normalize_filters(filters)
+        
+        processed = [self.image_processor.preprocess_image(image) for image in images]
+        chunk = max(1, IMAGE_BATCH_EMBED_SIZE)
+        embeddings = []
+        for i in range(0, len(processed), chunk):
+            embeddings.extend(self.image_processor.get_image_embeddings(processed[i:i + chunk]))
+        embed_time = time.time() - start_time
+        
+        hits = self._search_batch([(embedding, top_k, filters) for embedding in embeddings])
+        results = [self._build_image_results(h) for h in hits]
+        
+        search_time = time.time() - start_time
+        print(f"배치 이미지 검색 완료: {len(images)}개 이미지, 임베딩 {embed_time:.2f}초, 전체 {search_time:.2f}초")
+        
+        return results
+    
+    def _prefer_high_res(self, hits: list, top_k: int) -> list:
+        """
+        유사도 순 후보에서 고화질 이미지를 우선 선택하고, 부족하면 나머지로 top_k 까지 채움
+        (선택된 결과는 유사도 순 유지, 크기는 카탈로그에 기록된 값 사용)
+        """
+        flags = [is_high_res(self.catalog_store.image_info(hit.row)) for hit in hits]
+        low_res_budget = top_k - min(top_k, sum(flags))
+        selected = []
+        for hit, high_res in zip(hits, flags):
+            if not high_res:
+                if low_res_budget <= 0:
+                    continue
+                low_res_budget -= 1
+            selected.append(hit)
+            if len(selected) >= top_k:
+                break
+        return selected
+    
+    def _build_image_results(self, hits: list) -> List[Dict[str, Any]]:
+        """이미지 검색 상품 단위 결과 → 응답 항목"""
+        print(f"FAISS 검색 완료: {len(hits)}개 상품")
+        
+        unique_results = []
+        infos = [self._hit_info(hit) for hit in hits]
+        analyses = self.product_analyzer.analyze_batch(
+            [hit.product_id for hit in hits], [hit.score for hit in hits], [info[2] for info in infos]
+        )
+        
+        for i, (hit, (img_file, caption, product_info)) in enumerate(zip(hits, infos)):
+            similarity_score = hit.score
+            
+            result = {
+                "id": f"{hit.product_id}_{i}",
+                "title": product_info.get("product_name", caption[:50] if caption else "상품명 없음"),
+                "url": f"/api/images/file/{img_file}",
+                "similarity": similarity_score,
+                "product_name": product_info.get("product_name", ""),
+                "price": product_info.get("price", 0),
+                "rating_avg": product_info.get("rating_avg", 0.0),
+                "brand": product_info.get("brand", ""),
+                "clothing_category": "Unknown",
+                "category_confidence": 0.0,
+                "detailed_analysis": analyses[i]
+            }
+            print(f"이미지 URL 생성: {result['url']} (파일: {img_file})")
+            
+            unique_results.append(result)
+        
+        return unique_results
+    
+    def _get_clothing_regions_with_fallback(self, image: Image.Image) -> ClothingRegions:
         """
         의류 영역 분할 (cloth_segmentation 모델 사용)
         """
@@ -213,32 +339,34 @@ class EnhancedImageSearchService:
             print(f"cloth_segmentation 모델 실패: {e}")
             raise RuntimeError(f"cloth_segmentation 모델이 실패했습니다: {e}")
     
-    def search_by_image_advanced(self, image: Image.Image, top_k: int = 9, clothing_type: str = "all") -> Dict[str, Any]:
+    def search_by_image_advanced(self, image: Image.Image, top_k: int = 9, clothing_type: str = "all",
+                                 filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """고급 이미지 검색 (cloth_segmentation 사용)"""
         start_time = time.time()
+        filters = normalize_filters(filters)
         
         print(f"고급 이미지 검색 시작: {image.size}, 의류 타입: {clothing_type}")
         
         try:
-            # 1. 의류 분할 (cloth_segmentation 사용)
-            clothing_regions = self._get_clothing_regions_with_fallback(image)
+            # 1. 의류 분할 (같은/거의 같은 업로드면 캐시된 영역 마스크 재사용)
+            analysis = self._analyze_upload(image)
+            clothing_regions = analysis.regions_for(image)
             print("의류 분할 및 상/하의 구분 완료")
             
-            # 2. 분리된 사진 생성 및 저장
-            separated_images = self.image_processor._create_separated_images(image, clothing_regions, clothing_type)
+            # 2. 필요한 영역만 한 번 크롭 (분리 사진과 검색이 같은 크롭 사용)
+            region_keys = {"all": ["top", "bottom"], "top": ["top"], "bottom": ["bottom"]}.get(clothing_type, ["full_body"])
+            crops = self._crop_regions(image, clothing_regions, region_keys)
+            
+            # 분리된 사진 (메모리 저장소에 보관, URL 로 제공)
+            separated_images = self.image_processor._create_separated_images(crops, clothing_type)
             
-            # 3. 전체 옵션인 경우 상의 5개 + 하의 5개로 분리 검색
+            # 3. 전체 옵션인 경우 상의 5개 + 하의 5개로 분리 검색 (두 영역을 한 번의 CLIP forward 로 처리)
             if clothing_type == "all":
                 print("전체 옵션: 상의 5개 + 하의 5개로 분리 검색")
                 
-                # 상의 검색 (5개)
-                top_results = self._search_by_clothing_region(
-                    image, clothing_regions['top'], "상의", 5
-                )
-                
-                # 하의 검색 (5개)
-                bottom_results = self._search_by_clothing_region(
-                    image, clothing_regions['bottom'], "하의", 5
+                top_results, bottom_results = self._search_by_clothing_regions(
+                    [("top", crops.get('top'), "상의", 5), ("bottom", crops.get('bottom'), "하의", 5)],
+                    filters, analysis,
                 )
                 
                 # 결과 합치기
@@ -256,19 +384,10 @@ class EnhancedImageSearchService:
                 }
             
             # 4. 단일 의류 타입 검색
-            if clothing_type == "top":
-                clothing_mask = clothing_regions['top']
-                region_name = "상의"
-            elif clothing_type == "bottom":
-                clothing_mask = clothing_regions['bottom']
-                region_name = "하의"
-            else:
-                clothing_mask = clothing_regions['full_body']
-                region_name = "전체"
-            
-            results = self._search_by_clothing_region(
-                image, clothing_mask, region_name, top_k
-            )
+            region_name = {"top": "상의", "bottom": "하의"}.get(clothing_type, "전체")
+            results = self._search_by_clothing_regions(
+                [(region_keys[0], crops.get(region_keys[0]), region_name, top_k)], filters, analysis
+            )[0]
             
             search_time = time.time() - start_time
             print(f"고급 이미지 검색 완료: {len(results)}개 결과, {search_time:.2f}초")
@@ -283,7 +402,7 @@ class EnhancedImageSearchService:
         except Exception as e:
             print(f"고급 이미지 검색 실패: {e}")
             # 실패 시 기본 이미지 검색으로 폴백
-            fallback_results = self.search_by_image(image, top_k)
+            fallback_results = self.search_by_image(image, top_k, filters)
             return {
                 "results": fallback_results,
                 "separated_images": [],
@@ -291,115 +410,217 @@ class EnhancedImageSearchService:
                 "count": len(fallback_results)
             }
     
-    def _search_by_clothing_region(self, image: Image.Image, clothing_mask: np.ndarray, region_name: str, top_k: int) -> List[Dict[str, Any]]:
-        """특정 의류 영역으로 검색하는 헬퍼 메서드"""
+    def _analyze_upload(self, image: Image.Image) -> UploadAnalysis:
+        """업로드 분석 캐시 조회, 없으면 의류 분할 후 등록 (폴백 영역은 캐시하지 않음)"""
+        cache = get_upload_cache()
+        analysis, key, phash = cache.lookup(image)
+        if analysis is not None and analysis.key == key:
+            print(f"업로드 분석 캐시 적중: {key[:12]}")
+            return analysis
+        if analysis is not None:
+            # 근접 중복은 영역 마스크만 재사용. dHash 는 밝기 차이만 보므로 색이 다른 사진도 같게 나올 수 있어
+            # 영역 임베딩/검색 결과는 현재 픽셀로 다시 계산한다 (새 키로 등록)
+            print(f"업로드 분석 캐시 근접 적중: {analysis.key[:12]} 의 영역 마스크 재사용 (요청 {key[:12]})")
+            analysis = UploadAnalysis(key, phash, analysis.regions_for(image))
+            cache.put(analysis)
+            return analysis
+        
+        clothing_regions = self._get_clothing_regions_with_fallback(image)
+        analysis = UploadAnalysis(key, phash, clothing_regions)
+        if not clothing_regions.fallback:
+            cache.put(analysis)
+        return analysis
+    
+    def _crop_regions(self, image: Image.Image, clothing_regions: ClothingRegions,
+                      region_keys: List[str]) -> Dict[str, Image.Image]:
+        """의류 영역별 크롭 (실패한 영역은 제외)"""
+        crops = {}
+        for key in region_keys:
+            try:
+                crops[key] = Image.fromarray(crop_region(image, clothing_regions, key))
+                print(f"{key} 영역 추출 완료 - 마스크 픽셀 수: {clothing_regions.pixel_count(key)}")
+            except Exception as e:
+                print(f"{key} 영역 추출 실패: {e}")
+        return crops
+    
+    def _embed_regions(self, images: List[Image.Image], topk: int = 2) -> tuple:
+        """
+        의류 영역 이미지들의 CLIP 임베딩 + 카테고리 분류
+
+        vision forward 는 영역 전체에 대해 배치 한 번이고, 그 정규화 임베딩을 검색과
+        카테고리 분류(미리 계산한 라벨 텍스트 임베딩과 내적)에 함께 사용한다.
+        """
+        processed = [self.image_processor.preprocess_image(img) for img in images]
+        embeddings = self.image_processor.get_image_embeddings(processed)
+        category_results = classify_clothing_embeddings(np.vstack(embeddings), topk=topk)
+        return embeddings, category_results
+    
+    def _search_by_clothing_regions(self, regions: List[tuple], filters: Optional[Dict[str, Any]] = None,
+                                    analysis: Optional[UploadAnalysis] = None) -> List[List[Dict[str, Any]]]:
+        """
+        (영역 키, 영역 크롭 이미지, 영역 이름, top_k) 목록으로 검색
+        (영역별 결과 목록, 크롭이 없거나 실패한 영역은 빈 목록)
+
+        analysis 가 있으면 영역 임베딩/카테고리와 (영역, top_k, 필터, 카탈로그 세대)별 결과를 재사용하고,
+        새로 계산한 것은 analysis 에 채워 둔다.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in regions]
+        cache = get_upload_cache() if analysis is not None else None
+        filter_key = filter_cache_key(filters)
+        
+        # 1. 추출된 의류 영역만 검색 (캐시된 결과가 있는 영역은 바로 반환)
+        crops = []
+        for i, (key, clothing_image, _, top_k) in enumerate(regions):
+            if clothing_image is None:
+                continue
+            if analysis is not None:
+                cached = analysis.results.get((key, top_k, filter_key, self.catalog_store.generation))
+                cache.record("result", cached is not None)
+                if cached is not None:
+                    results[i] = list(cached)
+                    continue
+            crops.append((i, clothing_image))
+        if not crops:
+            return results
+        
         try:
-            # 1. 의류 영역 추출
-            clothing_region = self.image_processor.crop_clothes_region_by_mask(image, clothing_mask)
-            clothing_image = Image.fromarray(clothing_region)
-            print(f"{region_name} 영역 추출 완료 - 마스크 픽셀 수: {clothing_mask.sum()}")
-            
-            # 2. 카테고리 분류
-            category_results = predict_clothing_category(clothing_image, topk=2)
-            category = category_results[0]["label"] if category_results else "Unknown"
-            category_confidence = category_results[0]["score"] if category_results else 0.0
-            print(f"{region_name} 카테고리 분류: {category} (신뢰도: {category_confidence:.2f})")
+            # 2. 영역 CLIP 임베딩 (캐시에 없는 영역만 배치 forward 한 번) + 카테고리 분류
+            embedded = {}
+            if analysis is not None:
+                for i, _ in crops:
+                    if regions[i][0] in analysis.embeddings:
+                        embedded[i] = analysis.embeddings[regions[i][0]]
+            missing = [(i, img) for i, img in crops if i not in embedded]
+            if missing:
+                embeddings, category_results = self._embed_regions([img for _, img in missing])
+                for (i, _), embedding, categories in zip(missing, embeddings, category_results):
+                    embedded[i] = (embedding, categories)
+                    if analysis is not None:
+                        analysis.embeddings[regions[i][0]] = embedded[i]
+            if analysis is not None:
+                cache.record("embedding", not missing)
             
-            # 3. 의류 영역으로 CLIP 검색
-            processed_image = self.image_processor.preprocess_image(clothing_image)
-            image_embedding = self.image_processor.get_image_embedding(processed_image)
-            print(f"{region_name} CLIP 임베딩 생성 완료 - 임베딩 크기: {image_embedding.shape}")
-            
-            # 4. FAISS 검색
-            search_k = min(top_k * 5, self.index.ntotal)
-            D, I = self.index.search(image_embedding, k=search_k)
-            print(f"{region_name} FAISS 검색 완료 - 상위 {len(I[0])}개 후보")
+            # 3. FAISS 검색 (상품 단위 top-k, 다중 질의 한 번)
+            generation = self.catalog_store.generation
+            batch_hits = self._search_batch([
+                (embedded[i][0], regions[i][3], filters) for i, _ in crops
+            ])
+        except Exception as e:
+            print(f"{', '.join(regions[i][2] for i, _ in crops)} 검색 실패: {e}")
+            return results
+        
+        category_results = [embedded[i][1] for i, _ in crops]
+        for (i, _), categories, hits in zip(crops, category_results, batch_hits):
+            region_name = regions[i][2]
+            category = categories[0]["label"] if categories else "Unknown"
+            category_confidence = categories[0]["score"] if categories else 0.0
+            print(f"{region_name} 카테고리 분류: {category} (신뢰도: {category_confidence:.2f}), "
+                  f"FAISS 검색 완료 - 상위 {len(hits)}개 상품")
             
-            # 5. 결과 생성
+            # 4. 결과 생성
             unique_results = []
-            seen = set()
+            infos = [self._hit_info(hit) for hit in hits]
+            analyses = self.product_analyzer.analyze_batch(
+                [hit.product_id for hit in hits], [hit.score for hit in hits], [info[2] for info in infos]
+            )
             
-            for i, idx in enumerate(I[0]):
-                if hasattr(self, 'metadata') and self.metadata:
-                    img_file = self.metadata['image_files'][idx]
-                    caption = self.metadata['captions'][idx]
-                else:
-                    img_file = self.merged.iloc[idx]["image_file"]
-                    caption = self.merged.iloc[idx].get("predicted_caption", self.merged.iloc[idx].get("caption", ""))
+            for rank, (hit, (img_file, caption, product_info)) in enumerate(zip(hits, infos)):
+                similarity_score = hit.score
                 
-                if img_file not in seen:
-                    seen.add(img_file)
-                    
-                    similarity_score = D[0][i]
-                    product_id = img_file.split("_")[0]
-                    product_info = self.data_loader.get_product_info(product_id) or {}
-                    
-                    # 고급 검색 결과 (카테고리 정보 추가)
-                    result = {
-                        "id": f"{product_id}_{i}",
-                        "title": str(product_info.get("product_name", caption[:50] if caption else "상품명 없음")),
-                        "url": f"/api/images/file/{img_file}",
-                        "similarity": float(similarity_score),
-                        "product_name": str(product_info.get("product_name", "")),
-                        "price": int(product_info.get("price", 0)),
-                        "rating_avg": float(product_info.get("rating_avg", 0.0)),
-                        "brand": str(product_info.get("brand", "")),
-                        "clothing_category": category,
-                        "category_confidence": float(category_confidence),
-                        "detailed_analysis": _convert_analysis_to_json_safe(_format_analysis_for_frontend(
-                            product_info, similarity_score, self.product_analyzer
-                        ))
-                    }
-                    
-                    unique_results.append(result)
-                    
-                    if len(unique_results) >= top_k:
-                        break
+                # 고급 검색 결과 (카테고리 정보 추가)
+                result = {
+                    "id": f"{hit.product_id}_{rank}",
+                    "title": product_info.get("product_name", caption[:50] if caption else "상품명 없음"),
+                    "url": f"/api/images/file/{img_file}",
+                    "similarity": similarity_score,
+                    "product_name": product_info.get("product_name", ""),
+                    "price": product_info.get("price", 0),
+                    "rating_avg": product_info.get("rating_avg", 0.0),
+                    "brand": product_info.get("brand", ""),
+                    "clothing_category": category,
+                    "category_confidence": category_confidence,
+                    "detailed_analysis": analyses[rank]
+                }
+                
+                unique_results.append(result)
             
-            return unique_results
+            results[i] = unique_results
+            if analysis is not None:
+                key, _, _, top_k = regions[i]
+                analysis.results[(key, top_k, filter_key, generation)] = list(unique_results)
+        
+        if analysis is not None:
+            cache.update(analysis)
+        return results
+    
+    def _embed_catalog_image(self, image: Image.Image) -> tuple:
+        """카탈로그용 임베딩 + 카테고리 예측 (의류 영역 기준)"""
+        # 1. 의류 영역 추출 (cloth_segmentation 사용)
+        from app.models.cloth_segmentation_model import get_clothing_regions_cloth_segmentation
+        clothing_regions = get_clothing_regions_cloth_segmentation(image)
+        # 전체 의류 영역을 사용
+        clothing_image = Image.fromarray(crop_region(image, clothing_regions, 'full_body'))
+        
+        # 2. 임베딩 생성 + 카테고리 분류 (vision forward 공유)
+        embeddings, category_results = self._embed_regions([clothing_image])
+        return embeddings[0].astype(np.float32), category_results[0]
+    
+    def _save_catalog_image(self, image: Image.Image, image_id: str) -> str:
+        """추가 이미지를 이미지 디렉터리에 저장 (/api/images/file/ 로 제공되도록)"""
+        image_file = f"{image_id}.jpg"
+        image.convert("RGB").save(os.path.join(self.image_dir, image_file), format="JPEG", quality=95)
+        return image_file
+    
+    def _catalog_metadata(self, image_id: str, category_results: list, metadata: Optional[Dict[str, Any]],
+                          image_file: str) -> Dict[str, Any]:
+        metadata = dict(metadata or {})
+        metadata.update({
+            "image_id": image_id,
+            "image": probe_image(os.path.join(self.image_dir, image_file)),
+            "category": category_results[0]["label"] if category_results else "Unknown",
+            "category_confidence": float(category_results[0]["score"]) if category_results else 0.0,
+            "added_at": time.time()
+        })
+        return metadata
+    
+    def _append_catalog_row(self, image_id: str, embedding: np.ndarray, image_file: str,
+                            caption: str, metadata: Dict[str, Any], replace: bool = False) -> int:
+        """WAL 기록 + 인덱스/상품 매핑에 새 행 추가 (replace=True 면 기존 행 tombstone)"""
+        with self._index_lock:
+            # mmap 아티팩트 인덱스는 읽기 전용이므로 메모리 사본으로 전환 후 추가
+            self.index = self.data_loader.ensure_writable_index()
+            self.product_index.index = self.index
             
-        except Exception as e:
-            print(f"{region_name} 검색 실패: {e}")
-            return []
+            if replace:
+                old_row = self.catalog_store.row_of(image_id)
+                row = self.catalog_store.update(image_id, embedding, image_file, caption, metadata)
+                self.product_index.remove_row(old_row)
+            else:
+                row = self.catalog_store.add(embedding, image_file, caption, image_id, metadata)
+            self.index.add(embedding)
+            self.product_index.add_row(image_file)
+            # 필터 색인에도 반영 (안 하면 필터 검색에서 재시작 전까지 빠짐)
+            self.filter_index.add_row(row, product_id_from_filename(image_file), caption)
+        return row
     
     def add_image_to_catalog(self, image: Image.Image, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
-        """실제 이미지를 카탈로그에 추가"""
+        """실제 이미지를 카탈로그에 추가 (변경 로그에 기록되어 재시작 후에도 유지)"""
         try:
-            # 1. 의류 영역 추출 (cloth_segmentation 사용)
-            from app.models.cloth_segmentation_model import get_clothing_regions_cloth_segmentation
-            clothing_regions = get_clothing_regions_cloth_segmentation(image)
-            # 전체 의류 영역을 사용
-            full_body_mask = clothing_regions['full_body']
-            clothing_region = self.image_processor.crop_clothes_region_by_mask(image, full_body_mask)
-            clothing_image = Image.fromarray(clothing_region)
+            image_embedding, category_results = self._embed_catalog_image(image)
             
-            # 2. 카테고리 분류
-            category_results = predict_clothing_category(clothing_image, topk=2)
+            # 4. 이미지 저장 + 메타데이터/벡터를 카탈로그에 추가
+            image_id = new_image_id()
+            image_file = self._save_catalog_image(image, image_id)
+            metadata = self._catalog_metadata(image_id, category_results, metadata, image_file)
+            caption = str(metadata.get("title") or "")
             
-            # 3. 임베딩 생성
-            processed_image = self.image_processor.preprocess_image(clothing_image)
-            image_embedding = self.image_processor.get_image_embedding(processed_image)
-            
-            # 4. FAISS 인덱스에 추가
-            if hasattr(self, 'index'):
-                self.index.add(image_embedding.astype(np.float32))
-                print(f"FAISS 인덱스에 이미지 추가 완료")
-            
-            # 5. 메타데이터 저장
-            image_id = f"custom_{int(time.time())}"
-            if metadata is None:
-                metadata = {}
-            
-            metadata.update({
-                "image_id": image_id,
-                "category": category_results[0]["label"] if category_results else "Unknown",
-                "category_confidence": float(category_results[0]["score"]) if category_results else 0.0,
-                "added_at": time.time()
-            })
+            row = self._append_catalog_row(image_id, image_embedding, image_file, caption, metadata)
+            print(f"카탈로그에 이미지 추가 완료: {image_id} (행 {row})")
             
             return {
                 "success": True,
                 "image_id": image_id,
+                "image_file": image_file,
                 "metadata": metadata,
                 "message": "이미지가 카탈로그에 추가되었습니다."
             }
@@ -412,11 +633,56 @@ class EnhancedImageSearchService:
                 "message": "이미지 추가에 실패했습니다."
             }
     
+    def update_image_in_catalog(self, image_id: str, image: Image.Image, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """카탈로그 이미지 교체 (같은 image_id 유지)"""
+        try:
+            if self.catalog_store.row_of(image_id) is None:
+                return {
+                    "success": False,
+                    "error": "not_found",
+                    "message": f"카탈로그에 없는 이미지입니다: {image_id}"
+                }
+            
+            image_embedding, category_results = self._embed_catalog_image(image)
+            image_file = self._save_catalog_image(image, image_id)
+            metadata = self._catalog_metadata(image_id, category_results, metadata, image_file)
+            caption = str(metadata.get("title") or "")
+            
+            row = self._append_catalog_row(image_id, image_embedding, image_file, caption, metadata, replace=True)
+            print(f"카탈로그 이미지 교체 완료: {image_id} (행 {row})")
+            
+            return {
+                "success": True,
+                "image_id": image_id,
+                "image_file": image_file,
+                "metadata": metadata,
+                "message": "이미지가 카탈로그에서 수정되었습니다."
+            }
+            
+        except Exception as e:
+            print(f"카탈로그 수정 실패: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "이미지 수정에 실패했습니다."
+            }
+    
     def remove_image_from_catalog(self, image_id: str) -> Dict[str, Any]:
-        """실제 카탈로그에서 이미지 제거"""
+        """실제 카탈로그에서 이미지 제거 (tombstone, 다음 압축 시 스냅샷에서 제외)"""
         try:
             print(f"카탈로그에서 이미지 제거: {image_id}")
             
+            with self._index_lock:
+                try:
+                    row = self.catalog_store.remove(image_id)
+                except KeyError:
+                    return {
+                        "success": False,
+                        "error": "not_found",
+                        "message": f"카탈로그에 없는 이미지입니다: {image_id}"
+                    }
+                self.product_index.remove_row(row)
+            
             return {
                 "success": True,
                 "image_id": image_id,
@@ -433,46 +699,30 @@ class EnhancedImageSearchService:
 
 # 전역 서비스 인스턴스
 _search_service = None
+_search_service_lock = threading.Lock()
 
 def get_search_service():
     """검색 서비스 인스턴스 반환 (싱글톤 패턴)"""
     global _search_service
-    if _search_service is None:
-        _search_service = EnhancedImageSearchService()
+    with _search_service_lock:
+        if _search_service is None:
+            _search_service = EnhancedImageSearchService()
     return _search_service
 
 # 기존 함수와의 호환성을 위한 래퍼
-async def generate_image(prompt: str, top: int):
+async def generate_image(prompt: str, top: int, filters: Optional[Dict[str, Any]] = None):
     """기존 generate_image 함수와 호환되는 래퍼"""
     start_time = time.time()
     
-    service = get_search_service()
-    results = await service.search_existing_images(prompt, top)
+    service = await run_inference(get_search_service)
+    results = await service.search_existing_images(prompt, top, filters)
     
     search_time = time.time() - start_time
     
-    # 기존 API 응답 형태로 변환 (호환성 유지)
-    formatted_images = []
-    for result in results:
-        formatted_images.append({
-            "id": str(result.get("id", "")),
-            "filename": str(result.get("filename", "")),
-            "url": str(result.get("url", "")),
-            "title": str(result.get("title", "")),
-            "description": str(result.get("description", "")),
-            "tags": result.get("tags", []),
-            "relevance": float(result.get("relevance", 0.0)),
-            "similarity": float(result.get("similarity", 0.0)),
-            "product_name": str(result.get("product_name", "")),
-            "price": int(result.get("price", 0)),
-            "rating_avg": float(result.get("rating_avg", 0.0)),
-            "brand": str(result.get("brand", "")),
-            "detailed_analysis": _convert_analysis_to_json_safe(result.get("detailed_analysis", {}))
-        })
-
+    # 서비스 결과 항목이 곧 기존 API 응답 형태 (값 타입 변환은 ORJSONResponse 직렬화 단계에서 처리)
     return {
         "query": prompt,
-        "totalCount": len(formatted_images),
+        "totalCount": len(results),
         "searchTime": round(search_time, 2),
-        "images": formatted_images
+        "images": results
     }
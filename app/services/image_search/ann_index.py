@@ -0,0 +1,195 @@
+"""
+FAISS ANN 인덱스 팩토리 (flat / ivf_flat / ivf_pq / hnsw / sq_fp16 / sq_int8 / pq)
+
+압축 저장 옵션 (512차원 기준 벡터당 바이트):
+  - flat    : float32 2048B
+  - sq_fp16 : float16 1024B (재현율 손실 거의 없음)
+  - sq_int8 : 차원별 8bit 스칼라 양자화 512B
+  - pq      : pq_m 개 서브벡터 × pq_nbits (기본 64B)
+"""
+import faiss
+import numpy as np
+from typing import Dict, Any, Optional
+
+from app.core.config import (
+    IMAGE_INDEX_TYPE,
+    IMAGE_INDEX_NLIST,
+    IMAGE_INDEX_NPROBE,
+    IMAGE_INDEX_PQ_M,
+    IMAGE_INDEX_PQ_NBITS,
+    IMAGE_INDEX_HNSW_M,
+    IMAGE_INDEX_HNSW_EF_CONSTRUCTION,
+    IMAGE_INDEX_HNSW_EF_SEARCH,
+)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8", "pq")
+# 읽기 전용 mmap 로드 플래그 (IndexFlat/SQ/PQ 코드까지 mmap, 구버전 faiss는 IVF 리스트만 지원)
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def default_index_params() -> Dict[str, Any]:
+    """환경변수 기반 기본 인덱스 파라미터"""
+    return {
+        "nlist": IMAGE_INDEX_NLIST,
+        "nprobe": IMAGE_INDEX_NPROBE,
+        "pq_m": IMAGE_INDEX_PQ_M,
+        "pq_nbits": IMAGE_INDEX_PQ_NBITS,
+        "hnsw_m": IMAGE_INDEX_HNSW_M,
+        "ef_construction": IMAGE_INDEX_HNSW_EF_CONSTRUCTION,
+        "ef_search": IMAGE_INDEX_HNSW_EF_SEARCH,
+    }
+
+
+def _resolve_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    resolved = default_index_params()
+    if params:
+        resolved.update({k: v for k, v in params.items() if v is not None})
+    return resolved
+
+
+def build_index(embeddings: np.ndarray, index_type: Optional[str] = None,
+                params: Optional[Dict[str, Any]] = None) -> faiss.Index:
+    """
+    정규화된 임베딩으로 내적(코사인) 기반 FAISS 인덱스 생성
+
+    Args:
+        embeddings: (N, D) float32 임베딩 (L2 정규화 완료)
+        index_type: INDEX_TYPES 중 하나 (None이면 IMAGE_INDEX_TYPE)
+        params: nlist, nprobe, pq_m, pq_nbits, hnsw_m, ef_construction, ef_search
+
+    Returns:
+        faiss.Index: 벡터가 추가되고 검색 파라미터가 적용된 인덱스
+    """
+    index_type = (index_type or IMAGE_INDEX_TYPE).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 인덱스 타입: {index_type} (지원: {', '.join(INDEX_TYPES)})")
+
+    p = _resolve_params(params)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dimension = embeddings.shape
+
+    # 학습 데이터가 부족하면 IVF 계열은 flat으로 폴백
+    nlist = max(1, min(int(p["nlist"]), n))
+    if index_type in ("ivf_pq", "pq") and n < (1 << int(p["pq_nbits"])):
+        print(f"PQ 학습 데이터 부족 ({n}개 < {1 << int(p['pq_nbits'])}) - flat 인덱스로 폴백")
+        index_type = "flat"
+    if index_type in ("ivf_pq", "pq") and dimension % int(p["pq_m"]) != 0:
+        raise ValueError(f"pq_m({p['pq_m']})은 임베딩 차원({dimension})의 약수여야 합니다")
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == "ivf_flat":
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type == "ivf_pq":
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, int(p["pq_m"]), int(p["pq_nbits"]),
+                                 faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type in ("sq_fp16", "sq_int8"):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if index_type == "sq_fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type == "pq":
+        index = faiss.IndexPQ(dimension, int(p["pq_m"]), int(p["pq_nbits"]), faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    else:  # hnsw
+        index = faiss.IndexHNSWFlat(dimension, int(p["hnsw_m"]), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(p["ef_construction"])
+
+    index.add(embeddings)
+    configure_search(index, p)
+
+    print(f"FAISS {index_type} 인덱스 생성: {index.ntotal}개 벡터, 차원 {dimension}")
+    return index
+
+
+def configure_search(index: faiss.Index, params: Optional[Dict[str, Any]] = None) -> faiss.Index:
+    """nprobe(IVF) / efSearch(HNSW) 검색 파라미터 적용 (IDMap 등 래퍼 포함)"""
+    p = _resolve_params(params)
+    space = faiss.ParameterSpace()
+    for name, value in (("nprobe", p["nprobe"]), ("efSearch", p["ef_search"])):
+        try:
+            space.set_index_parameter(index, name, int(value))
+        except RuntimeError:
+            # 해당 파라미터가 없는 인덱스 타입 (예: flat에 nprobe)
+            pass
+    return index
+
+
+def search_parameters(index: faiss.Index, mask: np.ndarray) -> tuple:
+    """
+    허용 행 마스크를 IDSelectorBitmap 으로 감싼 SearchParameters 생성
+
+    nprobe / efSearch 는 인덱스에 설정된 현재 값을 그대로 옮긴다.
+    비트맵 버퍼가 검색 중 해제되지 않도록 (params, selector, bitmap) 을 함께 반환하므로
+    호출자는 검색이 끝날 때까지 튜플을 유지해야 한다.
+    """
+    bitmap = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+
+    ivf = faiss.try_extract_index_ivf(index)
+    base = faiss.downcast_index(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF()
+        params.nprobe = ivf.nprobe
+    elif isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = base.hnsw.efSearch
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params, selector, bitmap
+
+
+def describe_index(index: faiss.Index) -> str:
+    """인덱스 타입 문자열 (로그/벤치마크용)"""
+    return type(faiss.downcast_index(index)).__name__
+
+
+def stores_exact_vectors(index: faiss.Index) -> bool:
+    """
+    reconstruct 로 원본 float32 벡터를 그대로 복원할 수 있는지
+
+    flat / hnsw(flat 저장) / direct map 있는 ivf_flat 만 True.
+    sq / pq 계열은 복원은 되지만 양자화된 근사 벡터라 False.
+    """
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return stores_exact_vectors(base.storage)
+    if isinstance(base, faiss.IndexFlat):
+        return True
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and isinstance(faiss.downcast_index(ivf), faiss.IndexIVFFlat):
+        return ivf.direct_map.type != faiss.DirectMap.NoMap
+    return False
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """인덱스 벡터 코드 + 구조(IVF 중심점, HNSW 링크) 크기 추정 (바이트)"""
+    base = faiss.downcast_index(index)
+    ntotal = index.ntotal
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return int(ivf.code_size * ntotal + ivf.nlist * ivf.d * 4 + ntotal * 8)
+    if isinstance(base, faiss.IndexHNSW):
+        links = base.hnsw.nb_neighbors(0) * 4 * ntotal
+        return int(links + index_memory_bytes(base.storage))
+    try:
+        return int(base.sa_code_size() * ntotal)
+    except RuntimeError:
+        return int(ntotal * index.d * 4)
+
+
+def load_index(path: str, params: Optional[Dict[str, Any]] = None, mmap: bool = False) -> faiss.Index:
+    """
+    저장된 인덱스 로드 후 검색 파라미터 적용
+
+    mmap=True 면 읽기 전용으로 매핑해 워커 프로세스 간 페이지 캐시를 공유한다
+    (수정 전에 mmap=False 로 다시 읽어야 함).
+    """
+    index = faiss.read_index(path, MMAP_FLAGS) if mmap else faiss.read_index(path)
+    configure_search(index, params)
+    print(f"FAISS 인덱스 로드: {describe_index(index)}, {index.ntotal}개 벡터" + (" (mmap)" if mmap else ""))
+    return index
@@ -0,0 +1,300 @@
+"""
+바이너리 카탈로그 아티팩트 (빠른 부팅용)
+
+하나의 버전 디렉터리에 다음을 저장:
+  - embeddings.npy            : L2 정규화 임베딩 (IMAGE_EMBEDDING_DTYPE float32/float16, mmap 로드)
+  - faiss_index.bin           : FAISS 인덱스 (가능하면 mmap 로드)
+  - <column>.bin/.offsets.npy : 문자열 컬럼 (UTF-8 blob + 오프셋)
+  - <column>.npy              : 숫자 컬럼 (image_width/image_height/image_bytes 등)
+  - manifest.json             : 버전, 개수, 인덱스 타입, 파일별 크기/sha256
+
+빌드:
+    python -m app.services.image_search.catalog_artifact build
+    python -m app.services.image_search.catalog_artifact verify
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import faiss
+from typing import Dict, List, Any, Optional, Sequence
+
+from app.core.config import IMAGE_CATALOG_DIR, IMAGE_CATALOG_VERIFY, IMAGE_EMBEDDING_DTYPE
+from .ann_index import MMAP_FLAGS, build_index, configure_search, describe_index
+from .image_info import probe_image_info
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "faiss_index.bin"
+
+
+class StringColumn:
+    """UTF-8 blob + 오프셋 배열 기반 읽기 전용 문자열 컬럼 (리스트처럼 인덱싱)"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("StringColumn index out of range")
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+    @staticmethod
+    def write(path_prefix: str, values: Sequence[str]) -> List[str]:
+        """문자열 목록을 <prefix>.bin / <prefix>.offsets.npy 로 저장"""
+        encoded = [("" if v is None else str(v)).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        with open(path_prefix + ".bin", "wb") as f:
+            f.write(b"".join(encoded))
+        np.save(path_prefix + ".offsets.npy", offsets)
+        return [path_prefix + ".bin", path_prefix + ".offsets.npy"]
+
+    @classmethod
+    def load(cls, path_prefix: str) -> "StringColumn":
+        offsets = np.load(path_prefix + ".offsets.npy", mmap_mode="r")
+        if os.path.getsize(path_prefix + ".bin") == 0:
+            blob = np.zeros(0, dtype=np.uint8)
+        else:
+            blob = np.memmap(path_prefix + ".bin", dtype=np.uint8, mode="r")
+        return cls(blob, offsets)
+
+
+def _sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CatalogArtifact:
+    """로드된 카탈로그 아티팩트 (임베딩/인덱스/컬럼 모두 mmap)"""
+
+    def __init__(self, path: str, manifest: Dict[str, Any], embeddings: np.ndarray,
+                 index: faiss.Index, columns: Dict[str, Any], index_mmap: bool):
+        self.path = path
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.index = index
+        self.columns = columns
+        self.index_mmap = index_mmap
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """기존 metadata.pkl 과 같은 형태 ({'image_files': ..., 'captions': ...})"""
+        return {
+            "image_files": self.columns["image_files"],
+            "captions": self.columns["captions"],
+        }
+
+    def read_index(self, mmap: bool = True) -> faiss.Index:
+        """인덱스 재로드 (mmap=False 면 수정 가능한 메모리 사본)"""
+        path = os.path.join(self.path, INDEX_FILE)
+        index = faiss.read_index(path, MMAP_FLAGS) if mmap else faiss.read_index(path)
+        return configure_search(index)
+
+
+def write_artifact(embeddings: np.ndarray, image_files: Sequence[str], captions: Sequence[str],
+                   root: str = IMAGE_CATALOG_DIR, index: Optional[faiss.Index] = None,
+                   index_type: Optional[str] = None, extra_columns: Optional[Dict[str, Any]] = None,
+                   sources: Optional[Dict[str, Any]] = None, set_current: bool = True,
+                   embedding_dtype: str = IMAGE_EMBEDDING_DTYPE) -> str:
+    """
+    아티팩트를 새 버전 디렉터리에 기록하고 CURRENT 포인터를 원자적으로 교체
+
+    set_current=False 면 디렉터리만 만들고 포인터 교체(_write_current)는 호출자에게 맡긴다.
+    embedding_dtype=float16 이면 embeddings.npy 를 절반 크기로 저장 (인덱스는 float32 로 빌드).
+
+    Returns:
+        str: 생성된 버전 디렉터리 경로
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if not (len(embeddings) == len(image_files) == len(captions)):
+        raise ValueError("임베딩/이미지 파일/캡션 개수가 일치하지 않습니다")
+
+    version = time.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(root, exist_ok=True)
+    if os.path.exists(os.path.join(root, version)):
+        version = f"{version}-{int(time.time() * 1000) % 1000:03d}"
+    final_dir = os.path.join(root, version)
+    tmp_dir = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    written = []
+    if embedding_dtype not in ("float32", "float16"):
+        raise ValueError(f"지원하지 않는 임베딩 dtype: {embedding_dtype} (float32 | float16)")
+    np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE), embeddings.astype(embedding_dtype, copy=False))
+    written.append(os.path.join(tmp_dir, EMBEDDINGS_FILE))
+
+    if index is None:
+        index = build_index(embeddings, index_type)
+    faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+    written.append(os.path.join(tmp_dir, INDEX_FILE))
+
+    columns = {"image_files": "str", "captions": "str"}
+    written += StringColumn.write(os.path.join(tmp_dir, "image_files"), image_files)
+    written += StringColumn.write(os.path.join(tmp_dir, "captions"), captions)
+    for name, values in (extra_columns or {}).items():
+        if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+            written.append(os.path.join(tmp_dir, f"{name}.npy"))
+            columns[name] = "npy"
+        else:
+            written += StringColumn.write(os.path.join(tmp_dir, name), values)
+            columns[name] = "str"
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.time(),
+        "count": int(len(embeddings)),
+        "dimension": int(embeddings.shape[1]),
+        "embedding_dtype": embedding_dtype,
+        "index_type": describe_index(index),
+        "columns": columns,
+        "sources": sources or {},
+        "files": {
+            os.path.basename(p): {"size": os.path.getsize(p), "sha256": _sha256(p)}
+            for p in written
+        },
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    os.replace(tmp_dir, final_dir)
+    if set_current:
+        _write_current(root, version)
+    print(f"카탈로그 아티팩트 생성 완료: {final_dir} ({manifest['count']}개, {manifest['index_type']})")
+    return final_dir
+
+
+def _write_current(root: str, version: str):
+    tmp = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+
+def current_artifact_path(root: str = IMAGE_CATALOG_DIR) -> Optional[str]:
+    """CURRENT 포인터가 가리키는 버전 디렉터리 (없으면 None)"""
+    pointer = os.path.join(root, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        version = f.read().strip()
+    path = os.path.join(root, version)
+    return path if os.path.isdir(path) else None
+
+
+def verify_artifact(path: str, checksums: bool = True) -> Dict[str, Any]:
+    """manifest 기준 파일 크기(및 sha256) 검증, 실패 시 ValueError"""
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 아티팩트 포맷: {manifest.get('format_version')}")
+    for name, info in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != info["size"]:
+            raise ValueError(f"아티팩트 파일 손상: {name}")
+        if checksums and _sha256(file_path) != info["sha256"]:
+            raise ValueError(f"아티팩트 체크섬 불일치: {name}")
+    return manifest
+
+
+def load_artifact(root: str = IMAGE_CATALOG_DIR, verify: bool = IMAGE_CATALOG_VERIFY,
+                  mmap: bool = True) -> Optional[CatalogArtifact]:
+    """현재 버전 아티팩트 로드 (없으면 None). 기본은 크기만 검증하고 sha256은 verify=True 일 때"""
+    path = current_artifact_path(root)
+    if path is None:
+        return None
+
+    manifest = verify_artifact(path, checksums=verify)
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+
+    columns: Dict[str, Any] = {}
+    for name, kind in manifest["columns"].items():
+        if kind == "npy":
+            columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        else:
+            columns[name] = StringColumn.load(os.path.join(path, name))
+
+    artifact = CatalogArtifact(path, manifest, embeddings, None, columns, index_mmap=mmap)
+    artifact.index = artifact.read_index(mmap=mmap)
+    return artifact
+
+
+def build_from_sources(image_dir: str = "app/img_search/only_product_images", root: str = IMAGE_CATALOG_DIR,
+                       index_type: Optional[str] = None) -> str:
+    """원본 CSV(임베딩/캡션) + 이미지 디렉터리로부터 아티팩트 빌드"""
+    from .data_loader import DataLoader
+
+    loader = DataLoader(image_dir)
+    loader.load_csv_sources()
+    embeddings = loader.merged_embeddings()
+    captions = loader.merged_captions()
+    image_files = loader.merged["image_file"].astype(str).tolist()
+
+    # 이미지 크기/파일 정보 (검색 시 고화질 우선 선택용, 요청 경로에서 파일을 열지 않도록)
+    image_info = probe_image_info(image_dir, image_files)
+
+    return write_artifact(
+        embeddings, image_files, captions, root=root, index_type=index_type,
+        extra_columns=image_info,
+        sources={"image_dir": image_dir, "csv": loader.source_files},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 카탈로그 바이너리 아티팩트 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="원본 CSV로부터 새 버전 빌드")
+    build.add_argument("--image-dir", default="app/img_search/only_product_images")
+    build.add_argument("--root", default=IMAGE_CATALOG_DIR)
+    build.add_argument("--index-type", help="flat | ivf_flat | ivf_pq | hnsw (기본: IMAGE_INDEX_TYPE)")
+
+    verify = sub.add_parser("verify", help="현재 버전 체크섬 검증")
+    verify.add_argument("--root", default=IMAGE_CATALOG_DIR)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_from_sources(args.image_dir, args.root, args.index_type)
+    else:
+        path = current_artifact_path(args.root)
+        if path is None:
+            raise SystemExit(f"아티팩트가 없습니다: {args.root}")
+        manifest = verify_artifact(path, checksums=True)
+        print(f"검증 완료: {path} ({manifest['count']}개, {manifest['index_type']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+이미지 목록 스냅샷 (GET /api/images/list)
+
+상품 이미지 파일 목록, 상품 카탈로그, product_id → 이미지 파일 목록을 프로세스 전역에 한 번 만들어 두고
+요청마다 디렉터리/CSV 를 다시 읽지 않는다.
+  - 이미지 디렉터리 또는 product.csv 의 수정 시각(mtime)이 바뀐 경우에만 새 스냅샷을 만들어 통째로 교체
+  - 스냅샷은 만든 뒤 수정하지 않으므로 요청은 락 없이 읽는다 (교체 중에도 이전 스냅샷을 그대로 사용)
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .product_catalog import PRODUCT_CSV, ProductCatalog, get_product_catalog, product_id_from_filename
+
+CATALOG_IMAGE_DIR = str(Path(__file__).resolve().parent.parent.parent / "img_search" / "only_product_images")
+LIST_IMAGE_EXTENSION = ".jpg"
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class CatalogSnapshot:
+    """한 시점의 이미지 파일 목록 + 상품 카탈로그 (읽기 전용)"""
+
+    def __init__(self, files: List[str], products: ProductCatalog, dir_mtime_ns: int, csv_mtime_ns: int):
+        self.files: Tuple[str, ...] = tuple(files)
+        self.products = products
+        self.dir_mtime_ns = dir_mtime_ns
+        self.csv_mtime_ns = csv_mtime_ns
+        self.loaded_at = time.time()
+        images_by_product: Dict[str, List[str]] = {}
+        for filename in self.files:
+            images_by_product.setdefault(product_id_from_filename(filename), []).append(filename)
+        self.images_by_product = images_by_product
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def page(self, offset: int, limit: int) -> List[str]:
+        """파일명 순 목록의 [offset, offset + limit) 구간"""
+        return list(self.files[offset:offset + limit])
+
+    def images_of(self, product_id: str) -> List[str]:
+        return self.images_by_product.get(str(product_id), [])
+
+
+class CatalogSnapshotWatcher:
+    """mtime 이 바뀔 때만 스냅샷을 다시 만들어 교체"""
+
+    def __init__(self, image_dir: str = CATALOG_IMAGE_DIR, csv_path: str = PRODUCT_CSV):
+        self.image_dir = image_dir
+        self.csv_path = csv_path
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _is_current(self, snapshot, dir_mtime_ns: int, csv_mtime_ns: int) -> bool:
+        return (snapshot is not None and snapshot.dir_mtime_ns == dir_mtime_ns
+                and snapshot.csv_mtime_ns == csv_mtime_ns)
+
+    def current(self) -> CatalogSnapshot:
+        """최신 스냅샷 (변경이 없으면 stat 두 번만 하고 기존 스냅샷 반환)"""
+        dir_mtime_ns, csv_mtime_ns = _mtime_ns(self.image_dir), _mtime_ns(self.csv_path)
+        snapshot = self._snapshot
+        if self._is_current(snapshot, dir_mtime_ns, csv_mtime_ns):
+            return snapshot
+
+        with self._lock:
+            # 다른 요청이 먼저 다시 만들었으면 그대로 사용
+            snapshot = self._snapshot
+            if self._is_current(snapshot, dir_mtime_ns, csv_mtime_ns):
+                return snapshot
+            snapshot = self._load(dir_mtime_ns, csv_mtime_ns, snapshot)
+            self._snapshot = snapshot
+            self.reloads += 1
+        return snapshot
+
+    def _load(self, dir_mtime_ns: int, csv_mtime_ns: int, previous) -> CatalogSnapshot:
+        try:
+            with os.scandir(self.image_dir) as entries:
+                files = sorted(e.name for e in entries if e.name.endswith(LIST_IMAGE_EXTENSION))
+        except FileNotFoundError:
+            print(f"{self.image_dir} 디렉터리가 없습니다. 빈 이미지 목록으로 진행합니다.")
+            files = []
+
+        # CSV 가 그대로면 기존 카탈로그 재사용 (검색 서비스와 같은 인스턴스 공유)
+        if previous is not None and previous.csv_mtime_ns == csv_mtime_ns:
+            products = previous.products
+        else:
+            products = get_product_catalog() if self.csv_path == PRODUCT_CSV else None
+            if products is None or products.mtime_ns != csv_mtime_ns:
+                products = ProductCatalog.from_csv(self.csv_path)
+
+        print(f"이미지 목록 스냅샷 로드: 이미지 {len(files)}개, 상품 {len(products)}개")
+        return CatalogSnapshot(files, products, dir_mtime_ns, csv_mtime_ns)
+
+    def metrics(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "images": len(snapshot) if snapshot else 0,
+            "products": len(snapshot.products) if snapshot else 0,
+            "product_groups": len(snapshot.images_by_product) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reloads": self.reloads,
+        }
+
+
+# 전역 스냅샷 감시자
+_snapshot_watcher = None
+_snapshot_watcher_lock = threading.Lock()
+
+def get_snapshot_watcher() -> CatalogSnapshotWatcher:
+    """이미지 목록 스냅샷 감시자 반환 (싱글톤 패턴)"""
+    global _snapshot_watcher
+    with _snapshot_watcher_lock:
+        if _snapshot_watcher is None:
+            _snapshot_watcher = CatalogSnapshotWatcher()
+    return _snapshot_watcher
+
+def get_catalog_snapshot() -> CatalogSnapshot:
+    """현재 이미지 목록 스냅샷"""
+    return get_snapshot_watcher().current()
@@ -0,0 +1,411 @@
+"""
+카탈로그 변경 저장소 (추가 / 수정 / 삭제 + WAL + 스냅샷 압축)
+
+  - 행 번호 = FAISS 인덱스 행. 스냅샷(아티팩트 등) 행 뒤에 추가 행이 이어 붙는다.
+  - image_id 는 안정 ID: 스냅샷 행은 image_ids 컬럼(없으면 파일명), 추가 행은 custom-<hex>.
+  - 삭제/수정은 인덱스에서 벡터를 지우지 않고 행을 tombstone 처리한다.
+    검색은 live_mask() 를 IDSelectorBitmap 으로 넘겨 제외하므로 인덱스 타입과 무관하게 O(1).
+  - 모든 변경은 먼저 WAL(<wal_dir>/<스냅샷 버전>.log, JSON lines)에 fsync 후 메모리에 반영.
+    레코드는 행 번호가 아닌 image_id 기준 논리 로그라 어떤 스냅샷 위에서도 재생 가능하다.
+  - WAL 레코드가 IMAGE_CATALOG_COMPACT_EVERY 개 쌓이면 살아있는 행만 새 아티팩트로 압축하고,
+    압축 중 들어온 레코드는 새 WAL 로 옮긴 뒤 CURRENT 를 교체한다.
+
+오프라인 압축 / 상태 확인 (서버 중지 상태에서):
+    python -m app.services.image_search.catalog_store status
+    python -m app.services.image_search.catalog_store compact
+"""
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.config import IMAGE_CATALOG_DIR, IMAGE_CATALOG_WAL_DIR, IMAGE_CATALOG_COMPACT_EVERY
+
+from .catalog_artifact import write_artifact, _write_current
+from .image_info import info_columns
+
+CUSTOM_ID_PREFIX = "custom-"
+
+
+def new_image_id() -> str:
+    """추가 이미지용 안정 ID (파일명에 '_' 가 없어 product_id 로도 그대로 쓰임)"""
+    return f"{CUSTOM_ID_PREFIX}{uuid.uuid4().hex[:12]}"
+
+
+class RowEmbeddings:
+    """스냅샷 임베딩(mmap 가능) + 추가 임베딩을 하나의 (N, D) 행 배열처럼 조회"""
+
+    def __init__(self, base: Optional[np.ndarray], base_size: int, dim: int):
+        self.base = base
+        self.base_size = base_size
+        self.dim = dim
+        self._extra = np.zeros((0, dim), dtype=np.float32)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self.base_size + self._n
+
+    @property
+    def complete(self) -> bool:
+        """스냅샷 임베딩까지 모두 조회 가능한지"""
+        return self.base is not None and len(self.base) == self.base_size
+
+    @property
+    def extra(self) -> np.ndarray:
+        return self._extra[:self._n]
+
+    def append(self, embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        needed = self._n + len(embeddings)
+        if needed > len(self._extra):
+            grown = np.zeros((max(needed, 2 * len(self._extra), 16), self.dim), dtype=np.float32)
+            grown[:self._n] = self._extra[:self._n]
+            self._extra = grown
+        self._extra[self._n:needed] = embeddings
+        self._n = needed
+
+    def __getitem__(self, rows) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.ndim == 0:
+            return self[rows[None]][0]
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        in_base = rows < self.base_size
+        if in_base.any():
+            if self.base is None:
+                raise RuntimeError("스냅샷 임베딩을 사용할 수 없습니다")
+            out[in_base] = self.base[rows[in_base]]
+        if not in_base.all():
+            out[~in_base] = self._extra[rows[~in_base] - self.base_size]
+        return out
+
+
+class CatalogStore:
+    """행 메타데이터 + tombstone + WAL. 인덱스 반영은 호출자가 lock 안에서 함께 수행"""
+
+    def __init__(self, image_files: Sequence[str], captions: Sequence[str], dim: int,
+                 image_ids: Optional[Sequence[str]] = None, image_meta: Optional[Sequence[str]] = None,
+                 image_info: Optional[Dict[str, Any]] = None, version: str = "base", base_embeddings: Optional[np.ndarray] = None,
+                 base_embeddings_fn: Optional[Callable[[], Optional[np.ndarray]]] = None,
+                 root: str = IMAGE_CATALOG_DIR, wal_dir: str = IMAGE_CATALOG_WAL_DIR,
+                 compact_every: int = IMAGE_CATALOG_COMPACT_EVERY):
+        self.base_files = image_files
+        self.base_captions = captions
+        self.base_ids = image_ids
+        self.base_meta = image_meta
+        self.base_info = image_info  # image_info.IMAGE_INFO_COLUMNS 컬럼 (없으면 None)
+        self.base_size = len(image_files)
+        self.version = version
+        self.root = root
+        self.wal_dir = wal_dir
+        self.compact_every = compact_every
+        self.base_embeddings_fn = base_embeddings_fn
+        self.vectors = RowEmbeddings(base_embeddings, self.base_size, dim)
+
+        self.extra_files: List[str] = []
+        self.extra_captions: List[str] = []
+        self.extra_ids: List[str] = []
+        self.extra_meta: List[Dict[str, Any]] = []
+
+        ids = image_ids if image_ids is not None else image_files
+        self.row_by_id: Dict[str, int] = {str(image_id): row for row, image_id in enumerate(ids)}
+        self.deleted = set()
+        self._live: Optional[np.ndarray] = None
+        self.generation = 0  # 행 추가/삭제마다 증가 (검색 결과 캐시 무효화용)
+
+        self.lock = threading.RLock()
+        self._wal = None
+        self.wal_records = 0
+        self._compacting = False
+        self.stats = {"adds": 0, "updates": 0, "removes": 0, "replayed": 0, "compactions": 0,
+                      "last_compaction": None}
+
+    @property
+    def wal_path(self) -> str:
+        return os.path.join(self.wal_dir, f"{self.version}.log")
+
+    # 행 조회
+    def __len__(self) -> int:
+        return self.base_size + len(self.extra_files)
+
+    def image_file(self, row: int) -> str:
+        return self.base_files[row] if row < self.base_size else self.extra_files[row - self.base_size]
+
+    def caption(self, row: int) -> str:
+        return self.base_captions[row] if row < self.base_size else self.extra_captions[row - self.base_size]
+
+    def image_id(self, row: int) -> str:
+        if row >= self.base_size:
+            return self.extra_ids[row - self.base_size]
+        return str(self.base_ids[row] if self.base_ids is not None else self.base_files[row])
+
+    def image_meta(self, row: int) -> Dict[str, Any]:
+        if row >= self.base_size:
+            return self.extra_meta[row - self.base_size]
+        raw = self.base_meta[row] if self.base_meta is not None else ""
+        return json.loads(raw) if raw else {}
+
+    def image_info(self, row: int) -> Optional[Dict[str, Any]]:
+        """행 이미지의 {'width', 'height', 'bytes', 'format'} (기록되지 않았으면 None)"""
+        if row >= self.base_size:
+            return self.extra_meta[row - self.base_size].get("image")
+        if self.base_info is None:
+            return None
+        return {
+            "width": int(self.base_info["image_width"][row]),
+            "height": int(self.base_info["image_height"][row]),
+            "bytes": int(self.base_info["image_bytes"][row]),
+            "format": str(self.base_info["image_format"][row]),
+        }
+
+    def image_files(self) -> List[str]:
+        return list(self.base_files) + self.extra_files
+
+    def captions(self) -> List[str]:
+        return list(self.base_captions) + self.extra_captions
+
+    def row_of(self, image_id: str) -> Optional[int]:
+        """살아있는 image_id 의 행 번호 (없거나 삭제됐으면 None)"""
+        return self.row_by_id.get(str(image_id))
+
+    def live_mask(self, size: Optional[int] = None) -> Optional[np.ndarray]:
+        """삭제 행을 제외하는 bool 마스크 (삭제가 없으면 None)"""
+        if not self.deleted:
+            return None
+        size = size or len(self)
+        live = self._live
+        if live is None or len(live) != size:
+            live = np.ones(size, dtype=bool)
+            live[[r for r in self.deleted if r < size]] = False
+            live.setflags(write=False)
+            self._live = live
+        return live
+
+    # 변경 (WAL 선기록 → 메모리 반영)
+    def add(self, embedding: np.ndarray, image_file: str, caption: str = "",
+            image_id: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> int:
+        """새 행 추가 후 행 번호 반환. 같은 image_id 가 살아있으면 ValueError"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self.lock:
+            image_id = image_id or new_image_id()
+            if image_id in self.row_by_id:
+                raise ValueError(f"이미 존재하는 이미지 ID: {image_id}")
+            self._log({"op": "add", "id": image_id, "file": image_file, "caption": caption,
+                       "meta": meta or {}, "emb": base64.b64encode(embedding.tobytes()).decode("ascii")})
+            row = self._apply_add(image_id, image_file, caption, meta or {}, embedding)
+            self.stats["adds"] += 1
+        self._maybe_compact()
+        return row
+
+    def remove(self, image_id: str) -> int:
+        """행 삭제(tombstone) 후 삭제된 행 번호 반환. 없으면 KeyError"""
+        with self.lock:
+            if image_id not in self.row_by_id:
+                raise KeyError(image_id)
+            self._log({"op": "remove", "id": image_id})
+            row = self._apply_remove(image_id)
+            self.stats["removes"] += 1
+        self._maybe_compact()
+        return row
+
+    def update(self, image_id: str, embedding: np.ndarray, image_file: str, caption: str = "",
+               meta: Optional[Dict[str, Any]] = None) -> int:
+        """기존 행을 tombstone 하고 같은 image_id 로 새 행 추가 (WAL 에는 한 레코드)"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self.lock:
+            if image_id not in self.row_by_id:
+                raise KeyError(image_id)
+            self._log({"op": "update", "id": image_id, "file": image_file, "caption": caption,
+                       "meta": meta or {}, "emb": base64.b64encode(embedding.tobytes()).decode("ascii")})
+            self._apply_remove(image_id)
+            row = self._apply_add(image_id, image_file, caption, meta or {}, embedding)
+            self.stats["updates"] += 1
+        self._maybe_compact()
+        return row
+
+    def _apply_add(self, image_id: str, image_file: str, caption: str,
+                   meta: Dict[str, Any], embedding: np.ndarray) -> int:
+        row = len(self)
+        self.extra_files.append(image_file)
+        self.extra_captions.append(caption)
+        self.extra_ids.append(image_id)
+        self.extra_meta.append(meta)
+        self.vectors.append(embedding)
+        self.row_by_id[image_id] = row
+        self._live = None
+        self.generation += 1
+        return row
+
+    def _apply_remove(self, image_id: str) -> int:
+        row = self.row_by_id.pop(image_id)
+        self.deleted.add(row)
+        self._live = None
+        self.generation += 1
+        return row
+
+    def _log(self, record: Dict[str, Any]):
+        if self._wal is None:
+            os.makedirs(self.wal_dir, exist_ok=True)
+            self._wal = open(self.wal_path, "ab")
+        record["ts"] = time.time()
+        self._wal.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self.wal_records += 1
+
+    # 재생 / 압축
+    def replay(self) -> Optional[np.ndarray]:
+        """
+        현재 스냅샷 버전의 WAL 을 메모리에 재생
+
+        Returns:
+            추가된 행들의 임베딩 (행 순서, 인덱스에 그대로 add) 또는 None
+        """
+        for name in sorted(os.listdir(self.wal_dir)) if os.path.isdir(self.wal_dir) else []:
+            if name.endswith(".log") and name != os.path.basename(self.wal_path):
+                print(f"[catalog] 현재 스냅샷({self.version})과 무관한 WAL 무시: {name}")
+        if not os.path.exists(self.wal_path):
+            return None
+
+        first_new_row = len(self)
+        with self.lock, open(self.wal_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 기록 도중 중단된 마지막 줄
+                    print(f"[catalog] WAL {line_no}번째 줄 손상, 이후 레코드 무시")
+                    break
+                self._apply_record(record)
+                self.wal_records += 1
+                self.stats["replayed"] += 1
+
+        print(f"[catalog] WAL 재생 완료: {self.wal_records}개 레코드, 추가 행 {len(self) - first_new_row}개, "
+              f"삭제 행 {len(self.deleted)}개")
+        if len(self) == first_new_row:
+            return None
+        return self.vectors.extra[first_new_row - self.base_size:]
+
+    def _apply_record(self, record: Dict[str, Any]):
+        op, image_id = record["op"], record["id"]
+        if op in ("remove", "update") and image_id in self.row_by_id:
+            self._apply_remove(image_id)
+        if op in ("add", "update") and image_id not in self.row_by_id:
+            embedding = np.frombuffer(base64.b64decode(record["emb"]), dtype=np.float32)
+            self._apply_add(image_id, record["file"], record.get("caption", ""),
+                            record.get("meta") or {}, embedding)
+
+    def _maybe_compact(self):
+        if self.compact_every <= 0 or self.wal_records < self.compact_every or self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_in_background, name="catalog-compact", daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"[catalog] 자동 압축 실패: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self, index_type: Optional[str] = None) -> str:
+        """살아있는 행만 새 아티팩트로 압축하고 WAL 교체. 새 버전 디렉터리 경로 반환"""
+        started = time.time()
+        with self.lock:
+            if not self.vectors.complete and self.base_embeddings_fn is not None:
+                self.vectors.base = self.base_embeddings_fn()
+            if not self.vectors.complete:
+                raise RuntimeError("스냅샷 임베딩을 구할 수 없어 압축할 수 없습니다 (아티팩트를 먼저 빌드하세요)")
+            live_rows = np.array([r for r in range(len(self)) if r not in self.deleted], dtype=np.int64)
+            files = [self.image_file(r) for r in live_rows]
+            captions = [self.caption(r) for r in live_rows]
+            ids = [self.image_id(r) for r in live_rows]
+            metas = [self.image_meta(r) for r in live_rows]
+            infos = [self.image_info(r) or {} for r in live_rows]
+            old_wal = self.wal_path
+            wal_offset = self._wal.tell() if self._wal is not None else (
+                os.path.getsize(old_wal) if os.path.exists(old_wal) else 0
+            )
+            embeddings = self.vectors[live_rows]
+
+        # 무거운 작업(임베딩 기록 + 인덱스 빌드)은 lock 밖에서
+        path = write_artifact(
+            embeddings, files, captions, root=self.root, index_type=index_type,
+            extra_columns={
+                "image_ids": ids,
+                "image_meta": [json.dumps(m, ensure_ascii=False) if m else "" for m in metas],
+                **info_columns(infos),
+            },
+            sources={"compacted_from": self.version, "wal_records": self.wal_records},
+            set_current=False,
+        )
+        new_version = os.path.basename(path)
+
+        with self.lock:
+            # 압축 중 들어온 레코드를 새 WAL 로 옮긴 뒤 CURRENT 교체 (그 전에 죽으면 이전 스냅샷+WAL 유지)
+            tail = b""
+            if os.path.exists(old_wal):
+                with open(old_wal, "rb") as f:
+                    f.seek(wal_offset)
+                    tail = f.read()
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            self.version = new_version
+            if tail:
+                os.makedirs(self.wal_dir, exist_ok=True)
+                with open(self.wal_path, "wb") as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+            _write_current(self.root, new_version)
+            if os.path.exists(old_wal):
+                os.remove(old_wal)
+            self.wal_records = tail.count(b"\n")
+            self.stats["compactions"] += 1
+            self.stats["last_compaction"] = time.time()
+
+        print(f"[catalog] 압축 완료: {new_version} ({len(live_rows)}개 행, {time.time() - started:.1f}초)")
+        return path
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "rows": len(self),
+            "base_rows": self.base_size,
+            "added_rows": len(self.extra_files),
+            "deleted_rows": len(self.deleted),
+            "live_rows": len(self) - len(self.deleted),
+            "wal_path": self.wal_path,
+            "wal_records": self.wal_records,
+            "compact_every": self.compact_every,
+            "compacting": self._compacting,
+            **self.stats,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 카탈로그 변경 로그(WAL) 관리")
+    parser.add_argument("command", choices=("status", "compact"))
+    parser.add_argument("--image-dir", default="app/img_search/only_product_images")
+    parser.add_argument("--index-type", help="압축 시 인덱스 타입 (기본: IMAGE_INDEX_TYPE)")
+    args = parser.parse_args()
+
+    from .data_loader import DataLoader
+
+    loader = DataLoader(args.image_dir)
+    loader.load_data()
+    store = loader.load_catalog_store()
+    if args.command == "compact":
+        store.compact_every = 0
+        store.compact(args.index_type)
+    print(json.dumps(store.metrics(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+분리된 의류 이미지(상의/하의 크롭) 저장소
+
+고급 검색이 만든 크롭을 JPEG 로 한 번 인코딩해 메모리에 둔다.
+  - 내용 주소: 파일명은 <prefix>_<sha1 앞 16자>.jpg (같은 크롭은 한 항목 공유)
+  - 크기 상한(CROP_STORE_MAX_MB) 초과 시 오래 안 쓰인 항목부터, TTL(CROP_STORE_TTL_SECONDS) 지나면 제거
+  - CROP_STORE_PERSIST=true 면 별도 스레드가 디렉터리에 비동기 저장하고,
+    CROP_PERSIST_MAX_AGE_SECONDS 보다 오래된 파일은 주기적으로 정리한다
+/api/images/separated/{filename} 은 메모리 → 디스크 순으로 찾는다.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import (
+    CROP_STORE_MAX_MB, CROP_STORE_TTL_SECONDS, CROP_STORE_PERSIST,
+    CROP_PERSIST_MAX_AGE_SECONDS, CROP_JPEG_QUALITY,
+)
+
+SEPARATED_DIR = "app/img_search/separated_images"
+GC_INTERVAL_SECONDS = 600
+
+
+class CropStore:
+    """크기 상한 + TTL 이 있는 내용 주소 JPEG 저장소 (스레드 안전)"""
+
+    def __init__(self, max_bytes: int = int(CROP_STORE_MAX_MB * 1e6), ttl_seconds: float = CROP_STORE_TTL_SECONDS,
+                 persist_dir: Optional[str] = SEPARATED_DIR if CROP_STORE_PERSIST else None,
+                 persist_max_age: float = CROP_PERSIST_MAX_AGE_SECONDS, quality: int = CROP_JPEG_QUALITY):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.persist_dir = persist_dir
+        self.persist_max_age = persist_max_age
+        self.quality = quality
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # filename -> (jpeg bytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crop-persist") if persist_dir else None
+        self._last_gc = 0.0
+        self.stats = {"puts": 0, "dedup": 0, "hits": 0, "disk_hits": 0, "misses": 0,
+                      "evicted": 0, "expired": 0, "persisted": 0, "gc_removed": 0}
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+        # 이전 버전이 동기 저장으로 쌓아 둔 파일 정리 (시작 시 1회, 백그라운드)
+        threading.Thread(target=self.collect_garbage, name="crop-gc", daemon=True).start()
+
+    def put(self, image: Union[Image.Image, np.ndarray], prefix: str) -> str:
+        """크롭을 JPEG 로 인코딩해 저장하고 파일명 반환"""
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=self.quality)
+        data = buffer.getvalue()
+        filename = f"{prefix}_{hashlib.sha1(data).hexdigest()[:16]}.jpg"
+
+        with self._lock:
+            self.stats["puts"] += 1
+            expires_at = time.time() + self.ttl_seconds
+            if filename in self._entries:
+                self.stats["dedup"] += 1
+                self._entries[filename] = (data, expires_at)
+                self._entries.move_to_end(filename)
+                return filename
+            self._entries[filename] = (data, expires_at)
+            self._bytes += len(data)
+            self._evict()
+
+        if self._writer is not None:
+            self._writer.submit(self._persist, filename, data)
+        return filename
+
+    def get(self, filename: str) -> Optional[bytes]:
+        """파일명으로 JPEG 바이트 조회 (메모리 → 디스크, 없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None:
+                if entry[1] >= time.time():
+                    self._entries.move_to_end(filename)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                self._drop(filename)
+                self.stats["expired"] += 1
+
+        path = os.path.join(self.persist_dir or SEPARATED_DIR, filename)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return data
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _drop(self, filename: str):
+        data, _ = self._entries.pop(filename)
+        self._bytes -= len(data)
+
+    def _evict(self):
+        """만료 항목 제거 후 크기 상한까지 LRU 제거 (락 보유 상태에서 호출)"""
+        now = time.time()
+        for filename in [f for f, (_, expires_at) in self._entries.items() if expires_at < now]:
+            self._drop(filename)
+            self.stats["expired"] += 1
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    def _persist(self, filename: str, data: bytes):
+        """디스크 저장 (임시 파일 → rename) + 주기적 디렉터리 정리"""
+        try:
+            path = os.path.join(self.persist_dir, filename)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self.stats["persisted"] += 1
+            if time.time() - self._last_gc >= GC_INTERVAL_SECONDS:
+                self.collect_garbage()
+        except OSError as e:
+            print(f"[crop-store] 저장 실패 ({filename}): {e}")
+
+    def collect_garbage(self, max_age: Optional[float] = None) -> int:
+        """디렉터리에서 max_age(기본 CROP_PERSIST_MAX_AGE_SECONDS)보다 오래된 크롭 파일 삭제"""
+        directory = self.persist_dir or SEPARATED_DIR
+        max_age = self.persist_max_age if max_age is None else max_age
+        self._last_gc = time.time()
+        if not os.path.isdir(directory):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in os.scandir(directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            self.stats["gc_removed"] += removed
+            print(f"[crop-store] 오래된 분리 이미지 {removed}개 정리: {directory}")
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._bytes / 1e6, 2),
+                "max_mb": round(self.max_bytes / 1e6, 2),
+                "ttl_seconds": self.ttl_seconds,
+                "persist_dir": self.persist_dir,
+                **self.stats,
+            }
+
+
+# 전역 저장소 인스턴스
+_crop_store = None
+_crop_store_lock = threading.Lock()
+
+def get_crop_store() -> CropStore:
+    """분리 이미지 저장소 인스턴스 반환 (싱글톤 패턴)"""
+    global _crop_store
+    with _crop_store_lock:
+        if _crop_store is None:
+            _crop_store = CropStore()
+    return _crop_store
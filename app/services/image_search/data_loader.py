@@ -4,11 +4,18 @@
 import os
 import numpy as np
 import pandas as pd
-import faiss
 import pickle
-from transformers import CLIPProcessor, CLIPModel
 from typing import Dict, Any, Optional
 
+from app.core.config import IMAGE_INDEX_MMAP, IMAGE_SOURCE_EMBEDDINGS_PATH
+from app.services.model_registry import CLIP_MODEL_NAME, get_model
+
+from .ann_index import build_index, load_index, stores_exact_vectors
+from .catalog_artifact import load_artifact
+from .catalog_store import CatalogStore
+from .image_info import IMAGE_INFO_COLUMNS, probe_image_info
+from .product_catalog import ProductCatalog, get_product_catalog
+
 
 class DataLoader:
     """데이터 로딩 클래스"""
@@ -16,52 +23,43 @@ class DataLoader:
     def __init__(self, image_dir: str = "app/img_search/only_product_images"):
         self.image_dir = image_dir
         self.metadata = None
+        self.artifact = None
+        self.source_files = {}
+        self.catalog_store = None
         self.index = None
+        self.index_path = None
+        self.index_mmap = False
         self.merged = None
-        self.product_df = None
+        self.source_embeddings_path = None
+        self.product_catalog = None
         self.clip_model = None
+        self.clip_model_name = None
         self.clip_processor = None
     
     def load_data(self):
         """데이터 로드"""
         try:
+            # 1순위: 바이너리 카탈로그 아티팩트 (mmap, 프로세스 간 페이지 공유)
+            self.artifact = load_artifact()
+            if self.artifact is not None:
+                self.metadata = self.artifact.metadata
+                self.index = self.artifact.index
+                print(f"카탈로그 아티팩트 로드 완료: {self.artifact.version}, {self.index.ntotal}개 이미지")
+                return
+
             # 처리된 데이터가 있는지 확인
             processed_dir = "app/img_search/processed"
             if os.path.exists(os.path.join(processed_dir, "metadata.pkl")):
                 print("처리된 데이터 로드 중...")
                 with open(os.path.join(processed_dir, "metadata.pkl"), "rb") as f:
                     self.metadata = pickle.load(f)
-                self.index = faiss.read_index(os.path.join(processed_dir, "faiss_index.bin"))
+                self.index_path = os.path.join(processed_dir, "faiss_index.bin")
+                self.index_mmap = IMAGE_INDEX_MMAP
+                self.index = load_index(self.index_path, mmap=self.index_mmap)
                 print(f"처리된 데이터 로드 완료: {len(self.metadata['image_files'])}개 이미지")
             else:
                 print("원본 데이터에서 로드 중...")
-                # 원본 CSV 파일 로드
-                caption_csv = "app/img_search/only_product_caption.csv"
-                image_csv = "app/img_search/image_embedding.csv"
-                
-                # CSV 파일 존재 확인
-                if not os.path.exists(caption_csv):
-                    caption_csv = "app/img_search/caption(fashion-clip)_embedding.csv"
-
-                caption_df = pd.read_csv(caption_csv)
-                image_df = pd.read_csv(image_csv)
-                
-                # 데이터 병합
-                self.merged = pd.merge(image_df, caption_df, on="image_file")
-                print(f"병합된 데이터 크기: {self.merged.shape}")
-                
-                # 디렉터리 존재 파일 집합 확인
-                try:
-                    available_files = {
-                        f.lower() for f in os.listdir(self.image_dir)
-                        if os.path.isfile(os.path.join(self.image_dir, f))
-                    }
-                except FileNotFoundError:
-                    available_files = set()
-
-                # 실제 존재하는 파일만 유지
-                self.merged = self.merged[self.merged["image_file"].str.lower().isin(available_files)].reset_index(drop=True)
-                print(f"실제 파일 존재 필터링 후: {self.merged.shape}")
+                self.load_csv_sources()
                 
                 # FAISS 인덱스 구축
                 self.build_faiss_index()
@@ -70,27 +68,133 @@ class DataLoader:
             print(f"데이터 로드 실패: {e}")
             raise e
     
+    def load_csv_sources(self):
+        """원본 CSV(이미지 임베딩 + 캡션) 병합 및 실제 파일 존재 필터링"""
+        caption_csv = "app/img_search/only_product_caption.csv"
+        image_csv = "app/img_search/image_embedding.csv"
+        
+        # CSV 파일 존재 확인
+        if not os.path.exists(caption_csv):
+            caption_csv = "app/img_search/caption(fashion-clip)_embedding.csv"
+        self.source_files = {"caption_csv": caption_csv, "image_csv": image_csv}
+
+        caption_df = pd.read_csv(caption_csv)
+        # 임베딩 컬럼은 처음부터 float32 로 읽어 float64 프레임을 만들지 않음
+        image_df = pd.read_csv(image_csv, dtype={str(i): np.float32 for i in range(1, 513)})
+        
+        # 데이터 병합
+        self.merged = pd.merge(image_df, caption_df, on="image_file")
+        print(f"병합된 데이터 크기: {self.merged.shape}")
+        
+        # 디렉터리 존재 파일 집합 확인
+        try:
+            available_files = {
+                f.lower() for f in os.listdir(self.image_dir)
+                if os.path.isfile(os.path.join(self.image_dir, f))
+            }
+        except FileNotFoundError:
+            available_files = set()
+
+        # 실제 존재하는 파일만 유지
+        self.merged = self.merged[self.merged["image_file"].str.lower().isin(available_files)].reset_index(drop=True)
+        print(f"실제 파일 존재 필터링 후: {self.merged.shape}")
+    
+    def merged_embeddings(self) -> np.ndarray:
+        """병합 데이터에서 L2 정규화된 float32 이미지 임베딩 추출"""
+        # 이미지 임베딩 컬럼 확인
+        img_cols = [str(i) for i in range(1, 513)]
+        available_img_cols = [c for c in img_cols if c in self.merged.columns]
+        
+        # 이미지 임베딩 사용 (원래대로)
+        if not available_img_cols:
+            raise ValueError("사용 가능한 임베딩이 없습니다")
+        print(f"이미지 임베딩 기반 인덱스 구축: {len(available_img_cols)}개 차원")
+        embeddings = self.merged[available_img_cols].values.astype(np.float32)
+        
+        # 정규화
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
+    def merged_captions(self) -> list:
+        """병합 데이터의 캡션 목록 (predicted_caption → caption 순)"""
+        for col in ("predicted_caption", "caption"):
+            if col in self.merged.columns:
+                return self.merged[col].fillna("").astype(str).tolist()
+        return [""] * len(self.merged)
+    
+    def snapshot_embeddings(self, allow_copy: bool = True) -> Optional[np.ndarray]:
+        """
+        스냅샷(WAL 반영 전) 이미지 임베딩
+        (아티팩트 mmap → 보관 .npy mmap → 원본 CSV → 정확 벡터 인덱스 복원, 없으면 None)
+
+        allow_copy=False 면 추가 메모리가 드는 경로(CSV 재계산/인덱스 복원)는 건너뛴다.
+        sq / pq 인덱스는 양자화된 근사 벡터만 복원되므로 출처로 쓰지 않는다
+        (압축 시 새 아티팩트에 손실 벡터가 영구히 기록되는 것을 방지).
+        """
+        if self.artifact is not None:
+            return self.artifact.embeddings
+        if self.source_embeddings_path is not None:
+            return np.load(self.source_embeddings_path, mmap_mode="r")
+        if not allow_copy:
+            return None
+        if self.merged is not None:
+            return self.merged_embeddings()
+        if self.index is not None and stores_exact_vectors(self.index):
+            base_size = self.catalog_store.base_size if self.catalog_store is not None else self.index.ntotal
+            return self.index.reconstruct_n(0, base_size)
+        return None
+    
+    def catalog_embeddings(self, allow_copy: bool = True):
+        """WAL 추가 행까지 포함한 행 순서 임베딩 (RowEmbeddings, 스냅샷 임베딩을 못 구하면 None)"""
+        vectors = self.catalog_store.vectors
+        if not vectors.complete and allow_copy:
+            vectors.base = self.snapshot_embeddings(allow_copy=True)
+        return vectors if vectors.complete else None
+    
+    def catalog_image_files(self) -> list:
+        """벡터 행 순서의 이미지 파일명 목록"""
+        return self.catalog_store.image_files()
+    
+    def catalog_captions(self) -> list:
+        """벡터 행 순서의 캡션 목록"""
+        return self.catalog_store.captions()
+    
+    def load_catalog_store(self) -> CatalogStore:
+        """스냅샷 행 위에 변경 로그(WAL)를 재생하고 추가 벡터를 인덱스에 반영"""
+        if self.metadata:
+            image_files, captions = self.metadata['image_files'], self.metadata['captions']
+        elif self.merged is not None:
+            image_files, captions = self.merged["image_file"].astype(str).tolist(), self.merged_captions()
+        else:
+            image_files, captions = [], []
+        
+        columns = self.artifact.columns if self.artifact is not None else {}
+        if all(name in columns for name in IMAGE_INFO_COLUMNS):
+            image_info = {name: columns[name] for name in IMAGE_INFO_COLUMNS}
+        else:
+            # 이전 아티팩트/CSV 경로: 시작 시 한 번 헤더만 읽어 채움 (아티팩트를 다시 빌드하면 생략)
+            print("이미지 크기 정보가 카탈로그에 없어 시작 시 수집합니다 (catalog_artifact build 로 미리 기록 가능)")
+            image_info = probe_image_info(self.image_dir, image_files)
+        self.catalog_store = CatalogStore(
+            image_files, captions, self.index.d,
+            image_ids=columns.get("image_ids"),
+            image_meta=columns.get("image_meta"),
+            image_info=image_info,
+            version=self.artifact.version if self.artifact is not None else "base",
+            base_embeddings=self.snapshot_embeddings(allow_copy=False),
+            base_embeddings_fn=lambda: self.snapshot_embeddings(allow_copy=True),
+        )
+        added = self.catalog_store.replay()
+        if added is not None:
+            self.ensure_writable_index().add(np.ascontiguousarray(added, dtype=np.float32))
+        return self.catalog_store
+    
     def build_faiss_index(self):
         """FAISS 인덱스 구축 (원본 데이터용)"""
         try:
-            # 이미지 임베딩 컬럼 확인
-            img_cols = [str(i) for i in range(1, 513)]
-            available_img_cols = [c for c in img_cols if c in self.merged.columns]
-            
-            # 이미지 임베딩 사용 (원래대로)
-            if available_img_cols:
-                print(f"이미지 임베딩 기반 인덱스 구축: {len(available_img_cols)}개 차원")
-                embeddings = self.merged[available_img_cols].values.astype(np.float32)
-            else:
-                raise ValueError("사용 가능한 임베딩이 없습니다")
-            
-            # 정규화
-            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = self.merged_embeddings()
             
-            # FAISS 인덱스 생성
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(dimension)
-            self.index.add(embeddings)
+            # FAISS 인덱스 생성 (IMAGE_INDEX_TYPE 설정에 따름)
+            self.index = build_index(embeddings)
             
             print(f"FAISS 인덱스 구축 완료: {self.index.ntotal}개 벡터")
             
@@ -98,59 +202,74 @@ class DataLoader:
             print(f"FAISS 인덱스 구축 실패: {e}")
             raise e
     
+    def ensure_writable_index(self):
+        """mmap(읽기 전용) 인덱스를 수정 가능한 메모리 사본으로 교체"""
+        if self.artifact is not None and self.artifact.index_mmap:
+            self.index = self.artifact.read_index(mmap=False)
+            self.artifact.index = self.index
+            self.artifact.index_mmap = False
+            print("mmap 인덱스를 수정 가능한 사본으로 전환")
+        elif self.index_mmap and self.index_path:
+            self.index = load_index(self.index_path, mmap=False)
+            self.index_mmap = False
+            print("mmap 인덱스를 수정 가능한 사본으로 전환")
+        return self.index
+    
+    def release_sources(self):
+        """
+        인덱스/카탈로그 저장소 구축 후 원본 병합 DataFrame(임베딩 중복 사본) 해제
+
+        파일명/캡션은 카탈로그 저장소가 들고 있다. 임베딩은 인덱스가 원본 벡터를 저장하면
+        (flat / hnsw / direct map ivf_flat) 인덱스에서 복원하고, sq / pq 등 손실 압축이나
+        복원 불가 인덱스면 float32 임베딩을 .npy 로 기록한 뒤 해제한다 (기록 실패 시 유지).
+        """
+        if self.merged is None:
+            return
+        if self.artifact is None and not stores_exact_vectors(self.index):
+            try:
+                os.makedirs(os.path.dirname(IMAGE_SOURCE_EMBEDDINGS_PATH) or ".", exist_ok=True)
+                np.save(IMAGE_SOURCE_EMBEDDINGS_PATH, self.merged_embeddings())
+                self.source_embeddings_path = IMAGE_SOURCE_EMBEDDINGS_PATH
+                print(f"스냅샷 임베딩 보관: {IMAGE_SOURCE_EMBEDDINGS_PATH}")
+            except OSError as e:
+                print(f"스냅샷 임베딩 기록 실패로 원본 병합 데이터를 유지합니다: {e}")
+                return
+        freed = self.merged.memory_usage(deep=True).sum()
+        self.merged = None
+        print(f"원본 병합 데이터 해제: {freed / 1e6:.1f}MB")
+    
     def load_product_metadata(self):
-        """상품 메타데이터 로드"""
+        """상품 메타데이터 로드 (공유 ProductCatalog)"""
         try:
-            product_csv = "app/img_search/product.csv"
-            if os.path.exists(product_csv):
-                self.product_df = pd.read_csv(product_csv)
-                print(f"상품 메타데이터 로드 완료: {self.product_df.shape}")
-            else:
-                print("product.csv 파일이 없습니다. 메타데이터 없이 진행합니다.")
-                self.product_df = None
+            self.product_catalog = get_product_catalog()
         except Exception as e:
             print(f"상품 메타데이터 로드 실패: {e}")
-            self.product_df = None
+            self.product_catalog = ProductCatalog()
     
     def load_clip_model(self):
         """CLIP 모델 로드"""
         try:
-            model_name = "openai/clip-vit-base-patch32"
-            self.clip_model = CLIPModel.from_pretrained(model_name)
-            self.clip_processor = CLIPProcessor.from_pretrained(model_name)
-            print(f"CLIP 모델 로드 완료: {model_name}")
+            # 모델 레지스트리의 공유 인스턴스 (카테고리 분류와 같은 체크포인트)
+            self.clip_model_name = CLIP_MODEL_NAME
+            self.clip_model, self.clip_processor = get_model("clip")
+            print(f"CLIP 모델 로드 완료: {CLIP_MODEL_NAME}")
         except Exception as e:
             print(f"CLIP 모델 로드 실패: {e}")
             raise e
     
     def get_product_info(self, product_id: str) -> Dict[str, Any]:
-        """특정 상품 정보 조회"""
-        if self.product_df is None:
+        """특정 상품 정보 조회 (해시 인덱스 O(1))"""
+        if self.product_catalog is None:
             return {}
-        
-        try:
-            product_row = self.product_df[self.product_df["product_id"].astype(str) == product_id]
-            if not product_row.empty:
-                row = product_row.iloc[0]
-                return {
-                    "product_name": str(row.get("product_name", "")),
-                    "price": int(row.get("price", 0)) if pd.notna(row.get("price", 0)) else 0,
-                    "rating_avg": float(row.get("rating_avg", 0)) if pd.notna(row.get("rating_avg", 0)) else 0.0,
-                    "reviews_count": int(row.get("reviews_count", 0)) if pd.notna(row.get("reviews_count", 0)) else 0,
-                    "hearts": int(row.get("hearts", 0)) if pd.notna(row.get("hearts", 0)) else 0,
-                    "views_1m": int(row.get("views_1m", 0)) if pd.notna(row.get("views_1m", 0)) else 0,
-                    "sales_cum": int(row.get("sales_cum", 0)) if pd.notna(row.get("sales_cum", 0)) else 0,
-                    "brand": str(row.get("brand", "")),
-                    "category_l1": str(row.get("category_l1", "")),
-                    "gender": str(row.get("gender", ""))
-                }
-        except Exception as e:
-            print(f"상품 정보 조회 실패 {product_id}: {e}")
-        
-        return {}
+        return self.product_catalog.get(product_id)
     
     def get_image_file_info(self, idx: int) -> Dict[str, Any]:
         """인덱스로 이미지 파일 정보 조회"""
+        if self.catalog_store is not None:
+            return {
+                "img_file": self.catalog_store.image_file(idx),
+                "caption": self.catalog_store.caption(idx)
+            }
         if hasattr(self, 'metadata') and self.metadata:
             return {
                 "img_file": self.metadata['image_files'][idx],
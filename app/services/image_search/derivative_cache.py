@@ -0,0 +1,286 @@
+"""
+상품 이미지 파생본(derivative) 디스크 캐시 (GET /api/images/file/{filename})
+
+원본을 크기 프리셋(size) / 포맷(format)별로 한 번만 렌더링해 두고 그대로 내보낸다.
+  - display: 기존 표시용 (짧은 변 600px 미만이면 LANCZOS 확대, 축소 없음) — 기본값
+  - thumb / grid / detail: 긴 변 256 / 600 / 1200px 이하로 축소 (확대 없음)
+  - 포맷: jpeg, webp (라우트는 Accept 헤더에 image/webp 가 있으면 webp)
+  - 키: 원본 파일명 + mtime_ns + 크기 + 프리셋/포맷 파라미터의 SHA1 → 원본이 바뀌면 새 키
+  - ETag: 키 그대로 (strong). stat 만으로 계산되므로 304 응답은 렌더링 없이 가능
+  - 파일: <IMAGE_DERIVATIVE_DIR>/<원본 파일명>/<size>.<키>.<확장자>
+    (새 키를 만들면 같은 원본/프리셋/포맷의 이전 파생본 삭제, 원본별 디렉터리만 훑음)
+
+전체 디렉터리 사전 생성 (변경 없는 파일은 건너뜀):
+    python -m app.services.image_search.derivative_cache --sizes thumb,grid,detail,display --formats jpeg,webp
+"""
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import IMAGE_DERIVATIVE_DIR, IMAGE_DERIVATIVE_WORKERS
+
+# 크기 프리셋: min_side 미만이면 확대, max_side 초과면 축소 (0 은 해당 없음)
+DERIVATIVE_SIZES = {
+    "display": {"min_side": 600, "max_side": 0},
+    "thumb": {"min_side": 0, "max_side": 256},
+    "grid": {"min_side": 0, "max_side": 600},
+    "detail": {"min_side": 0, "max_side": 1200},
+}
+DEFAULT_SIZE = "display"
+
+# 포맷: (PIL 포맷, media type, 확장자, 저장 옵션)
+DERIVATIVE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg", {"quality": 95, "optimize": True}),
+    "webp": ("WEBP", "image/webp", "webp", {"quality": 85, "method": 4}),
+}
+DEFAULT_FORMAT = "jpeg"
+
+# 렌더링 코드가 바뀌면 올려 전체 무효화 (파라미터 변경은 키에 자동 반영)
+TRANSFORM_VERSION = 1
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def render_derivative(source_path: str, size: str = DEFAULT_SIZE, fmt: str = DEFAULT_FORMAT) -> bytes:
+    """원본 → 프리셋 크기/포맷으로 인코딩한 바이트"""
+    preset = DERIVATIVE_SIZES[size]
+    pil_format, _, _, save_options = DERIVATIVE_FORMATS[fmt]
+    with Image.open(source_path) as img:
+        if preset["max_side"]:
+            # JPEG 는 DCT 단계에서 먼저 줄여 디코딩 (목표 크기 이상 유지)
+            img.draft("RGB", (preset["max_side"], preset["max_side"]))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        min_side, max_side = preset["min_side"], preset["max_side"]
+        if min_side and (img.width < min_side or img.height < min_side):
+            # 비율 유지하면서 최소 min_side 로 업스케일링
+            ratio = max(min_side / img.width, min_side / img.height)
+            img = img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+        elif max_side and max(img.size) > max_side:
+            ratio = max_side / max(img.size)
+            new_size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format=pil_format, **save_options)
+        return buffer.getvalue()
+
+
+def parse_if_none_match(header: Optional[str]) -> set:
+    """If-None-Match 헤더 → ETag 값 집합 (W/ 접두사 제거, '*' 유지)"""
+    if not header:
+        return set()
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Accept 헤더로 포맷 선택 (image/webp 를 q>0 으로 받으면 webp, 아니면 jpeg)"""
+    for part in (accept or "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        if media_type.strip().lower() != "image/webp":
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        return "webp"
+    return DEFAULT_FORMAT
+
+
+def media_type(fmt: str) -> str:
+    return DERIVATIVE_FORMATS[fmt][1]
+
+
+class DerivativeCache:
+    """원본 stat + 변환 파라미터로 내용 주소를 매기는 파생본 디스크 캐시 (스레드 안전)"""
+
+    def __init__(self, directory: str = IMAGE_DERIVATIVE_DIR):
+        self.directory = directory
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self.stats = {"hits": 0, "renders": 0, "not_modified": 0, "errors": 0, "pruned": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, source_path: str, size: str = DEFAULT_SIZE, fmt: str = DEFAULT_FORMAT) -> str:
+        """원본 파일명/mtime/크기 + 프리셋/포맷 파라미터 SHA1 (앞 20자)"""
+        st = os.stat(source_path)
+        raw = (f"{os.path.basename(source_path)}:{st.st_mtime_ns}:{st.st_size}:"
+               f"{size}:{sorted(DERIVATIVE_SIZES[size].items())}:"
+               f"{fmt}:{sorted(DERIVATIVE_FORMATS[fmt][3].items())}:{TRANSFORM_VERSION}")
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def etag(self, source_path: str, size: str = DEFAULT_SIZE, fmt: str = DEFAULT_FORMAT) -> str:
+        return f'"{self.key(source_path, size, fmt)}"'
+
+    def _source_dir(self, source_path: str) -> str:
+        return os.path.join(self.directory, os.path.basename(source_path))
+
+    def path_for(self, source_path: str, key: str, size: str = DEFAULT_SIZE, fmt: str = DEFAULT_FORMAT) -> str:
+        return os.path.join(self._source_dir(source_path), f"{size}.{key}.{DERIVATIVE_FORMATS[fmt][2]}")
+
+    def not_modified(self, source_path: str, if_none_match: Optional[str],
+                     size: str = DEFAULT_SIZE, fmt: str = DEFAULT_FORMAT) -> bool:
+        """If-None-Match 가 현재 ETag 와 일치하는지 (일치하면 304)"""
+        tags = parse_if_none_match(if_none_match)
+        if tags and ("*" in tags or self.etag(source_path, size, fmt) in tags):
+            self.stats["not_modified"] += 1
+            return True
+        return False
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get_or_render(self, source_path: str, size: str = DEFAULT_SIZE,
+                      fmt: str = DEFAULT_FORMAT) -> Tuple[str, str, bool]:
+        """
+        (파생본 파일 경로, ETag, 이번에 렌더링했는지).
+        없으면 렌더링 후 저장 (같은 키 동시 요청은 한 번만 렌더링)
+        """
+        key = self.key(source_path, size, fmt)
+        path = self.path_for(source_path, key, size, fmt)
+        if os.path.isfile(path):
+            self.stats["hits"] += 1
+            return path, f'"{key}"', False
+
+        rendered = False
+        with self._key_lock(key):
+            if not os.path.isfile(path):
+                try:
+                    data = render_derivative(source_path, size, fmt)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                except Exception:
+                    self.stats["errors"] += 1
+                    raise
+                self.stats["renders"] += 1
+                rendered = True
+                self._prune(source_path, size, fmt, keep=path)
+            else:
+                self.stats["hits"] += 1
+        with self._locks_lock:
+            self._locks.pop(key, None)
+        return path, f'"{key}"', rendered
+
+    def _prune(self, source_path: str, size: str, fmt: str, keep: str):
+        """같은 원본/프리셋/포맷의 이전 파생본 삭제 (원본이 바뀌었거나 변환 파라미터가 바뀐 경우)"""
+        prefix = f"{size}."
+        suffix = f".{DERIVATIVE_FORMATS[fmt][2]}"
+        for entry in os.scandir(os.path.dirname(keep)):
+            if entry.name.startswith(prefix) and entry.name.endswith(suffix) and entry.path != keep:
+                try:
+                    os.remove(entry.path)
+                    self.stats["pruned"] += 1
+                except OSError:
+                    pass
+
+    def metrics(self) -> Dict[str, Any]:
+        requests = self.stats["hits"] + self.stats["renders"]
+        return {
+            "directory": self.directory,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / requests, 4) if requests else 0.0,
+        }
+
+
+# 전역 캐시 인스턴스
+_derivative_cache = None
+_derivative_cache_lock = threading.Lock()
+
+def get_derivative_cache() -> DerivativeCache:
+    """파생본 캐시 인스턴스 반환 (싱글톤 패턴, 사전 생성 워커 프로세스에서도 프로세스당 하나)"""
+    global _derivative_cache
+    with _derivative_cache_lock:
+        if _derivative_cache is None:
+            _derivative_cache = DerivativeCache()
+    return _derivative_cache
+
+
+# 사전 생성 (오프라인)
+def _build_one(task: Tuple[str, str, List[str], List[str]]) -> Dict[str, Any]:
+    """워커 프로세스: 원본 한 장의 모든 프리셋/포맷 생성"""
+    source_path, directory, sizes, formats = task
+    cache = DerivativeCache(directory)
+    result = {"rendered": 0, "skipped": 0, "bytes": 0, "source_bytes": os.path.getsize(source_path), "error": None}
+    for size in sizes:
+        for fmt in formats:
+            try:
+                path, _, rendered = cache.get_or_render(source_path, size, fmt)
+            except Exception as e:
+                result["error"] = f"{os.path.basename(source_path)} ({size}/{fmt}): {e}"
+                continue
+            result["rendered" if rendered else "skipped"] += 1
+            result["bytes"] += os.path.getsize(path)
+    return result
+
+
+def build_derivatives(image_dir: str, sizes: List[str], formats: List[str],
+                      directory: str = IMAGE_DERIVATIVE_DIR, workers: int = IMAGE_DERIVATIVE_WORKERS) -> Dict[str, Any]:
+    """디렉터리 전체 파생본 사전 생성 (프로세스 풀, 변경 없는 파일은 키가 같으므로 건너뜀)"""
+    names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+    os.makedirs(directory, exist_ok=True)
+    tasks = [(os.path.join(image_dir, n), directory, sizes, formats) for n in names]
+
+    started = time.time()
+    summary = {"images": len(names), "rendered": 0, "skipped": 0, "errors": 0,
+               "source_mb": 0.0, "derivative_mb": 0.0}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for i, result in enumerate(pool.map(_build_one, tasks, chunksize=16), 1):
+            summary["rendered"] += result["rendered"]
+            summary["skipped"] += result["skipped"]
+            summary["source_mb"] += result["source_bytes"] / 1e6
+            summary["derivative_mb"] += result["bytes"] / 1e6
+            if result["error"]:
+                summary["errors"] += 1
+                print(f"[derivatives] 생성 실패: {result['error']}")
+            if i % 500 == 0:
+                print(f"[derivatives] {i}/{len(names)}장 처리")
+    summary["seconds"] = round(time.time() - started, 1)
+    summary["source_mb"] = round(summary["source_mb"], 1)
+    summary["derivative_mb"] = round(summary["derivative_mb"], 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="상품 이미지 파생본(크기/포맷별) 사전 생성")
+    parser.add_argument("--images", default="app/img_search/only_product_images", help="원본 이미지 디렉터리")
+    parser.add_argument("--out", default=IMAGE_DERIVATIVE_DIR, help="파생본 디렉터리")
+    parser.add_argument("--sizes", default=",".join(DERIVATIVE_SIZES), help="프리셋 (쉼표 구분)")
+    parser.add_argument("--formats", default=",".join(DERIVATIVE_FORMATS), help="포맷 (쉼표 구분)")
+    parser.add_argument("--workers", type=int, default=IMAGE_DERIVATIVE_WORKERS, help="프로세스 수 (0=CPU 수)")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = [s for s in sizes if s not in DERIVATIVE_SIZES] + [f for f in formats if f not in DERIVATIVE_FORMATS]
+    if unknown:
+        raise SystemExit(f"알 수 없는 프리셋/포맷: {', '.join(unknown)}")
+
+    summary = build_derivatives(args.images, sizes, formats, args.out, args.workers)
+    print(f"\n파생본 생성 완료: 이미지 {summary['images']}장, 생성 {summary['rendered']}개, "
+          f"건너뜀 {summary['skipped']}개, 실패 {summary['errors']}장, {summary['seconds']}초")
+    print(f"원본 {summary['source_mb']}MB → 파생본 합계 {summary['derivative_mb']}MB")
+
+
+if __name__ == "__main__":
+    main()
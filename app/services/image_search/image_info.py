@@ -0,0 +1,54 @@
+"""
+카탈로그 이미지 크기/파일 정보
+
+인덱스(아티팩트) 빌드 시 이미지마다 가로/세로, 파일 크기, 포맷을 한 번 읽어
+카탈로그 컬럼(image_width, image_height, image_bytes, image_format)으로 저장한다.
+검색 시 고화질(500x600 이상) 우선 선택은 이 값으로 하므로 요청 경로에서 파일을 열지 않는다.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+IMAGE_INFO_COLUMNS = ("image_width", "image_height", "image_bytes", "image_format")
+
+# 고화질 기준: 가로 500 이상, 세로 600 이상
+HIGH_RES_MIN_WIDTH = 500
+HIGH_RES_MIN_HEIGHT = 600
+
+
+def probe_image(path: str) -> Dict[str, Any]:
+    """헤더만 읽어 {'width', 'height', 'bytes', 'format'} (읽을 수 없으면 0 / '')"""
+    try:
+        size = os.path.getsize(path)
+        with Image.open(path) as img:
+            return {"width": img.width, "height": img.height, "bytes": size, "format": img.format or ""}
+    except (OSError, ValueError):
+        return {"width": 0, "height": 0, "bytes": 0, "format": ""}
+
+
+def probe_image_info(image_dir: str, image_files: Sequence[str], workers: int = 8) -> Dict[str, Any]:
+    """이미지 목록 → 카탈로그 컬럼 (행 순서 유지)"""
+    paths = [os.path.join(image_dir, str(f)) for f in image_files]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-probe") as pool:
+        infos = list(pool.map(probe_image, paths))
+    missing = sum(1 for info in infos if not info["width"])
+    if missing:
+        print(f"이미지 정보를 읽지 못한 파일 {missing}개 (고화질 판정에서 제외)")
+    return info_columns(infos)
+
+
+def info_columns(infos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """행별 정보 dict 목록 → 컬럼 (숫자는 npy, 포맷은 문자열 컬럼)"""
+    return {
+        "image_width": np.array([i.get("width", 0) for i in infos], dtype=np.int32),
+        "image_height": np.array([i.get("height", 0) for i in infos], dtype=np.int32),
+        "image_bytes": np.array([i.get("bytes", 0) for i in infos], dtype=np.int64),
+        "image_format": [i.get("format", "") for i in infos],
+    }
+
+
+def is_high_res(info: Optional[Dict[str, Any]]) -> bool:
+    return bool(info) and info["width"] >= HIGH_RES_MIN_WIDTH and info["height"] >= HIGH_RES_MIN_HEIGHT
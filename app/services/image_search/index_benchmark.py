@@ -0,0 +1,171 @@
+"""
+ANN 인덱스 벤치마크: flat 기준 대비 recall@k / p50·p99 지연시간 / 메모리 비교
+
+사용 예:
+    python -m app.services.image_search.index_benchmark --k 10 --queries 500
+    python -m app.services.image_search.index_benchmark --types ivf_flat,hnsw --nprobe 4,16,64 --ef-search 32,128
+    python -m app.services.image_search.index_benchmark --types flat,sq_fp16,sq_int8,pq,hnsw
+    python -m app.services.image_search.index_benchmark --synthetic 200000
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import faiss
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+from .ann_index import INDEX_TYPES, build_index, configure_search, default_index_params, index_memory_bytes
+
+
+def load_catalog_embeddings(processed_dir: str = "app/img_search/processed",
+                            image_csv: str = "app/img_search/image_embedding.csv") -> np.ndarray:
+    """서비스와 동일한 카탈로그 임베딩 로드 (처리된 flat 인덱스 → CSV 순)"""
+    index_path = os.path.join(processed_dir, "faiss_index.bin")
+    if os.path.exists(index_path):
+        index = faiss.read_index(index_path)
+        if isinstance(faiss.downcast_index(index), faiss.IndexFlat):
+            return index.reconstruct_n(0, index.ntotal)
+        print("처리된 인덱스가 flat이 아니므로 CSV에서 임베딩을 로드합니다")
+
+    image_df = pd.read_csv(image_csv)
+    img_cols = [c for c in (str(i) for i in range(1, 513)) if c in image_df.columns]
+    embeddings = image_df[img_cols].values.astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def make_queries(embeddings: np.ndarray, n_queries: int, noise: float, seed: int) -> np.ndarray:
+    """카탈로그 벡터에 노이즈를 섞어 질의 생성 (자기 자신이 정답이 되는 것 방지)"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[picks] + rng.normal(0, noise, size=(len(picks), embeddings.shape[1])).astype(np.float32)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def recall_at_k(ground_truth: np.ndarray, found: np.ndarray) -> float:
+    """flat 결과 대비 recall@k"""
+    hits = sum(len(set(gt) & set(f[f >= 0])) for gt, f in zip(ground_truth, found))
+    return hits / ground_truth.size
+
+
+def measure_latency(index: faiss.Index, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    """서비스와 같은 배치 1 검색으로 지연시간 측정"""
+    latencies = []
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        _, I = index.search(queries[i:i + 1], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results[i] = I[0]
+    return {
+        "ids": results,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_benchmark(embeddings: np.ndarray, index_types: List[str], k: int = 10, n_queries: int = 500,
+                  nprobe_values: Optional[List[int]] = None, ef_search_values: Optional[List[int]] = None,
+                  params: Optional[Dict[str, Any]] = None, noise: float = 0.05, seed: int = 0) -> List[Dict[str, Any]]:
+    """인덱스 타입/검색 파라미터 조합별 recall@k, 지연시간, 빌드 시간, 인덱스 메모리 측정"""
+    base_params = default_index_params()
+    if params:
+        base_params.update({key: v for key, v in params.items() if v is not None})
+    queries = make_queries(embeddings, n_queries, noise, seed)
+    k = min(k, len(embeddings))
+
+    # flat 기준선
+    flat = build_index(embeddings, "flat")
+    baseline = measure_latency(flat, queries, k)
+    ground_truth = baseline["ids"]
+
+    rows = [{
+        "index": "flat", "params": "-", "recall": 1.0,
+        "p50_ms": baseline["p50_ms"], "p99_ms": baseline["p99_ms"], "build_s": 0.0,
+        "memory_mb": index_memory_bytes(flat) / 1e6,
+    }]
+
+    for index_type in index_types:
+        if index_type == "flat":
+            continue
+        t0 = time.perf_counter()
+        index = build_index(embeddings, index_type, base_params)
+        build_s = time.perf_counter() - t0
+        memory_mb = index_memory_bytes(index) / 1e6
+
+        if index_type in ("ivf_flat", "ivf_pq"):
+            sweep = [("nprobe", v) for v in (nprobe_values or [base_params["nprobe"]])]
+        elif index_type == "hnsw":
+            sweep = [("ef_search", v) for v in (ef_search_values or [base_params["ef_search"]])]
+        else:
+            # sq_fp16 / sq_int8 / pq: 전수 탐색이라 검색 파라미터 없음
+            sweep = [(None, None)]
+
+        for name, value in sweep:
+            if name is not None:
+                configure_search(index, {**base_params, name: value})
+            measured = measure_latency(index, queries, k)
+            rows.append({
+                "index": index_type,
+                "params": f"{name}={value}" if name is not None else "-",
+                "recall": recall_at_k(ground_truth, measured["ids"]),
+                "p50_ms": measured["p50_ms"],
+                "p99_ms": measured["p99_ms"],
+                "build_s": build_s,
+                "memory_mb": memory_mb,
+            })
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], k: int, n_vectors: int):
+    print(f"\n벡터 {n_vectors}개, recall@{k} (flat 기준)")
+    print(f"{'index':<10} {'params':<14} {'recall':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'build(s)':>9} {'mem(MB)':>9}")
+    for r in rows:
+        print(f"{r['index']:<10} {r['params']:<14} {r['recall']:>8.4f} {r['p50_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {r['build_s']:>9.2f} {r['memory_mb']:>9.2f}")
+
+
+def _int_list(value: Optional[str]) -> Optional[List[int]]:
+    return [int(v) for v in value.split(",")] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS 인덱스 recall/지연시간/메모리 벤치마크")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="비교할 인덱스 타입 (쉼표 구분)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nprobe", help="IVF nprobe 스윕 값 (예: 4,16,64)")
+    parser.add_argument("--ef-search", help="HNSW efSearch 스윕 값 (예: 32,64,128)")
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--hnsw-m", type=int)
+    parser.add_argument("--synthetic", type=int, help="카탈로그 대신 N개 랜덤 벡터 사용 (규모 확장 테스트)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((args.synthetic, 512)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    else:
+        embeddings = load_catalog_embeddings()
+
+    rows = run_benchmark(
+        embeddings,
+        [t.strip() for t in args.types.split(",") if t.strip()],
+        k=args.k,
+        n_queries=args.queries,
+        nprobe_values=_int_list(args.nprobe),
+        ef_search_values=_int_list(args.ef_search),
+        params={"nlist": args.nlist, "pq_m": args.pq_m, "hnsw_m": args.hnsw_m},
+    )
+    print_report(rows, args.k, len(embeddings))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+이미지 검색 서비스 메모리 리포트
+
+프로세스 전체(RSS, 익명/파일 매핑)와 구성요소별(FAISS 인덱스, 임베딩, 상품 카탈로그,
+상품 인덱스, 필터 색인, 텍스트 캐시) 사용량을 집계한다.
+mmap 으로 올린 배열은 힙이 아닌 페이지 캐시(워커 간 공유)이므로 mapped 로 따로 센다.
+"""
+import mmap
+import os
+import sys
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .ann_index import describe_index, index_memory_bytes
+
+
+def _mb(nbytes: float) -> float:
+    return round(nbytes / 1e6, 2)
+
+
+def _is_mapped(array: np.ndarray) -> bool:
+    """np.load(mmap_mode=...) 등으로 파일에 매핑된 배열인지"""
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def _sizeof(obj: Any) -> Dict[str, int]:
+    """객체가 차지하는 {'heap': 바이트, 'mapped': 바이트} (배열/문자열 컬럼/리스트/딕셔너리)"""
+    size = {"heap": 0, "mapped": 0}
+    if obj is None:
+        return size
+    if isinstance(obj, np.ndarray):
+        size["mapped" if _is_mapped(obj) else "heap"] += obj.nbytes
+        if obj.dtype == object:
+            size["heap"] += sum(sys.getsizeof(v) for v in obj.ravel())
+    elif hasattr(obj, "_blob") and hasattr(obj, "_offsets"):
+        # catalog_artifact.StringColumn
+        for part in (obj._blob, obj._offsets):
+            for key, value in _sizeof(part).items():
+                size[key] += value
+    elif isinstance(obj, (list, tuple)):
+        size["heap"] += sys.getsizeof(obj) + sum(sys.getsizeof(v) for v in obj)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            for key, v in _sizeof(value).items():
+                size[key] += v
+    return size
+
+
+def _component(*objs: Any, **extra) -> Dict[str, Any]:
+    heap = mapped = 0
+    for obj in objs:
+        size = _sizeof(obj)
+        heap += size["heap"]
+        mapped += size["mapped"]
+    return {"heap_mb": _mb(heap), "mapped_mb": _mb(mapped), **extra}
+
+
+def process_memory() -> Dict[str, Optional[float]]:
+    """/proc/self/status 기준 RSS (리눅스 외에는 None)"""
+    fields = {"VmRSS": "rss_mb", "RssAnon": "anon_mb", "RssFile": "file_mb", "VmHWM": "peak_rss_mb"}
+    result: Dict[str, Optional[float]] = {name: None for name in fields.values()}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    result[fields[key]] = _mb(int(value.split()[0]) * 1024)
+    except OSError:
+        pass
+    return result
+
+
+def mapped_files(prefix: Optional[str] = None) -> Dict[str, float]:
+    """/proc/self/smaps 기준 파일 매핑별 상주(Rss) 크기 (prefix 경로 아래 파일만)"""
+    resident: Dict[str, int] = {}
+    current = None
+    try:
+        with open("/proc/self/smaps") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 6 and "-" in parts[0] and parts[5].startswith("/"):
+                    current = parts[5]
+                elif len(parts) >= 5 and "-" in parts[0]:
+                    current = None
+                elif current and parts and parts[0] == "Rss:":
+                    resident[current] = resident.get(current, 0) + int(parts[1]) * 1024
+    except OSError:
+        return {}
+    if prefix:
+        prefix = os.path.abspath(prefix)
+        resident = {path: size for path, size in resident.items() if path.startswith(prefix)}
+    return {path: _mb(size) for path, size in sorted(resident.items())}
+
+
+def memory_report(service) -> Dict[str, Any]:
+    """EnhancedImageSearchService 구성요소별 메모리 사용량"""
+    loader = service.data_loader
+    artifact = loader.artifact
+    components: Dict[str, Any] = {}
+
+    index = service.index
+    index_mmap = bool(artifact.index_mmap) if artifact is not None else bool(loader.index_mmap)
+    index_bytes = index_memory_bytes(index)
+    components["faiss_index"] = {
+        "type": describe_index(index),
+        "vectors": int(index.ntotal),
+        "heap_mb": 0.0 if index_mmap else _mb(index_bytes),
+        "mapped_mb": _mb(index_bytes) if index_mmap else 0.0,
+    }
+
+    vectors = service.catalog_store.vectors
+    components["embeddings"] = _component(
+        vectors.base, vectors.extra,
+        dtype=str(vectors.base.dtype) if vectors.base is not None else None,
+    )
+    components["catalog_store"] = _component(
+        artifact.columns if artifact is not None else loader.metadata,
+    )
+
+    catalog = service.product_catalog
+    components["product_catalog"] = _component(
+        getattr(catalog, "product_ids", None), getattr(catalog, "columns", None),
+        products=len(catalog) if catalog is not None else 0,
+    )
+
+    product_index = service.product_index
+    components["product_index"] = _component(
+        product_index._codes, product_index._alive, product_index.order, product_index.indptr,
+        product_index.product_vectors,
+        products=len(product_index),
+    )
+
+    components["filter_index"] = _component(
+        service.filter_index.postings, service.filter_index.price_sorted, service.filter_index.price_rows,
+    )
+
+    text_cache = getattr(service, "text_cache", None)
+    if text_cache is not None:
+        components["text_cache_l1"] = _component(list(text_cache._lru.values()),
+                                                 entries=len(text_cache._lru))
+
+    if loader.merged is not None:
+        components["source_dataframe"] = {
+            "heap_mb": _mb(loader.merged.memory_usage(deep=True).sum()), "mapped_mb": 0.0,
+        }
+
+    return {
+        "process": process_memory(),
+        "components": components,
+        "total_heap_mb": round(sum(c["heap_mb"] for c in components.values()), 2),
+        "total_mapped_mb": round(sum(c["mapped_mb"] for c in components.values()), 2),
+        "mapped_files": mapped_files(artifact.path) if artifact is not None else {},
+    }
+
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """초기화 로그용 한 줄 요약"""
+    parts = [f"{name} {c['heap_mb'] + c['mapped_mb']:.1f}MB" for name, c in report["components"].items()]
+    rss = report["process"]["rss_mb"]
+    return (f"메모리: RSS {rss if rss is not None else '?'}MB "
+            f"(힙 {report['total_heap_mb']}MB, mmap {report['total_mapped_mb']}MB) | " + ", ".join(parts))
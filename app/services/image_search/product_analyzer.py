@@ -1,17 +1,221 @@
 """
 상품 분석 관련 모듈
+
+인기도 / 가격대 / 품질 / 트렌드 / 브랜드 / 종합 등급 / 추천 이유는 상품 고정 필드만으로 정해지므로
+카탈로그 로드 시 NumPy 로 전체 상품을 한 번에 계산해 컬럼(ProductAnalysisTable)으로 보관한다.
+요청마다 계산하는 것은 유사도에 따라 달라지는 경쟁력 점수뿐이며 후보 묶음 단위로 벡터화한다.
+카탈로그에 없는 상품만 기존 단건 메서드로 계산한다.
 """
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence
+
+from .product_catalog import ProductCatalog, get_product_catalog, product_id_from_filename
+
+# 등급 구간 (값이 임계값 이상이면 다음 등급, 단건 메서드의 if/elif 와 동일)
+POPULARITY_THRESHOLDS = (40, 60, 80)
+POPULARITY_LEVELS = ("낮음", "보통", "인기", "매우 인기")
+PRICE_THRESHOLDS = (20000, 50000, 100000, 200000)
+PRICE_SEGMENTS = (
+    ("초저가", "매우 저렴한 가격대"),
+    ("저가", "합리적 가격대"),
+    ("일반", "대중적 가격대"),
+    ("중고가", "중간 프리미엄 가격대"),
+    ("프리미엄", "고급 브랜드 가격대"),
+)
+REVIEW_THRESHOLDS = (5, 20, 50, 100)
+REVIEW_RELIABILITY = ("매우 낮음", "낮음", "보통", "높음", "매우 높음")
+QUALITY_EXPECTATIONS = ("프리미엄 품질", "고품질", "양호한 품질", "보통 품질", "품질 주의 필요")
+TREND_THRESHOLDS = (40, 60, 80)
+TREND_STATUSES = (
+    ("하락 트렌드", "관심도가 낮아지는 상품"),
+    ("안정적", "꾸준한 인기 유지"),
+    ("상승 트렌드", "인기가 증가하는 추세"),
+    ("급상승 트렌드", "매우 인기가 높아지는 상품"),
+)
+BRAND_THRESHOLDS = (50000, 100000, 200000)
+BRAND_POSITIONS = (
+    ("저가", "저가 브랜드", "저렴"),
+    ("일반", "일반 브랜드", "적정"),
+    ("중고가", "중고가 브랜드", "적정"),
+    ("프리미엄", "프리미엄 브랜드", "프리미엄 가격"),
+)
+GRADE_THRESHOLDS = (60, 70, 80, 90)
+GRADES = ("D", "C", "B", "A", "S")
+COMPETITIVENESS_THRESHOLDS = (40, 60, 80)
+COMPETITIVENESS_LEVELS = ("낮음", "보통", "높음", "매우 높음")
+# 추천 이유 (비트 순서 = 단건 generate_recommendation_reasons 의 판단 순서)
+RECOMMENDATION_REASONS = ("높은 인기도", "우수한 가성비", "높은 품질 평가", "상승하는 트렌드", "신뢰할 수 있는 리뷰")
+DEFAULT_REASONS = ("기본 추천 상품",)
+
+
+def _level(values: np.ndarray, thresholds: Sequence[float]) -> np.ndarray:
+    """임계값 이상인 개수 = 등급 번호"""
+    return np.digitize(values, thresholds, right=False).astype(np.int8)
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """소수 첫째 자리 반올림 (파이썬 round 와 같은 결과. np.round 는 x*10 을 반올림해 경계값에서 다를 수 있음)"""
+    return np.array([round(v, 1) for v in values.tolist()], dtype=np.float64)
+
+
+def competitiveness_columns(similarity: np.ndarray, price: np.ndarray, rating: np.ndarray) -> Dict[str, np.ndarray]:
+    """경쟁력 점수 (후보 묶음 단위, analyze_competitiveness 와 같은 식)"""
+    similarity_score = similarity * 100
+    price_competitiveness = np.maximum(0, 100 - (price / 2000))
+    quality_competitiveness = (rating / 5.0) * 100
+    overall = similarity_score * 0.4 + price_competitiveness * 0.3 + quality_competitiveness * 0.3
+    return {
+        "score": overall,
+        "level": _level(overall, COMPETITIVENESS_THRESHOLDS),
+        "similarity": similarity_score,
+        "price_competitiveness": price_competitiveness,
+        "quality": quality_competitiveness,
+    }
+
+
+class ProductAnalysisTable:
+    """상품 카탈로그 전체의 고정 분석 결과 (행 = ProductCatalog 행)"""
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+        n = len(catalog)
+        if n == 0:
+            self.columns: Dict[str, np.ndarray] = {}
+            return
+        hearts = catalog.columns["hearts"]
+        views = catalog.columns["views_1m"]
+        reviews = catalog.columns["reviews_count"]
+        price = catalog.columns["price"]
+        rating = catalog.columns["rating_avg"]
+
+        # 1. 인기도 (등급은 반올림 전 점수 기준)
+        hearts_score = np.minimum(hearts / 100 * 30, 30)
+        views_score = np.minimum(views / 10000 * 40, 40)
+        reviews_score = np.minimum(reviews / 50 * 30, 30)
+        popularity = hearts_score + views_score + reviews_score
+
+        # 2. 가격대 / 가성비
+        value_score = 100 - np.minimum(price / 1000, 100)
+
+        # 3. 품질
+        rating_score = np.where(rating > 0, (rating / 5.0) * 100, 50)
+        quality = np.select(
+            [(rating >= 4.5) & (price >= 80000), (rating >= 4.0) & (price >= 50000), rating >= 3.5, rating >= 3.0],
+            [0, 1, 2, 3], default=4,
+        ).astype(np.int8)
+
+        # 4. 트렌드
+        trend = np.minimum((hearts + views / 10) / 100 + rating * 10, 100)
+
+        # 종합 평점 / 추천 이유는 반올림된 점수로 계산 (단건 메서드와 동일)
+        popularity_r, value_r, rating_r, trend_r = (_round1(v) for v in (popularity, value_score, rating_score, trend))
+        overall = popularity_r * 0.3 + value_r * 0.25 + rating_r * 0.3 + trend_r * 0.15
+        review_level = _level(reviews, REVIEW_THRESHOLDS)
+        reasons = ((popularity_r >= 60).astype(np.int8)
+                   | (value_r >= 70) << 1
+                   | (rating_r >= 80) << 2
+                   | (trend_r >= 60) << 3
+                   | (review_level >= 3) << 4)
+
+        self.columns = {
+            "popularity": popularity_r,
+            "popularity_level": _level(popularity, POPULARITY_THRESHOLDS),
+            "hearts_score": _round1(hearts_score),
+            "views_score": _round1(views_score),
+            "reviews_score": _round1(reviews_score),
+            "price_segment": _level(price, PRICE_THRESHOLDS),
+            "value_score": value_r,
+            "rating_score": rating_r,
+            "review_reliability": review_level,
+            "quality_expectation": quality,
+            "trend": trend_r,
+            "trend_status": _level(trend, TREND_THRESHOLDS),
+            "brand_position": _level(price, BRAND_THRESHOLDS),
+            "overall": _round1(overall),
+            "grade": _level(overall, GRADE_THRESHOLDS),
+            "reasons": reasons.astype(np.int8),
+        }
+        # 추천 이유 조합 (5비트 → 이유 목록)
+        self._reason_lists = [
+            tuple(r for bit, r in enumerate(RECOMMENDATION_REASONS) if mask >> bit & 1) or DEFAULT_REASONS
+            for mask in range(1 << len(RECOMMENDATION_REASONS))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def analysis(self, row: int, competitiveness: Dict[str, Any], frontend: bool = True) -> Dict[str, Any]:
+        """행의 분석 결과 dict (frontend=True 면 format_analysis_for_frontend 구조, 아니면 상세 분석 구조)"""
+        c = self.columns
+        catalog = self.catalog.columns
+        price = int(catalog["price"][row])
+        rating = float(catalog["rating_avg"][row])
+        reviews = int(catalog["reviews_count"][row])
+        hearts = int(catalog["hearts"][row])
+        views = int(catalog["views_1m"][row])
+        brand = catalog["brand"][row]
+
+        popularity = {
+            "score": float(c["popularity"][row]),
+            "level": POPULARITY_LEVELS[c["popularity_level"][row]],
+        }
+        if not frontend:
+            popularity["breakdown"] = {
+                "hearts_score": float(c["hearts_score"][row]),
+                "views_score": float(c["views_score"][row]),
+                "reviews_score": float(c["reviews_score"][row]),
+            }
+        segment, segment_description = PRICE_SEGMENTS[c["price_segment"][row]]
+        trend_status, trend_description = TREND_STATUSES[c["trend_status"][row]]
+        positioning, brand_suffix, price_fit = BRAND_POSITIONS[c["brand_position"][row]]
+
+        return {
+            "popularity": {
+                "score": popularity,
+                "hearts": hearts,
+                "views_1m": views,
+                "reviews_count": reviews,
+            },
+            "price_analysis": {
+                "segment": segment,
+                "description": segment_description,
+                "price": price,
+                "formatted_price": f"{price:,}원",
+                "value_score": float(c["value_score"][row]),
+            },
+            "quality_indicators": {
+                "rating": rating,
+                "rating_score": float(c["rating_score"][row]),
+                "review_reliability": REVIEW_RELIABILITY[c["review_reliability"][row]],
+                "quality_expectation": QUALITY_EXPECTATIONS[c["quality_expectation"][row]],
+                "reviews_count": reviews,
+            },
+            "trend_status": {
+                "score": float(c["trend"][row]),
+                "status": trend_status,
+                "description": trend_description,
+            },
+            "brand_analysis": {
+                "brand": brand,
+                "positioning": positioning,
+                "description": f"{brand} ({brand_suffix})",
+                "price_fit": price_fit,
+            },
+            "competitiveness": competitiveness,
+            "recommendation_reasons": list(self._reason_lists[c["reasons"][row]]),
+            "overall_rating": {
+                "score": float(c["overall"][row]),
+                "grade": GRADES[c["grade"][row]],
+            },
+        }
 
 # 전역 유틸 함수 변수
-_convert_analysis_to_json_safe = None
 _format_analysis_for_frontend = None
 
-def set_utils_functions(convert_func, format_func):
+def set_utils_functions(format_func):
     """유틸 함수들 설정"""
-    global _convert_analysis_to_json_safe, _format_analysis_for_frontend
-    _convert_analysis_to_json_safe = convert_func
+    global _format_analysis_for_frontend
     _format_analysis_for_frontend = format_func
 
 
@@ -19,22 +223,78 @@ class ProductAnalyzer:
     """상품 분석 클래스"""
     
     def __init__(self):
-        if _convert_analysis_to_json_safe is None or _format_analysis_for_frontend is None:
+        if _format_analysis_for_frontend is None:
             raise ValueError("Utils functions not set in ProductAnalyzer. Call set_utils_functions first.")
-        self._convert_analysis_to_json_safe = _convert_analysis_to_json_safe
         self._format_analysis_for_frontend = _format_analysis_for_frontend
+        self.catalog = get_product_catalog()
+        self.table = ProductAnalysisTable(self.catalog)
+        print(f"상품 고정 분석 테이블 계산 완료: {len(self.table)}개 상품")
     
-    def _convert_analysis_to_json_safe(self, data: Any) -> Any:
-        """numpy 타입을 JSON 직렬화 가능한 타입으로 변환"""
-        return self._convert_analysis_to_json_safe(data)
+    def _with_catalog_fields(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """상품 통계 필드가 없으면 공유 카탈로그에서 보충"""
+        if "price" in product and "hearts" in product:
+            return product
+        product_id = product.get("product_id") or product_id_from_filename(product.get("filename", ""))
+        info = self.catalog.get(product_id) if product_id else {}
+        return {**info, **product} if info else product
     
     def _format_analysis_for_frontend(self, product_info: Dict[str, Any], similarity_score: float) -> Dict[str, Any]:
         """프론트엔드가 기대하는 구조로 분석 결과 변환"""
         return self._format_analysis_for_frontend(product_info, similarity_score, self)
     
+    def analyze_batch(self, product_ids: Sequence[str], similarities: Sequence[float],
+                      products: Optional[Sequence[Dict[str, Any]]] = None,
+                      frontend: bool = True) -> List[Dict[str, Any]]:
+        """
+        검색 후보 묶음 분석 (고정 항목은 테이블 조회, 경쟁력만 후보 단위로 벡터 계산)
+
+        frontend=True 면 format_analysis_for_frontend 구조, False 면 _analyze_single_product 구조.
+        카탈로그에 없는 상품은 products[i] 로 단건 계산한다.
+        """
+        if not len(product_ids):
+            return []
+        rows = self.catalog.rows_of(product_ids)
+        found = rows >= 0
+        safe_rows = np.where(found, rows, 0)
+        catalog = self.catalog.columns
+        similarity = np.asarray(similarities, dtype=np.float64)
+        if found.any():
+            comp = competitiveness_columns(similarity, catalog["price"][safe_rows], catalog["rating_avg"][safe_rows])
+
+        analyses = []
+        for i, row in enumerate(rows.tolist()):
+            if row < 0:
+                product = dict(products[i]) if products is not None else {}
+                if frontend:
+                    # __init__ 에서 설정한 유틸 함수 (analyzer 인자 필요)
+                    analyses.append(self._format_analysis_for_frontend(product, float(similarity[i]), self))
+                else:
+                    analyses.append(self._analyze_product_fields({**product, "similarity": float(similarity[i])}))
+                continue
+            competitiveness = {
+                "score": round(float(comp["score"][i]), 1),
+                "level": COMPETITIVENESS_LEVELS[comp["level"][i]],
+                "factors": {
+                    "similarity": round(float(comp["similarity"][i]), 1),
+                    "price_competitiveness": round(float(comp["price_competitiveness"][i]), 1),
+                    "quality": round(float(comp["quality"][i]), 1),
+                },
+            }
+            analyses.append(self.table.analysis(row, competitiveness, frontend))
+        return analyses
+    
     async def _analyze_single_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
-        """개별 상품 상세 분석"""
+        """개별 상품 상세 분석 (카탈로그 상품은 고정 분석 테이블 사용)"""
+        product_id = product.get("product_id") or product_id_from_filename(product.get("filename", ""))
+        if product_id and product_id in self.catalog:
+            return self.analyze_batch([product_id], [product.get("similarity", 0)], frontend=False)[0]
+        return self._analyze_product_fields(product)
+    
+    def _analyze_product_fields(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """상품 필드로 직접 상세 분석 (카탈로그에 없는 상품)"""
         try:
+            product = self._with_catalog_fields(product)
+            
             # 기본 정보 추출
             price = product.get("price", 0)
             rating = product.get("rating_avg", 0)
@@ -68,7 +328,7 @@ class ProductAnalyzer:
                 popularity_score, price_analysis, quality_indicators, trend_status
             )
             
-            return self._convert_analysis_to_json_safe({
+            return {
                 "popularity": {
                     "score": popularity_score,
                     "hearts": hearts,
@@ -84,7 +344,7 @@ class ProductAnalyzer:
                 "overall_rating": self.calculate_product_overall_rating(
                     popularity_score, price_analysis, quality_indicators, trend_status
                 )
-            })
+            }
             
         except Exception as e:
             print(f"상품 분석 오류: {e}")
@@ -0,0 +1,110 @@
+"""
+상품 메타데이터 카탈로그 (product_id → 행 해시 인덱스 + 타입별 NumPy 컬럼)
+"""
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Iterable
+
+PRODUCT_CSV = "app/img_search/product.csv"
+
+
+class ProductCatalog:
+    """product.csv 를 로드 시점에 한 번 정리해 O(1) 조회를 제공하는 카탈로그"""
+
+    INT_FIELDS = ("price", "reviews_count", "hearts", "views_1m", "sales_cum")
+    FLOAT_FIELDS = ("rating_avg",)
+    STR_FIELDS = ("product_name", "brand", "category_l1", "gender")
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, source: Optional[str] = None):
+        self.source = source
+        self.mtime_ns = 0  # 로드한 CSV 의 수정 시각 (스냅샷 재로드 판단용)
+        self.product_ids = np.array([], dtype=object)
+        self.columns: Dict[str, np.ndarray] = {}
+        self._row_by_id: Dict[str, int] = {}
+        if df is not None:
+            self._build(df)
+
+    @classmethod
+    def from_csv(cls, path: str = PRODUCT_CSV) -> "ProductCatalog":
+        """CSV 로드 (파일이 없으면 빈 카탈로그)"""
+        if not os.path.exists(path):
+            print(f"{path} 파일이 없습니다. 빈 상품 카탈로그로 진행합니다.")
+            return cls(source=path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        catalog = cls(pd.read_csv(path), source=path)
+        catalog.mtime_ns = mtime_ns
+        print(f"상품 카탈로그 로드 완료: {len(catalog)}개 상품")
+        return catalog
+
+    def _build(self, df: pd.DataFrame):
+        n = len(df)
+        ids = df["product_id"]
+        if ids.dtype.kind == "f":
+            # NaN 섞인 정수 ID가 "123.0" 으로 변하지 않도록
+            ids = ids.astype("Int64")
+        self.product_ids = ids.astype(str).str.strip().to_numpy(dtype=object)
+
+        # 중복 ID는 첫 행 우선 (기존 iloc[0] 동작과 동일)
+        self._row_by_id = {}
+        for row, product_id in enumerate(self.product_ids):
+            self._row_by_id.setdefault(product_id, row)
+
+        for field in self.INT_FIELDS:
+            values = pd.to_numeric(df[field], errors="coerce") if field in df.columns else pd.Series(np.zeros(n))
+            self.columns[field] = values.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+        for field in self.FLOAT_FIELDS:
+            values = pd.to_numeric(df[field], errors="coerce") if field in df.columns else pd.Series(np.zeros(n))
+            self.columns[field] = values.fillna(0.0).to_numpy(dtype=np.float64)
+        for field in self.STR_FIELDS:
+            values = df[field].fillna("").astype(str) if field in df.columns else pd.Series([""] * n)
+            self.columns[field] = values.to_numpy(dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __contains__(self, product_id: Any) -> bool:
+        return str(product_id) in self._row_by_id
+
+    def row_of(self, product_id: Any) -> Optional[int]:
+        """product_id 의 행 번호 (없으면 None)"""
+        return self._row_by_id.get(str(product_id))
+
+    def rows_of(self, product_ids: Iterable[Any]) -> np.ndarray:
+        """여러 product_id 의 행 번호 배열 (없으면 -1)"""
+        return np.array([self._row_by_id.get(str(pid), -1) for pid in product_ids], dtype=np.int64)
+
+    def row_info(self, row: int) -> Dict[str, Any]:
+        """행 번호로 상품 정보 dict 생성 (파이썬 기본 타입)"""
+        info: Dict[str, Any] = {}
+        for field in self.STR_FIELDS:
+            info[field] = self.columns[field][row]
+        for field in self.INT_FIELDS:
+            info[field] = int(self.columns[field][row])
+        for field in self.FLOAT_FIELDS:
+            info[field] = float(self.columns[field][row])
+        return info
+
+    def get(self, product_id: Any) -> Dict[str, Any]:
+        """특정 상품 정보 조회 (없으면 빈 dict)"""
+        row = self.row_of(product_id)
+        return self.row_info(row) if row is not None else {}
+
+    def get_many(self, product_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [self.get(pid) for pid in product_ids]
+
+
+def product_id_from_filename(filename: str) -> str:
+    """카탈로그 이미지 파일명(<product_id>_<n>.jpg)에서 product_id 추출"""
+    return os.path.basename(filename or "").split("_")[0].split(".")[0]
+
+
+# 전역 카탈로그 인스턴스
+_product_catalog = None
+
+def get_product_catalog() -> ProductCatalog:
+    """상품 카탈로그 인스턴스 반환 (싱글톤 패턴)"""
+    global _product_catalog
+    if _product_catalog is None:
+        _product_catalog = ProductCatalog.from_csv(PRODUCT_CSV)
+    return _product_catalog
@@ -0,0 +1,264 @@
+"""
+상품 단위 벡터 검색 레이어
+
+카탈로그 이미지는 <product_id>_<n>.jpg 형식이라 한 상품이 상위 결과에 여러 번
+나올 수 있다. ProductIndex 는 벡터 행 → 상품 매핑을 들고 있다가 top-k 개의
+고유 상품과 상품별 최고 유사 이미지를 반환한다.
+
+  - max  풀링: 이미지 인덱스를 상품 평균 이미지 수 기준으로 조회하고,
+               고유 상품이 모자란 질의만 k 를 두 배씩 늘려 재검색
+  - mean 풀링: 상품 평균 벡터 인덱스를 직접 조회 (항상 정확히 k 개 상품)
+
+허용 행 마스크(search_filters.SearchFilterIndex.mask)가 주어지면 IDSelectorBitmap 으로
+검색 내부에서 필터링하고, 허용 행이 IMAGE_FILTER_EXACT_MAX 이하이면 해당 행만 정확 계산한다.
+"""
+import numpy as np
+import faiss
+from typing import List, NamedTuple, Optional, Sequence
+
+from app.core.config import IMAGE_PRODUCT_POOLING, IMAGE_FILTER_EXACT_MAX
+
+from .ann_index import build_index, search_parameters
+from .product_catalog import product_id_from_filename
+
+POOLING_TYPES = ("max", "mean")
+
+
+class ProductHit(NamedTuple):
+    """상품 검색 결과 한 건"""
+    row: int              # 상품 내 최고 유사 이미지의 벡터 행 번호
+    product_id: str
+    score: float          # 해당 이미지 유사도
+    product_score: float  # 풀링된 상품 점수 (max 풀링이면 score 와 동일)
+
+
+class ProductIndex:
+    """이미지 벡터 인덱스 위에 얹는 상품 단위 검색 레이어"""
+
+    def __init__(self, index: faiss.Index, image_files: Sequence[str],
+                 embeddings: Optional[np.ndarray] = None, pooling: str = IMAGE_PRODUCT_POOLING):
+        if pooling not in POOLING_TYPES:
+            raise ValueError(f"지원하지 않는 풀링 방식: {pooling} (가능: {', '.join(POOLING_TYPES)})")
+        self.index = index
+        self.embeddings = embeddings
+        self.pooling = pooling
+        self.product_ids: List[str] = []
+        self.product_vectors = None
+        self.product_vector_index = None
+        self._code_by_id = {}
+
+        codes = [self._code_of(product_id_from_filename(f)) for f in image_files]
+        self._codes = np.asarray(codes, dtype=np.int64)
+        self._alive = np.ones(len(codes), dtype=bool)
+        self._size = len(codes)
+        self._dirty = False
+        self._rebuild_groups()
+
+        if self.pooling == "mean":
+            if self.embeddings is None or len(self.embeddings) != len(self.image_product):
+                print("상품 평균 벡터를 만들 임베딩이 없어 max 풀링으로 진행합니다.")
+                self.pooling = "max"
+            else:
+                self._build_mean_index()
+
+        print(f"상품 인덱스 준비 완료: 이미지 {len(self.image_product)}개 → 상품 {len(self.product_ids)}개 "
+              f"(풀링: {self.pooling}, 상품당 평균 {self.avg_images_per_product:.2f}장)")
+
+    def _code_of(self, product_id: str) -> int:
+        code = self._code_by_id.get(product_id)
+        if code is None:
+            code = len(self.product_ids)
+            self._code_by_id[product_id] = code
+            self.product_ids.append(product_id)
+        return code
+
+    @property
+    def image_product(self) -> np.ndarray:
+        """벡터 행 → 상품 코드"""
+        return self._codes[:self._size]
+
+    def add_row(self, image_file: str) -> int:
+        """인덱스에 새로 추가된 벡터 행의 상품 매핑 추가 (상품 그룹/평균 벡터는 다음 사용 시 갱신)"""
+        code = self._code_of(product_id_from_filename(image_file))
+        if self._size == len(self._codes):
+            capacity = max(16, 2 * len(self._codes))
+            self._codes = np.resize(self._codes, capacity)
+            self._alive = np.resize(self._alive, capacity)
+        self._codes[self._size] = code
+        self._alive[self._size] = True
+        self._size += 1
+        self._dirty = True
+        return self._size - 1
+
+    def remove_row(self, row: int):
+        """삭제된 행을 상품 평균 벡터에서 제외 (검색 제외는 호출자의 마스크가 담당)"""
+        self._alive[row] = False
+        self._dirty = True
+
+    def _refresh(self):
+        """행 추가/삭제 이후 상품 그룹과 평균 벡터 인덱스 재구성"""
+        if not self._dirty:
+            return
+        self._rebuild_groups()
+        if self.pooling == "mean":
+            if self.embeddings is not None and len(self.embeddings) >= self._size:
+                self._build_mean_index()
+            else:
+                print("추가 행 임베딩이 없어 max 풀링으로 전환합니다.")
+                self.pooling = "max"
+        self._dirty = False
+
+    def _rebuild_groups(self):
+        """상품 코드 순으로 정렬한 이미지 행 (CSR: order[indptr[p]:indptr[p+1]])"""
+        self.order = np.argsort(self.image_product, kind="stable")
+        self.indptr = np.searchsorted(
+            self.image_product[self.order], np.arange(len(self.product_ids) + 1)
+        )
+
+    def _build_mean_index(self):
+        """상품별 이미지 임베딩 평균(정규화) 벡터 인덱스"""
+        alive = self._alive[:self._size][self.order]
+        vectors = np.add.reduceat(
+            np.asarray(self.embeddings[self.order], dtype=np.float32) * alive[:, None], self.indptr[:-1], axis=0
+        )
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.product_vectors = vectors
+        self.product_vector_index = build_index(vectors)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @property
+    def avg_images_per_product(self) -> float:
+        return len(self.image_product) / len(self.product_ids) if self.product_ids else 1.0
+
+    def row_product_ids(self) -> List[str]:
+        """벡터 행 순서의 product_id 목록"""
+        return [self.product_ids[code] for code in self.image_product]
+
+    def image_rows(self, product_id: str) -> np.ndarray:
+        """상품에 속한 이미지 벡터 행 번호"""
+        code = self._code_by_id.get(str(product_id))
+        if code is None:
+            return np.array([], dtype=np.int64)
+        self._refresh()
+        return self.order[self.indptr[code]:self.indptr[code + 1]]
+
+    def search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[List[ProductHit]]:
+        """질의별 top-k 고유 상품 (점수 내림차순). mask: 허용 벡터 행 bool 배열"""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if k <= 0 or self.index.ntotal == 0 or not self.product_ids:
+            return [[] for _ in range(len(queries))]
+        self._refresh()
+        if mask is not None:
+            mask = self._fit_mask(mask)
+            allowed = np.flatnonzero(mask)
+            if len(allowed) == 0:
+                return [[] for _ in range(len(queries))]
+            if self.embeddings is not None and len(allowed) <= IMAGE_FILTER_EXACT_MAX:
+                return self._search_exact(queries, k, allowed)
+        if self.pooling == "mean":
+            return self._search_mean(queries, k, mask)
+        return self._search_max(queries, k, mask)
+
+    def _fit_mask(self, mask: np.ndarray) -> np.ndarray:
+        """마스크 길이를 인덱스 행 수에 맞추고, 상품 매핑이 없는 행은 제외"""
+        fitted = np.zeros(self.index.ntotal, dtype=bool)
+        n = min(len(mask), len(self.image_product), self.index.ntotal)
+        fitted[:n] = mask[:n]
+        return fitted
+
+    def _collapse(self, D: np.ndarray, I: np.ndarray, k: int) -> List[ProductHit]:
+        """이미지 단위 결과 → 상품별 첫(최고) 이미지만 남김"""
+        hits = []
+        seen = set()
+        n_mapped = len(self.image_product)
+        for score, idx in zip(D, I):
+            if idx < 0 or idx >= n_mapped:
+                # -1: IVF/HNSW 후보 부족, n_mapped 이상: 매핑 없는 행
+                continue
+            code = int(self.image_product[idx])
+            if code in seen:
+                continue
+            seen.add(code)
+            hits.append(ProductHit(int(idx), self.product_ids[code], float(score), float(score)))
+            if len(hits) == k:
+                break
+        return hits
+
+    def _search_max(self, queries: np.ndarray, k: int,
+                    mask: Optional[np.ndarray] = None) -> List[List[ProductHit]]:
+        # 필터가 있으면 허용 행 수가 검색 상한 (그 이상 늘려도 새 후보 없음)
+        ntotal = self.index.ntotal if mask is None else int(mask.sum())
+        fetch = min(ntotal, max(k, int(np.ceil(k * self.avg_images_per_product))))
+        selection = search_parameters(self.index, mask) if mask is not None else None
+        results: List[Optional[List[ProductHit]]] = [None] * len(queries)
+        pending = list(range(len(queries)))
+
+        while pending:
+            if selection is None:
+                D, I = self.index.search(queries[pending], fetch)
+            else:
+                D, I = self.index.search(queries[pending], fetch, params=selection[0])
+            unresolved = []
+            for row, q in enumerate(pending):
+                hits = self._collapse(D[row], I[row], k)
+                if len(hits) >= k or fetch >= ntotal:
+                    results[q] = hits
+                else:
+                    unresolved.append(q)
+            pending = unresolved
+            fetch = min(ntotal, fetch * 2)
+        return results
+
+    def _search_mean(self, queries: np.ndarray, k: int,
+                     mask: Optional[np.ndarray] = None) -> List[List[ProductHit]]:
+        if mask is None:
+            D, I = self.product_vector_index.search(queries, min(k, len(self.product_ids)))
+        else:
+            # 허용 이미지가 하나라도 있는 상품만 후보
+            product_mask = np.zeros(len(self.product_ids), dtype=bool)
+            product_mask[self.image_product[np.flatnonzero(mask)]] = True
+            selection = search_parameters(self.product_vector_index, product_mask)
+            D, I = self.product_vector_index.search(
+                queries, min(k, int(product_mask.sum())), params=selection[0]
+            )
+        results = []
+        for q in range(len(queries)):
+            hits = []
+            for product_score, code in zip(D[q], I[q]):
+                if code < 0:
+                    continue
+                rows = self.order[self.indptr[code]:self.indptr[code + 1]]
+                if mask is not None:
+                    rows = rows[mask[rows]]
+                sims = np.asarray(self.embeddings[rows], dtype=np.float32) @ queries[q]
+                best = int(np.argmax(sims))
+                hits.append(ProductHit(int(rows[best]), self.product_ids[code],
+                                       float(sims[best]), float(product_score)))
+            results.append(hits)
+        return results
+
+    def _search_exact(self, queries: np.ndarray, k: int, allowed: np.ndarray) -> List[List[ProductHit]]:
+        """허용 행이 적을 때: 해당 임베딩만 내적 계산 (ANN 탐색 없이 정확, 비용은 허용 행 수에 비례)"""
+        sims = queries @ np.asarray(self.embeddings[allowed], dtype=np.float32).T
+        codes = self.image_product[allowed]
+        results = []
+        for q in range(len(queries)):
+            order = np.argsort(-sims[q], kind="stable")
+            if self.pooling == "mean":
+                # 상품 점수는 평균 벡터 기준, 대표 이미지는 허용 이미지 중 최고 유사도
+                best_pos = {}
+                for pos in order:
+                    best_pos.setdefault(int(codes[pos]), pos)
+                product_codes = np.fromiter(best_pos.keys(), dtype=np.int64)
+                product_scores = self.product_vectors[product_codes] @ queries[q]
+                hits = []
+                for i in np.argsort(-product_scores, kind="stable")[:k]:
+                    pos = best_pos[int(product_codes[i])]
+                    hits.append(ProductHit(int(allowed[pos]), self.product_ids[product_codes[i]],
+                                           float(sims[q, pos]), float(product_scores[i])))
+            else:
+                hits = self._collapse(sims[q, order], allowed[order], k)
+            results.append(hits)
+        return results
@@ -0,0 +1,225 @@
+"""
+메타데이터 필터 검색용 포스팅 리스트
+
+벡터 행(이미지) 단위로 상품 속성(category_l1 / gender / brand / 가격)과
+캡션 속성(color / fit / pattern, app/utils/translate.py 캐노니컬 어휘)을
+미리 역색인해 두고, 질의 필터를 허용 행 비트맵으로 합성한다.
+비트맵은 FAISS IDSelectorBitmap 으로 검색 내부에 전달된다 (사후 필터링 없음).
+
+필터 형식 (모든 키 선택):
+    {"category_l1": ["상의"], "gender": "여성", "brand": [...],
+     "price_min": 0, "price_max": 50000,
+     "color": ["black"], "fit": ["slim fit"], "pattern": ["striped"]}
+같은 키 안의 값은 OR, 서로 다른 키는 AND.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.translate import CANON_INDEX, map_to_canonical, translate_ko_token
+
+from .product_catalog import ProductCatalog
+
+PRODUCT_FILTER_FIELDS = ("category_l1", "gender", "brand")
+CAPTION_FILTER_GROUPS = ("color", "fit", "pattern")
+PRICE_FILTER_FIELDS = ("price_min", "price_max")
+FILTER_KEYS = PRODUCT_FILTER_FIELDS + CAPTION_FILTER_GROUPS + PRICE_FILTER_FIELDS
+
+_EMPTY_ROWS = np.array([], dtype=np.int64)
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    요청 필터 정리 (빈 값 제거, 문자열은 콤마 분리 + 소문자, 캡션 속성은 캐노니컬 값으로 스냅)
+
+    Raises:
+        ValueError: 지원하지 않는 키 또는 숫자가 아닌 가격
+    """
+    normalized: Dict[str, Any] = {}
+    for key, value in (filters or {}).items():
+        if value is None or value == "" or value == [] or value == ():
+            continue
+        if key not in FILTER_KEYS:
+            raise ValueError(f"지원하지 않는 필터: {key} (가능: {', '.join(FILTER_KEYS)})")
+        if key in PRICE_FILTER_FIELDS:
+            normalized[key] = int(value)
+            continue
+
+        values = value.split(",") if isinstance(value, str) else value
+        cleaned = set()
+        for v in values:
+            v = str(v).strip()
+            if not v:
+                continue
+            if key in CAPTION_FILTER_GROUPS:
+                v = map_to_canonical(translate_ko_token(v), key) or v
+            cleaned.add(v.lower())
+        if cleaned:
+            normalized[key] = tuple(sorted(cleaned))
+    return normalized
+
+
+def filter_cache_key(filters: Dict[str, Any]) -> tuple:
+    """정리된 필터의 해시 가능한 키 (배치 그룹핑/마스크 캐시용)"""
+    return tuple(sorted(filters.items()))
+
+
+def _postings(values: Sequence[str]) -> Dict[str, np.ndarray]:
+    """값 → 해당 값을 가진 행 번호 배열"""
+    if len(values) == 0:
+        return {}
+    uniques, inverse = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(uniques) + 1))
+    return {
+        str(value): order[bounds[i]:bounds[i + 1]].astype(np.int64)
+        for i, value in enumerate(uniques) if value
+    }
+
+
+def _caption_text(caption: str) -> str:
+    """캡션을 CANON_INDEX 키와 같은 방식으로 정규화"""
+    text = str(caption or "").lower().replace("_", " ").replace("-", " ")
+    return " ".join(text.split())
+
+
+_caption_patterns: Dict[str, "re.Pattern"] = {}
+
+def _caption_values(caption: str, group: str) -> set:
+    """캡션 한 개에서 그룹별 캐노니컬 값 추출"""
+    index = CANON_INDEX[group]
+    pattern = _caption_patterns.get(group)
+    if pattern is None:
+        pattern = _caption_patterns[group] = re.compile(
+            r"\b(" + "|".join(re.escape(k) for k in sorted(index, key=len, reverse=True)) + r")\b"
+        )
+    return {index[match].lower() for match in pattern.findall(_caption_text(caption))}
+
+
+def _caption_postings(captions: Sequence[str], group: str) -> Dict[str, np.ndarray]:
+    """캡션에서 그룹별 캐노니컬 값을 추출해 포스팅 리스트 생성"""
+    rows_by_value: Dict[str, List[int]] = {}
+    for row, caption in enumerate(captions):
+        for value in _caption_values(caption, group):
+            rows_by_value.setdefault(value, []).append(row)
+    return {value: np.asarray(rows, dtype=np.int64) for value, rows in rows_by_value.items()}
+
+
+class SearchFilterIndex:
+    """벡터 행 단위 속성 역색인 + 필터 → 허용 행 마스크 합성"""
+
+    def __init__(self, row_product_ids: Sequence[str], catalog: Optional[ProductCatalog],
+                 captions: Sequence[str], cache_size: int = 256):
+        self.size = len(row_product_ids)
+        self.catalog = catalog
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+
+        catalog_rows = catalog.rows_of(row_product_ids) if catalog is not None and len(catalog) \
+            else np.full(self.size, -1, dtype=np.int64)
+        known = catalog_rows >= 0
+
+        for field in PRODUCT_FILTER_FIELDS:
+            values = np.full(self.size, "", dtype=object)
+            if known.any():
+                values[known] = catalog.columns[field][catalog_rows[known]]
+            self.postings[field] = _postings([str(v).strip().lower() for v in values])
+
+        # 가격: 상품 정보가 있는 행만 가격순 정렬 → 범위 필터는 이진 탐색 한 번
+        known_rows = np.flatnonzero(known)
+        prices = catalog.columns["price"][catalog_rows[known]] if len(known_rows) else np.array([], dtype=np.int64)
+        order = np.argsort(prices, kind="stable")
+        self.price_sorted = prices[order]
+        self.price_rows = known_rows[order]
+
+        for group in CAPTION_FILTER_GROUPS:
+            self.postings[group] = _caption_postings(captions, group)
+
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+        print(f"검색 필터 색인 완료: {self.size}개 행, "
+              + ", ".join(f"{k} {len(v)}종" for k, v in self.postings.items()))
+
+    def add_row(self, row: int, product_id: str, caption: str):
+        """
+        색인 이후 인덱스에 추가된 벡터 행을 포스팅/가격 배열에 반영 (카탈로그 추가·수정)
+
+        호출자가 검색과 겹치지 않도록 인덱스 락을 잡은 상태에서 호출한다. 마스크 캐시는 비운다.
+        """
+        catalog_row = -1
+        if self.catalog is not None and len(self.catalog):
+            catalog_row = int(self.catalog.rows_of([product_id])[0])
+
+        def post(field: str, value: str):
+            if value:
+                rows = self.postings[field].get(value, _EMPTY_ROWS)
+                self.postings[field][value] = np.append(rows, np.int64(row))
+
+        for field in PRODUCT_FILTER_FIELDS:
+            value = self.catalog.columns[field][catalog_row] if catalog_row >= 0 else ""
+            post(field, str(value).strip().lower())
+        for group in CAPTION_FILTER_GROUPS:
+            for value in _caption_values(caption, group):
+                post(group, value)
+
+        if catalog_row >= 0:
+            price = self.catalog.columns["price"][catalog_row]
+            at = np.searchsorted(self.price_sorted, price, side="right")
+            self.price_sorted = np.insert(self.price_sorted, at, price)
+            self.price_rows = np.insert(self.price_rows, at, np.int64(row))
+
+        self.size = max(self.size, row + 1)
+        with self._lock:
+            self._cache.clear()
+
+    def values(self, field: str) -> List[str]:
+        """필드별 필터 가능한 값 목록"""
+        return sorted(self.postings.get(field, {}))
+
+    def mask(self, filters: Dict[str, Any], size: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        정리된 필터 → 허용 행 bool 마스크 (필터가 없으면 None)
+
+        size 가 색인 행 수보다 크면 (색인 이후 추가된 벡터) 나머지 행은 제외된다.
+        """
+        if not filters:
+            return None
+        key = (filter_cache_key(filters), size)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        size = max(size or self.size, self.size)
+        allowed = np.ones(size, dtype=bool)
+        allowed[self.size:] = False
+
+        def restrict(rows: np.ndarray):
+            field_mask = np.zeros(size, dtype=bool)
+            field_mask[rows] = True
+            np.logical_and(allowed, field_mask, out=allowed)
+
+        for field in PRODUCT_FILTER_FIELDS + CAPTION_FILTER_GROUPS:
+            if field in filters:
+                postings = self.postings[field]
+                rows = [postings.get(v, _EMPTY_ROWS) for v in filters[field]]
+                restrict(np.concatenate(rows) if rows else _EMPTY_ROWS)
+
+        if "price_min" in filters or "price_max" in filters:
+            lo = np.searchsorted(self.price_sorted, filters["price_min"], side="left") \
+                if "price_min" in filters else 0
+            hi = np.searchsorted(self.price_sorted, filters["price_max"], side="right") \
+                if "price_max" in filters else len(self.price_sorted)
+            restrict(self.price_rows[lo:hi])
+
+        allowed.setflags(write=False)
+        with self._lock:
+            self._cache[key] = allowed
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return allowed
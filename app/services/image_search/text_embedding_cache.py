@@ -0,0 +1,209 @@
+"""
+CLIP 텍스트 질의 임베딩 2단 캐시
+
+  - 1단: 프로세스 내 LRU
+  - 2단: SQLite 파일 (재시작 후에도 유지, 워커 프로세스 간 공유)
+
+비동기 경로(aget / put_async)는 LRU 만 이벤트 루프에서 처리하고, SQLite 조회/기록은
+전용 스레드(text-cache-io)에서 수행한다. 다른 워커가 DB 를 잠그고 있어도 루프는 멈추지 않는다.
+
+키는 (모델 버전, 정규화된 번역 질의). 모델 버전은 체크포인트 이름/커밋/가중치
+지문으로 계산하므로 CLIP 모델이 바뀌면 이전 항목은 자동으로 무효화된다.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from app.core.config import TEXT_EMBED_CACHE_PATH, TEXT_EMBED_CACHE_SIZE
+
+# SQLite 조회/기록 전용 스레드 수
+DISK_IO_WORKERS = 2
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 질의 정규화 (소문자 + 공백 축약)"""
+    return " ".join((query or "").lower().split())
+
+
+def clip_model_version(model: Any, model_name: str) -> str:
+    """CLIP 모델 지문: 체크포인트 이름 + HF 커밋 해시 + 텍스트 projection 가중치 해시"""
+    h = hashlib.sha1(model_name.encode("utf-8"))
+    commit = getattr(getattr(model, "config", None), "_commit_hash", None)
+    if commit:
+        h.update(commit.encode("utf-8"))
+    projection = getattr(model, "text_projection", None)
+    if projection is not None:
+        h.update(projection.weight.detach().cpu().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class TextEmbeddingCache:
+    """질의 임베딩 LRU + SQLite 2단 캐시"""
+
+    def __init__(self, model_version: str, path: Optional[str] = TEXT_EMBED_CACHE_PATH,
+                 max_size: int = TEXT_EMBED_CACHE_SIZE):
+        self.model_version = model_version
+        self.path = path
+        self.max_size = max_size
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._io: Optional[ThreadPoolExecutor] = None
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = self._conn()
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS text_embeddings ("
+                    " model_version TEXT NOT NULL, query TEXT NOT NULL,"
+                    " embedding BLOB NOT NULL, created_at REAL NOT NULL,"
+                    " PRIMARY KEY (model_version, query))"
+                )
+                # 모델이 바뀌었으면 이전 버전 항목 제거
+                removed = conn.execute(
+                    "DELETE FROM text_embeddings WHERE model_version != ?", (model_version,)
+                ).rowcount
+                conn.commit()
+                if removed:
+                    print(f"[text-cache] CLIP 모델 변경 감지: 이전 임베딩 {removed}개 무효화")
+            except sqlite3.Error as e:
+                print(f"[text-cache] 디스크 캐시 비활성화: {e}")
+                self.path = None
+
+    def _conn(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 (WAL 모드로 다중 프로세스 읽기/쓰기)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._lru[key] = embedding
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def get_memory(self, query: str) -> Optional[np.ndarray]:
+        """1단(LRU)만 조회. 이벤트 루프에서 바로 호출해도 되는 경로"""
+        key = normalize_query(query)
+        with self._lock:
+            embedding = self._lru.get(key)
+            if embedding is not None:
+                self._lru.move_to_end(key)
+                self.stats["l1_hits"] += 1
+            return embedding
+
+    def get_disk(self, query: str) -> Optional[np.ndarray]:
+        """2단(SQLite) 조회. 찾으면 LRU 에도 올림 (잠긴 DB 는 busy timeout 까지 대기하므로 루프 밖에서 호출)"""
+        key = normalize_query(query)
+        if self.path:
+            try:
+                row = self._conn().execute(
+                    "SELECT embedding FROM text_embeddings WHERE model_version = ? AND query = ?",
+                    (self.model_version, key),
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.stats["errors"] += 1
+                print(f"[text-cache] 조회 실패: {e}")
+                row = None
+            if row is not None:
+                embedding = np.frombuffer(row[0], dtype=np.float32).reshape(1, -1)
+                self._remember(key, embedding)
+                self.stats["l2_hits"] += 1
+                return embedding
+
+        self.stats["misses"] += 1
+        return None
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """캐시 조회 ((1, D) float32, 없으면 None)"""
+        embedding = self.get_memory(query)
+        return embedding if embedding is not None else self.get_disk(query)
+
+    def _write_disk(self, key: str, embedding: np.ndarray):
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO text_embeddings VALUES (?, ?, ?, ?)",
+                (self.model_version, key, embedding.tobytes(), time.time()),
+            )
+            conn.commit()
+            self.stats["writes"] += 1
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"[text-cache] 저장 실패: {e}")
+
+    def put(self, query: str, embedding: np.ndarray):
+        """캐시 저장 (LRU + 디스크)"""
+        key = normalize_query(query)
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        self._remember(key, embedding)
+        if self.path:
+            self._write_disk(key, embedding)
+
+    async def aget(self, query: str) -> Optional[np.ndarray]:
+        """비동기 조회: LRU 는 바로, 미스일 때만 SQLite 조회를 캐시 I/O 스레드에서 수행"""
+        embedding = self.get_memory(query)
+        if embedding is not None or not self.path:
+            if embedding is None:
+                self.stats["misses"] += 1
+            return embedding
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool(), self.get_disk, query)
+
+    def put_async(self, query: str, embedding: np.ndarray):
+        """LRU 는 바로 저장하고 디스크 기록은 캐시 I/O 스레드로 넘김 (완료를 기다리지 않음)"""
+        key = normalize_query(query)
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        self._remember(key, embedding)
+        if self.path:
+            self._io_pool().submit(self._write_disk, key, embedding)
+
+    def _io_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._io is None:
+                self._io = ThreadPoolExecutor(max_workers=DISK_IO_WORKERS,
+                                              thread_name_prefix="text-cache-io")
+            return self._io
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["l1_hits"] + self.stats["l2_hits"] + self.stats["misses"]
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+        return {
+            "model_version": self.model_version,
+            "l1_size": len(self._lru),
+            "l1_max_size": self.max_size,
+            "persistent": bool(self.path),
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 전역 캐시 인스턴스 (검색 서비스 초기화 시 생성)
+_text_embedding_cache = None
+
+def init_text_embedding_cache(model: Any, model_name: str) -> TextEmbeddingCache:
+    """CLIP 모델 지문으로 캐시 생성/교체"""
+    global _text_embedding_cache
+    version = clip_model_version(model, model_name)
+    if _text_embedding_cache is None or _text_embedding_cache.model_version != version:
+        _text_embedding_cache = TextEmbeddingCache(version)
+    return _text_embedding_cache
+
+def get_text_embedding_cache() -> Optional[TextEmbeddingCache]:
+    """현재 캐시 인스턴스 (서비스 초기화 전이면 None)"""
+    return _text_embedding_cache
@@ -0,0 +1,175 @@
+"""
+업로드 이미지 분석 캐시 (고급 이미지 검색)
+
+같은 사진을 다시 올리거나 clothing_type(all/top/bottom)만 바꿔 검색할 때
+U2NET / CLIP / 카테고리 분류를 다시 돌리지 않도록 업로드 한 장의 분석 결과를 보관한다.
+  - 키: 디코딩된 픽셀(모드, 크기, 바이트)의 SHA1
+  - 근접 중복: 키가 없으면 64비트 dHash 해밍 거리가 UPLOAD_CACHE_PHASH_DISTANCE 이하이고
+    가로세로 비율이 같은 항목의 영역 마스크만 재사용 (재압축/리사이즈된 같은 사진). 0 이면 끔
+    dHash 는 색을 보지 않으므로 영역 임베딩/검색 결과는 키가 정확히 같을 때만 재사용한다
+  - 값: 추론 해상도 영역 마스크(ClothingRegions), 영역별 임베딩 + 카테고리,
+        (영역, top_k, 필터, 카탈로그 세대)별 검색 결과
+  - 크기 상한(UPLOAD_CACHE_MAX_MB) 초과 시 오래 안 쓰인 항목부터 제거
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import UPLOAD_CACHE_MAX_MB, UPLOAD_CACHE_PHASH_DISTANCE
+from app.models.segmentation_postprocess import ClothingRegions
+
+# 결과 목록은 항목당 대략 이 정도 크기로 계산 (상품 분석 dict 포함)
+RESULT_ENTRY_BYTES = 2048
+ASPECT_TOLERANCE = 0.01
+
+
+def image_fingerprint(image: Image.Image) -> str:
+    """디코딩된 픽셀 기준 SHA1 (파일 포맷/메타데이터가 달라도 픽셀이 같으면 같은 키)"""
+    h = hashlib.sha1(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """64비트 dHash (9x8 흑백 축소 후 가로 인접 화소 밝기 비교)"""
+    small = np.asarray(image.convert("L").resize((9, 8), resample=Image.BOX), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class UploadAnalysis:
+    """업로드 한 장의 분석 결과 (영역 마스크 / 영역별 임베딩 / 검색 결과)"""
+
+    def __init__(self, key: str, phash: int, regions: ClothingRegions):
+        self.key = key
+        self.phash = phash
+        self.regions = regions
+        self.embeddings: Dict[str, Tuple[np.ndarray, list]] = {}  # 영역 -> (임베딩, 카테고리 예측)
+        self.results: Dict[tuple, List[Dict[str, Any]]] = {}
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.regions.size
+
+    def regions_for(self, image: Image.Image) -> ClothingRegions:
+        """이 이미지 크기에 맞춘 영역 (근접 중복 항목이면 같은 마스크를 새 크기로 펼침)"""
+        if image.size == self.regions.size:
+            return self.regions
+        return ClothingRegions(self.regions.masks, image.size)
+
+    def nbytes(self) -> int:
+        masks = sum(m.nbytes for m in {id(m): m for m in self.regions.masks.values()}.values())
+        embeddings = sum(e.nbytes for e, _ in self.embeddings.values())
+        results = sum(len(r) for r in self.results.values()) * RESULT_ENTRY_BYTES
+        return masks + embeddings + results
+
+
+class UploadSearchCache:
+    """내용 해시 + dHash 근접 중복 조회, 크기 상한 LRU (스레드 안전)"""
+
+    def __init__(self, max_bytes: int = int(UPLOAD_CACHE_MAX_MB * 1e6),
+                 phash_distance: int = UPLOAD_CACHE_PHASH_DISTANCE):
+        self.max_bytes = max_bytes
+        self.phash_distance = phash_distance
+        self._entries: "OrderedDict[str, UploadAnalysis]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "evicted": 0,
+                      "embedding_hits": 0, "embedding_misses": 0, "result_hits": 0, "result_misses": 0}
+
+    def lookup(self, image: Image.Image) -> Tuple[Optional[UploadAnalysis], str, int]:
+        """
+        (분석 결과 또는 None, 픽셀 키, dHash)
+
+        반환된 분석 결과의 key 가 픽셀 키와 다르면 근접 중복이다. 이때는 영역 마스크만 재사용해야 한다.
+        """
+        key = image_fingerprint(image)
+        phash = perceptual_hash(image)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return analysis, key, phash
+
+            if self.phash_distance > 0:
+                aspect = image.size[0] / image.size[1]
+                for candidate in reversed(self._entries.values()):
+                    w, h = candidate.size
+                    if (abs(w / h - aspect) <= ASPECT_TOLERANCE * aspect
+                            and hamming_distance(candidate.phash, phash) <= self.phash_distance):
+                        self._entries.move_to_end(candidate.key)
+                        self.stats["near_hits"] += 1
+                        return candidate, key, phash
+
+            self.stats["misses"] += 1
+        return None, key, phash
+
+    def put(self, analysis: UploadAnalysis):
+        """분석 결과 저장 (이미 있으면 크기만 다시 계산)"""
+        with self._lock:
+            self._entries[analysis.key] = analysis
+            self._entries.move_to_end(analysis.key)
+            self._resize(analysis)
+
+    def record(self, kind: str, hit: bool):
+        """임베딩/결과 재사용 통계 (kind: 'embedding' | 'result')"""
+        with self._lock:
+            self.stats[f"{kind}_{'hits' if hit else 'misses'}"] += 1
+
+    def update(self, analysis: UploadAnalysis):
+        """분석 결과에 임베딩/결과를 채운 뒤 크기 반영 (캐시에 없는 항목은 무시)"""
+        with self._lock:
+            if analysis.key in self._entries:
+                self._resize(analysis)
+
+    def _resize(self, analysis: UploadAnalysis):
+        """항목 크기 갱신 후 상한까지 LRU 제거 (락 보유 상태에서 호출)"""
+        size = analysis.nbytes()
+        self._bytes += size - self._sizes.get(analysis.key, 0)
+        self._sizes[analysis.key] = size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self.stats["evicted"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["exact_hits"] + self.stats["near_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["near_hits"]
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._bytes / 1e6, 2),
+                "max_mb": round(self.max_bytes / 1e6, 2),
+                "phash_distance": self.phash_distance,
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# 전역 캐시 인스턴스
+_upload_cache = None
+_upload_cache_lock = threading.Lock()
+
+def get_upload_cache() -> UploadSearchCache:
+    """업로드 분석 캐시 인스턴스 반환 (싱글톤 패턴)"""
+    global _upload_cache
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            _upload_cache = UploadSearchCache()
+    return _upload_cache
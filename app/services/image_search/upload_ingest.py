@@ -0,0 +1,133 @@
+"""
+업로드 이미지 수신/디코딩 공통 처리 (이미지 검색 / 고급 검색 / 카탈로그 추가·수정 / 패션 합성)
+
+  - 읽기: UploadFile 을 청크 단위로 읽으며 바이트 상한(MAX_UPLOAD_BYTES)을 넘는 순간 중단
+          (file.size 가 비어 있는 요청도 전체를 메모리에 올리지 않음)
+  - 디코딩: JPEG 은 draft 로 DCT 단계에서 목표 해상도 근처(짧은 변 target 이상)까지 축소,
+            PNG/WEBP 는 디코딩 후 정수 배 reduce. 화소 수 상한으로 압축 폭탄 차단
+  - EXIF 회전 적용 후 RGB 한 장을 반환하고, 이후 단계(분할/임베딩/저장)는 이 이미지를 그대로 재사용
+"""
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+from PIL import Image, ImageOps
+
+from app.core.config import (
+    IMAGE_DECODE_WORKERS, UPLOAD_CATALOG_DECODE_SIDE, UPLOAD_COMPOSE_DECODE_SIDE,
+    UPLOAD_MAX_PIXELS, UPLOAD_SEARCH_DECODE_SIDE, U2NET_MAX_SIDE,
+)
+
+# 업로드 이미지 한 장 최대 크기 (10MB)
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+READ_CHUNK_BYTES = 256 * 1024
+SUPPORTED_FORMATS = ("JPEG", "PNG", "WEBP")
+
+# 용도별 디코딩 목표 (짧은 변 기준). 고급 검색은 U2NET 추론 해상도까지만 필요
+DECODE_SIDES = {
+    "search": UPLOAD_SEARCH_DECODE_SIDE,
+    "advanced": U2NET_MAX_SIDE or UPLOAD_CATALOG_DECODE_SIDE,
+    "catalog": UPLOAD_CATALOG_DECODE_SIDE,
+    "compose": UPLOAD_COMPOSE_DECODE_SIDE,
+}
+
+
+class UploadTooLarge(ValueError):
+    """바이트 상한 초과"""
+
+
+async def read_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    UploadFile → 바이트 (청크 단위로 읽고 상한을 넘으면 즉시 중단)
+
+    Raises:
+        UploadTooLarge: 상한 초과
+        ValueError: 빈 파일
+    """
+    limit_mb = max_bytes // (1024 * 1024)
+    if file.size and file.size > max_bytes:
+        raise UploadTooLarge(f"파일 크기는 {limit_mb}MB를 초과할 수 없습니다.")
+
+    await file.seek(0)
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        if len(buffer) + len(chunk) > max_bytes:
+            raise UploadTooLarge(f"파일 크기는 {limit_mb}MB를 초과할 수 없습니다.")
+        buffer += chunk
+
+    if not buffer:
+        raise ValueError("이미지 파일이 비어있습니다.")
+    return bytes(buffer)
+
+
+def decode_upload(data: bytes, target_side: int = UPLOAD_SEARCH_DECODE_SIDE) -> Image.Image:
+    """
+    업로드 바이트 → RGB 이미지 (짧은 변이 target_side 이상 유지되는 범위에서 축소 디코딩, EXIF 회전 적용)
+
+    target_side 가 0 이면 원본 해상도로 디코딩한다.
+
+    Raises:
+        ValueError: 비어 있거나 지원하지 않는 형식 / 화소 수 상한 초과
+    """
+    if not data:
+        raise ValueError("이미지 파일이 비어있습니다.")
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.UnidentifiedImageError:
+        raise ValueError("이미지 파일을 읽을 수 없습니다.")
+    if image.format not in SUPPORTED_FORMATS:
+        raise ValueError("지원하지 않는 이미지 형식입니다. JPEG, PNG, WEBP만 지원됩니다.")
+    if target_side and image.format == "JPEG":
+        image.draft("RGB", (target_side, target_side))
+    # JPEG 은 draft 후 크기(실제 디코딩 크기) 기준
+    if image.width * image.height > UPLOAD_MAX_PIXELS:
+        raise ValueError(f"이미지 해상도가 너무 큽니다. ({image.width}x{image.height})")
+    image.load()
+
+    if target_side:
+        factor = min(image.size) // target_side
+        if factor >= 2:
+            image = image.reduce(factor)
+
+    image = ImageOps.exif_transpose(image)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+# 업로드 이미지 디코딩 전용 풀 (PIL 디코더는 GIL 을 풀어 스레드로 병렬화됨)
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+def get_decode_pool() -> ThreadPoolExecutor:
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            _decode_pool = ThreadPoolExecutor(max_workers=max(1, IMAGE_DECODE_WORKERS),
+                                              thread_name_prefix="image-decode")
+    return _decode_pool
+
+
+def decode_uploads(payloads: List[bytes], target_side: int = UPLOAD_SEARCH_DECODE_SIDE) -> List[Any]:
+    """여러 업로드를 병렬 디코딩. 항목별 결과는 Image 또는 실패 사유 문자열"""
+    def safe_decode(data: bytes):
+        try:
+            return decode_upload(data, target_side)
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+    return list(get_decode_pool().map(safe_decode, payloads))
+
+
+async def ingest_upload(file, purpose: str = "search", max_bytes: int = MAX_UPLOAD_BYTES) -> Image.Image:
+    """
+    UploadFile → 용도별 해상도의 RGB 이미지 (읽기는 이벤트 루프, 디코딩은 image-decode 풀)
+
+    Raises:
+        ValueError: 상한 초과 / 빈 파일 / 지원하지 않는 형식 (라우트에서 400 으로 변환)
+    """
+    data = await read_upload(file, max_bytes)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_decode_pool(), decode_upload, data, DECODE_SIDES[purpose])
@@ -1,26 +1,9 @@
 """
 유틸리티 함수들
 """
-import numpy as np
 from typing import Any, Dict, List
 
 
-def convert_analysis_to_json_safe(data: Any) -> Any:
-    """numpy 타입을 JSON 직렬화 가능한 타입으로 변환"""
-    if isinstance(data, dict):
-        return {key: convert_analysis_to_json_safe(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [convert_analysis_to_json_safe(item) for item in data]
-    elif isinstance(data, np.integer):
-        return int(data)
-    elif isinstance(data, np.floating):
-        return float(data)
-    elif isinstance(data, np.ndarray):
-        return data.tolist()
-    else:
-        return data
-
-
 def format_analysis_for_frontend(product_info: Dict[str, Any], similarity_score: float, 
                                 analyzer) -> Dict[str, Any]:
     """프론트엔드가 기대하는 구조로 분석 결과 변환"""
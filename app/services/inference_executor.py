@@ -0,0 +1,143 @@
+"""
+모델/인덱스 호출 전용 추론 실행기
+
+async 라우트에서 torch/FAISS 동기 호출을 이벤트 루프 밖으로 보내기 위한
+제한된 스레드 풀. 대기열이 가득 차면 기다리지 않고 InferenceQueueFull 을
+발생시켜 라우트가 즉시 503 으로 응답하게 한다.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_TORCH_THREADS
+
+
+class InferenceQueueFull(RuntimeError):
+    """추론 대기열 포화"""
+
+
+def set_torch_threads(num_threads: int):
+    """워커 스레드의 torch intra-op 스레드 수 설정 (torch 미설치 시 무시)"""
+    try:
+        import torch
+        torch.set_num_threads(max(1, int(num_threads)))
+    except ImportError:
+        pass
+
+
+class InferenceExecutor(Executor):
+    """워커 수 + 대기열 크기가 제한된 추론 실행기 (concurrent.futures.Executor 호환)"""
+
+    def __init__(self, max_workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_QUEUE_SIZE,
+                 torch_threads: int = INFERENCE_TORCH_THREADS):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.torch_threads = torch_threads
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+            initializer=set_torch_threads,
+            initargs=(torch_threads,),
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "queued": 0,
+            "running": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_run_ms": 0.0,
+        }
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """작업 제출. 워커+대기열이 모두 차 있으면 InferenceQueueFull"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise InferenceQueueFull(
+                f"추론 대기열이 가득 찼습니다 (workers={self.max_workers}, queue={self.max_queue})"
+            )
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+
+        def task():
+            started = time.perf_counter()
+            wait_ms = (started - enqueued) * 1000
+            with self._lock:
+                self._stats["queued"] -= 1
+                self._stats["running"] += 1
+                self._stats["total_wait_ms"] += wait_ms
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._stats["running"] -= 1
+                    self._stats["completed" if ok else "failed"] += 1
+                    self._stats["total_run_ms"] += (time.perf_counter() - started) * 1000
+                self._slots.release()
+
+        try:
+            return self._pool.submit(task)
+        except Exception:
+            with self._lock:
+                self._stats["queued"] -= 1
+            self._slots.release()
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """이벤트 루프를 막지 않고 fn 실행 결과를 await"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        done = s["completed"] + s["failed"]
+        started = done + s["running"]
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "torch_threads": self.torch_threads,
+            "queue_depth": s["queued"],
+            "running": s["running"],
+            "submitted": s["submitted"],
+            "completed": s["completed"],
+            "failed": s["failed"],
+            "rejected": s["rejected"],
+            "avg_wait_ms": round(s["total_wait_ms"] / started, 3) if started else 0.0,
+            "max_wait_ms": round(s["max_wait_ms"], 3),
+            "avg_run_ms": round(s["total_run_ms"] / done, 3) if done else 0.0,
+        }
+
+
+# 전역 실행기 인스턴스
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_inference_executor() -> InferenceExecutor:
+    """추론 실행기 인스턴스 반환 (싱글톤 패턴)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor()
+            print(f"추론 실행기 시작: workers={_executor.max_workers}, queue={_executor.max_queue}, "
+                  f"torch_threads={_executor.torch_threads}")
+    return _executor
+
+async def run_inference(fn: Callable, *args, **kwargs) -> Any:
+    """편의 함수: 모델/인덱스 동기 호출을 추론 실행기에서 실행"""
+    return await get_inference_executor().run(fn, *args, **kwargs)
@@ -0,0 +1,202 @@
+"""
+동적 마이크로배칭 추론 런타임
+
+같은 모델에 대한 동시 호출을 큐에 모았다가 max_batch_size 에 도달하거나
+max_wait_ms 가 지나면 한 번의 배치 forward 로 처리한다.
+큐에 max_pending 개가 쌓여 있으면 더 받지 않고 InferenceQueueFull 을 발생시킨다
+(InferenceExecutor 와 같은 예외라 라우트는 그대로 503 으로 응답).
+런타임은 자체 이벤트 루프 스레드를 가지므로 async 라우트(await submit)와
+동기 코드(submit_sync, 워커 스레드 등) 모두에서 같은 큐를 공유한다.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import (
+    INFERENCE_BATCH_MAX_PENDING, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, INFERENCE_TORCH_THREADS,
+)
+from app.services.inference_executor import InferenceQueueFull, set_torch_threads
+
+BatchFn = Callable[[List[Any]], List[Any]]
+
+
+class MicroBatcher:
+    """모델 하나에 대한 배치 큐"""
+
+    def __init__(self, name: str, batch_fn: BatchFn, runtime: "InferenceRuntime",
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None,
+                 max_pending: Optional[int] = None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.runtime = runtime
+        self.max_batch_size = max(1, int(max_batch_size or INFERENCE_MAX_BATCH_SIZE))
+        self.max_wait_s = float(INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        # flush 중인 배치는 제외한 대기 항목 수 상한
+        self.max_pending = max(self.max_batch_size, int(max_pending or INFERENCE_BATCH_MAX_PENDING))
+
+        # 아래 상태는 런타임 루프 스레드에서만 접근
+        self._pending: List[tuple] = []
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "max_batch_seen": 0,
+            "max_queue_depth": 0,
+            "total_wait_ms": 0.0,
+            "total_batch_ms": 0.0,
+        }
+
+    # 공개 API
+    async def submit(self, item: Any) -> Any:
+        """비동기 제출 (어느 이벤트 루프에서든 await 가능). 큐가 가득 차 있으면 InferenceQueueFull"""
+        future = asyncio.run_coroutine_threadsafe(self._enqueue(item), self.runtime.loop)
+        return await asyncio.wrap_future(future)
+
+    def submit_sync(self, item: Any) -> Any:
+        """동기 제출 (워커 스레드용). 런타임 루프 스레드 안에서는 직접 실행"""
+        if threading.current_thread() is self.runtime.thread:
+            return self.batch_fn([item])[0]
+        return asyncio.run_coroutine_threadsafe(self._enqueue(item), self.runtime.loop).result()
+
+    def metrics(self) -> Dict[str, Any]:
+        s = self._stats
+        items = s["completed"] + s["failed"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "queue_depth": len(self._pending),
+            "max_pending": self.max_pending,
+            "max_queue_depth": s["max_queue_depth"],
+            "submitted": s["submitted"],
+            "completed": s["completed"],
+            "failed": s["failed"],
+            "rejected": s["rejected"],
+            "batches": s["batches"],
+            "avg_batch_size": round(items / s["batches"], 2) if s["batches"] else 0.0,
+            "max_batch_seen": s["max_batch_seen"],
+            "avg_wait_ms": round(s["total_wait_ms"] / items, 3) if items else 0.0,
+            "avg_batch_ms": round(s["total_batch_ms"] / s["batches"], 3) if s["batches"] else 0.0,
+        }
+
+    # 런타임 루프 내부
+    async def _enqueue(self, item: Any) -> Any:
+        if self._worker is None:
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+        if len(self._pending) >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise InferenceQueueFull(f"{self.name}: 배치 대기열이 가득 찼습니다 (max_pending={self.max_pending})")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self._stats["submitted"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._pending))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_wait_s)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+            if not self._pending:
+                self._has_items.clear()
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[tuple]):
+        items = [entry[0] for entry in batch]
+        started = time.perf_counter()
+        self._stats["total_wait_ms"] += sum(started - entry[2] for entry in batch) * 1000
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.runtime.executor, self.batch_fn, items
+            )
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name}: 배치 결과 개수 불일치 ({len(results)} != {len(items)})")
+        except Exception as e:
+            print(f"[{self.name}] 배치 추론 실패 ({len(items)}개): {e}")
+            self._stats["failed"] += len(items)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self._stats["completed"] += len(items)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(items))
+            self._stats["total_batch_ms"] += (time.perf_counter() - started) * 1000
+
+
+class InferenceRuntime:
+    """배처 레지스트리 + 전용 이벤트 루프 스레드"""
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        self.batchers: Dict[str, MicroBatcher] = {}
+        # 배치 flush 전용 풀: 요청 단위 작업(InferenceExecutor)이 submit_sync 로 기다리는 동안에도
+        # flush 가 워커를 얻지 못해 교착되지 않도록 분리한다. 배처마다 flush 는 직렬이라 크기가 자연히 제한됨
+        self.executor = executor or ThreadPoolExecutor(
+            thread_name_prefix="inference-batch",
+            initializer=set_torch_threads,
+            initargs=(INFERENCE_TORCH_THREADS,),
+        )
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="inference-runtime", daemon=True)
+        self._lock = threading.Lock()
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def batcher(self, name: str, batch_fn: Optional[BatchFn] = None, **kwargs) -> MicroBatcher:
+        """이름으로 배처 조회, 없으면 batch_fn 으로 생성"""
+        with self._lock:
+            if name not in self.batchers:
+                if batch_fn is None:
+                    raise KeyError(f"등록되지 않은 배처: {name}")
+                self.batchers[name] = MicroBatcher(name, batch_fn, self, **kwargs)
+            return self.batchers[name]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: b.metrics() for name, b in self.batchers.items()}
+
+
+# 전역 런타임 인스턴스
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def get_inference_runtime() -> InferenceRuntime:
+    """추론 런타임 인스턴스 반환 (싱글톤 패턴)"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = InferenceRuntime()
+    return _runtime
+
+def get_batcher(name: str, batch_fn: Optional[BatchFn] = None, **kwargs) -> MicroBatcher:
+    """편의 함수: 공유 런타임의 배처 조회/생성"""
+    return get_inference_runtime().batcher(name, batch_fn, **kwargs)
@@ -0,0 +1,246 @@
+"""
+모델 레지스트리
+
+이름으로 공유 모델 인스턴스를 내어 준다. 같은 체크포인트는 프로세스당 한 번만 로드되고,
+MODEL_PRELOAD 에 있는 모델은 서버 시작 시, 나머지는 첫 사용 시 로드된다.
+모델별 파라미터 메모리 / 로드 시간 / 사용 횟수를 기록하고, MODEL_MEMORY_LIMIT_MB 를
+넘으면 MODEL_IDLE_SECONDS 이상 쓰이지 않은 모델부터 내린다 (pinned 모델 제외).
+
+내려간 모델을 호출자가 아직 참조하고 있으면 그 호출이 끝날 때 메모리가 해제되고,
+다음 get() 에서 다시 로드된다. 인스턴스를 오래 들고 있는 호출자가 있는 모델은 pinned 로 등록한다.
+"""
+import gc
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import MODEL_PRELOAD, MODEL_MEMORY_LIMIT_MB, MODEL_IDLE_SECONDS
+
+Loader = Callable[[], Any]
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+KO_SROBERTA_MODEL_NAME = "jhgan/ko-sroberta-multitask"
+QA_GENERATOR_MODEL_NAME = "gpt2"
+TRANSLATOR_MODEL_NAME = "facebook/m2m100_418M"
+
+
+def _torch_modules(obj: Any) -> List[Any]:
+    """로드 결과에서 torch 모듈 찾기 (모듈 / (모델, 전처리기) 튜플 / transformers pipeline)"""
+    try:
+        import torch
+    except ImportError:
+        return []
+    if isinstance(obj, torch.nn.Module):
+        return [obj]
+    if isinstance(obj, (tuple, list)):
+        return [m for item in obj for m in _torch_modules(item)]
+    model = getattr(obj, "model", None)
+    return [model] if isinstance(model, torch.nn.Module) else []
+
+
+def parameter_bytes(obj: Any) -> int:
+    """파라미터 + 버퍼 메모리 (공유 텐서는 한 번만 셈)"""
+    seen = set()
+    total = 0
+    for module in _torch_modules(obj):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            if tensor.data_ptr() in seen:
+                continue
+            seen.add(tensor.data_ptr())
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelEntry:
+    """등록된 모델 하나의 상태"""
+
+    def __init__(self, name: str, loader: Loader, pinned: bool = False):
+        self.name = name
+        self.loader = loader
+        self.pinned = pinned
+        self.instance = None
+        self.lock = threading.Lock()
+        self.param_bytes = 0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.unloads = 0
+        self.uses = 0
+        self.last_used = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "pinned": self.pinned,
+            "param_mb": round(self.param_bytes / 1e6, 1),
+            "load_seconds": round(self.load_seconds, 2),
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "uses": self.uses,
+            "idle_seconds": round(time.time() - self.last_used, 1) if self.last_used else None,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """이름 → 공유 모델 인스턴스 (지연 로드, 중복 제거, 메모리 상한)"""
+
+    def __init__(self, memory_limit_mb: float = MODEL_MEMORY_LIMIT_MB, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.memory_limit_bytes = int(memory_limit_mb * 1e6)
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Loader, pinned: bool = False) -> ModelEntry:
+        """로더 등록 (이미 있으면 기존 항목 유지)"""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name, loader, pinned)
+            return self._entries[name]
+
+    def _entry(self, name: str) -> ModelEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"등록되지 않은 모델: {name} (가능: {', '.join(self._entries)})")
+        return entry
+
+    def get(self, name: str) -> Any:
+        """공유 인스턴스 반환 (없으면 로드). 로드 실패 시 로더의 예외를 그대로 전달"""
+        entry = self._entry(name)
+        entry.uses += 1
+        entry.last_used = time.time()
+        instance = entry.instance
+        if instance is not None:
+            return instance
+
+        with entry.lock:
+            if entry.instance is None:
+                started = time.perf_counter()
+                try:
+                    instance = entry.loader()
+                except Exception as e:
+                    entry.error = str(e)
+                    print(f"[models] {name} 로드 실패: {e}")
+                    raise
+                entry.load_seconds = time.perf_counter() - started
+                entry.param_bytes = parameter_bytes(instance)
+                entry.loads += 1
+                entry.error = None
+                entry.instance = instance
+                print(f"[models] {name} 로드 완료: {entry.param_bytes / 1e6:.1f}MB, {entry.load_seconds:.2f}초")
+            instance = entry.instance
+
+        self._enforce_limit(exclude=name)
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._entries and self._entries[name].loaded
+
+    def unload(self, name: str) -> bool:
+        """모델 내리기 (다음 get() 에서 재로드)"""
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.instance is None:
+                return False
+            entry.instance = None
+            entry.unloads += 1
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        print(f"[models] {name} 언로드: {entry.param_bytes / 1e6:.1f}MB 해제")
+        return True
+
+    def loaded_bytes(self) -> int:
+        return sum(e.param_bytes for e in self._entries.values() if e.loaded)
+
+    def _enforce_limit(self, exclude: Optional[str] = None):
+        """메모리 상한 초과 시 오래 쓰이지 않은 모델부터 언로드"""
+        if self.memory_limit_bytes <= 0 or self.loaded_bytes() <= self.memory_limit_bytes:
+            return
+        now = time.time()
+        candidates = sorted(
+            (e for e in self._entries.values()
+             if e.loaded and not e.pinned and e.name != exclude and now - e.last_used >= self.idle_seconds),
+            key=lambda e: e.last_used,
+        )
+        for entry in candidates:
+            if self.loaded_bytes() <= self.memory_limit_bytes:
+                break
+            self.unload(entry.name)
+        if self.loaded_bytes() > self.memory_limit_bytes:
+            print(f"[models] 메모리 상한 초과 유지: {self.loaded_bytes() / 1e6:.1f}MB > "
+                  f"{self.memory_limit_bytes / 1e6:.1f}MB (유휴 모델 없음)")
+
+    def preload(self, names: Optional[List[str]] = None):
+        """시작 시 로드 (기본: MODEL_PRELOAD). 실패한 모델은 첫 사용 때 다시 시도"""
+        for name in (MODEL_PRELOAD if names is None else names):
+            if name not in self._entries:
+                print(f"[models] 알 수 없는 사전 로드 모델 무시: {name}")
+                continue
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "memory_limit_mb": round(self.memory_limit_bytes / 1e6, 1),
+            "idle_seconds": self.idle_seconds,
+            "loaded_mb": round(self.loaded_bytes() / 1e6, 1),
+            "models": {name: e.metrics() for name, e in self._entries.items()},
+        }
+
+
+# 기본 모델 로더 (무거운 import 는 로드 시점에)
+def _load_clip():
+    from transformers import CLIPModel, CLIPProcessor
+    return CLIPModel.from_pretrained(CLIP_MODEL_NAME).eval(), CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+
+def _load_ko_sroberta():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(KO_SROBERTA_MODEL_NAME)
+
+def _load_qa_generator():
+    from transformers import GPT2LMHeadModel, GPT2Tokenizer, pipeline
+    tok = GPT2Tokenizer.from_pretrained(QA_GENERATOR_MODEL_NAME)
+    model = GPT2LMHeadModel.from_pretrained(QA_GENERATOR_MODEL_NAME)
+    return pipeline("text-generation", model=model, tokenizer=tok, device=-1), tok
+
+def _load_translator():
+    from transformers import pipeline
+    return pipeline("translation", model=TRANSLATOR_MODEL_NAME, tokenizer=TRANSLATOR_MODEL_NAME)
+
+def _load_u2net():
+    from app.models.cloth_segmentation_model import load_u2net
+    return load_u2net()
+
+
+# 전역 레지스트리 인스턴스
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """모델 레지스트리 인스턴스 반환 (싱글톤 패턴)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+            # CLIP 은 검색 서비스/이미지 처리기가 계속 참조하므로 고정
+            _registry.register("clip", _load_clip, pinned=True)
+            _registry.register("ko-sroberta", _load_ko_sroberta)
+            _registry.register("qa-generator", _load_qa_generator)
+            _registry.register("m2m100", _load_translator)
+            _registry.register("u2net", _load_u2net)
+    return _registry
+
+def get_model(name: str) -> Any:
+    """편의 함수: 공유 모델 인스턴스"""
+    return get_model_registry().get(name)
@@ -9,31 +9,29 @@ try:
 except Exception:
     pipeline = None  # type: ignore
 
-# 전역 번역 파이프라인 (m2m100) + 락
-#  - 프로세스당 1회 로딩
+# 번역 파이프라인 (m2m100) + 락
+#  - 인스턴스는 모델 레지스트리 'm2m100' 이 관리 (지연 로드, 유휴 시 언로드 가능)
+#  - 로드 실패는 프로세스당 1회만 시도 후 규칙 기반으로 동작
 #  - 동시성 안전
-_translator = None
+_translator_failed = False
 _lock = threading.Lock()
 
-def _init_translator():
-    """m2m100 번역 파이프라인을 1회 초기화"""
-    global _translator
-    if _translator is not None:
-        return
+def _get_translator():
+    """m2m100 번역 파이프라인 (불가하면 None)"""
+    global _translator_failed
+    if _translator_failed:
+        return None
     if pipeline is None:
         print("[translate] transformers not available; rule-based only")
-        _translator = None
-        return
+        _translator_failed = True
+        return None
     try:
-        _translator = pipeline(
-            "translation",
-            model="facebook/m2m100_418M",
-            tokenizer="facebook/m2m100_418M",
-        )
-        print("[translate] m2m100 translator loaded")
+        from app.services.model_registry import get_model
+        return get_model("m2m100")
     except Exception as e:
-        _translator = None
+        _translator_failed = True
         print(f"[translate] m2m100 load failed; rule-based only: {e}")
+        return None
 
 
 # 정규식(사전 컴파일) & 정규화 & 텍스트 정리
@@ -66,17 +64,17 @@ def tokenize_ko(q: str) -> List[str]:
 #  - LRU 캐시로 동일 입력 중복 호출 방지
 @lru_cache(maxsize=4096)
 def _m2m_cached(text: str, src: str, tgt: str, max_len: int) -> str:
-    _init_translator()
     if not text:
         return ""
-    if _translator is None:
+    translator = _get_translator()
+    if translator is None:
         # 규칙 기반만 가능할 때는 원문 반환 (상위 단계에서 처리)
         return text
     with _lock:
-        _translator.tokenizer.src_lang = src
-        out = _translator(
+        translator.tokenizer.src_lang = src
+        out = translator(
             text[:1000],
-            forced_bos_token_id=_translator.tokenizer.get_lang_id(tgt),
+            forced_bos_token_id=translator.tokenizer.get_lang_id(tgt),
             max_length=max_len,
         )
     return clean_noise(out[0]["translation_text"])
@@ -0,0 +1,316 @@
+"""
+Colab 클라이언트 (연결 풀 / 서킷 브레이커 / 헤징) 테스트
+
+실제 ngrok 터널 대신 asyncio.start_server 로 띄운 로컬 HTTP 서버를 사용한다.
+서버 동작(mode)으로 정상 응답 / 502 / 응답 없음(멈춘 터널) / 지연 응답을 흉내 낸다.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.colab_client import CircuitBreaker, ColabClient, ColabUnavailable
+
+
+class StandInServer:
+    """keep-alive 를 지원하는 최소 HTTP/1.1 서버 (연결 수 / 요청 수 기록)"""
+
+    def __init__(self, mode: str = "ok", delay: float = 0.0):
+        self.mode = mode
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+        self._handlers = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        for task in self._handlers:
+            task.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+
+                if self.mode == "hang":
+                    await asyncio.sleep(3600)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if self.mode == "ok":
+                    payload = json.loads(body or b"{}")
+                    status, data = "200 OK", json.dumps({"query_used": f"colab {payload.get('query', '')}"})
+                else:
+                    status, data = "502 Bad Gateway", "tunnel offline"
+                data = data.encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_client(url: str, failures: int = 3, reset_seconds: float = 30.0, clock=time.monotonic,
+                timeout: float = 5.0) -> ColabClient:
+    return ColabClient(url, timeout=timeout, connect_timeout=1.0, max_connections=4,
+                       breaker=CircuitBreaker(failures, reset_seconds, clock=clock))
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=15))
+
+
+async def colab_images(colab_data):
+    return {"images": [colab_data["query_used"]], "source": "colab"}
+
+
+def local_search(delay: float = 0.0):
+    async def search():
+        await asyncio.sleep(delay)
+        return {"images": ["local"], "source": "local"}
+    return search
+
+
+# 서킷 브레이커
+def test_breaker_opens_after_consecutive_failures():
+    async def scenario():
+        async with StandInServer(mode="error") as server:
+            client = make_client(server.url, failures=3)
+            for _ in range(3):
+                with pytest.raises(ColabUnavailable):
+                    await client.post_json("/fashion-query", {"query": "셔츠"})
+            assert client.breaker.state == "open"
+
+            # open 상태에서는 서버까지 가지 않고 바로 실패
+            with pytest.raises(ColabUnavailable):
+                await client.post_json("/fashion-query", {"query": "셔츠"})
+            assert server.requests == 3
+            assert client.breaker.metrics()["rejected"] == 1
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_half_open_probe_and_recovery():
+    async def scenario():
+        clock = FakeClock()
+        async with StandInServer(mode="error") as server:
+            client = make_client(server.url, failures=2, reset_seconds=30, clock=clock)
+            for _ in range(2):
+                with pytest.raises(ColabUnavailable):
+                    await client.post_json("/fashion-query", {})
+            assert client.breaker.state == "open"
+
+            # 재시도 시간이 지나면 half_open, 시험 호출이 실패하면 다시 open
+            clock.now += 30
+            assert client.breaker.state == "half_open"
+            with pytest.raises(ColabUnavailable):
+                await client.post_json("/fashion-query", {})
+            assert client.breaker.state == "open"
+            assert server.requests == 3
+
+            # 서버 복구 후 시험 호출 한 건만 허용, 성공하면 closed
+            server.mode = "ok"
+            clock.now += 30
+            assert client.breaker.allow()
+            assert not client.breaker.allow()
+            client.breaker.release()
+            data = await client.post_json("/fashion-query", {"query": "셔츠"})
+            assert data == {"query_used": "colab 셔츠"}
+            assert client.breaker.state == "closed"
+            assert client.breaker.metrics()["consecutive_failures"] == 0
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_cancelled_probe_releases_half_open_slot():
+    async def scenario():
+        clock = FakeClock()
+        async with StandInServer(mode="hang") as server:
+            client = make_client(server.url, failures=1, clock=clock)
+            client.breaker.record_failure()
+            clock.now += 30
+
+            probe = asyncio.create_task(client.post_json("/fashion-query", {}))
+            await asyncio.sleep(0.1)
+            assert not client.breaker.allow()
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            # 취소는 실패로 세지 않고 시험 호출 자리만 반납
+            assert client.breaker.state == "half_open"
+            assert client.breaker.allow()
+            await client.aclose()
+
+    run(scenario())
+
+
+# 연결 풀
+def test_connection_reused_across_calls():
+    async def scenario():
+        async with StandInServer(mode="ok") as server:
+            client = make_client(server.url)
+            for i in range(5):
+                data = await client.post_json("/fashion-query", {"query": str(i)})
+                assert data["query_used"] == f"colab {i}"
+            assert server.requests == 5
+            assert server.connections == 1
+            assert client.metrics()["pool_open"]
+
+            await client.aclose()
+            assert not client.metrics()["pool_open"]
+
+    run(scenario())
+
+
+# 헤징
+def test_hedge_colab_wins_within_delay():
+    async def scenario():
+        async with StandInServer(mode="ok") as server:
+            client = make_client(server.url)
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                        local_search(), delay_s=0.5)
+            assert result["source"] == "colab"
+            assert client.search_stats["colab"] == 1
+            assert client.search_stats["hedged"] == 0
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_hedge_slow_colab_still_wins_over_slower_local():
+    async def scenario():
+        async with StandInServer(mode="ok", delay=0.2) as server:
+            client = make_client(server.url)
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                        local_search(delay=1.0), delay_s=0.05)
+            assert result["source"] == "colab"
+            assert client.search_stats["colab"] == 1
+            assert client.search_stats["hedged"] == 1
+            assert client.search_stats["abandoned"] == 0
+            assert client.breaker.state == "closed"
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_hedge_local_wins_over_hung_colab_and_opens_breaker():
+    async def scenario():
+        async with StandInServer(mode="hang") as server:
+            client = make_client(server.url, failures=3)
+            for _ in range(3):
+                started = time.perf_counter()
+                result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                            local_search(), delay_s=0.1)
+                assert result["source"] == "local"
+                assert time.perf_counter() - started >= 0.1
+            # 응답 없는 Colab 호출을 버릴 때마다 실패로 집계 → 서킷 open
+            assert client.breaker.state == "open"
+            assert client.search_stats["abandoned"] == 3
+
+            # open 이후에는 지연 없이 로컬만 실행
+            started = time.perf_counter()
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                        local_search(), delay_s=0.1)
+            assert result["source"] == "local"
+            assert time.perf_counter() - started < 0.1
+            assert client.search_stats["local_only"] == 1
+            assert server.requests == 3
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_hedge_colab_fails_fast_without_waiting_for_delay():
+    async def scenario():
+        async with StandInServer(mode="error") as server:
+            client = make_client(server.url)
+            started = time.perf_counter()
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                        local_search(), delay_s=1.0)
+            assert result["source"] == "local"
+            assert time.perf_counter() - started < 0.5
+            assert client.search_stats["hedged"] == 0
+            assert client.search_stats["abandoned"] == 0
+            assert client.breaker.metrics()["consecutive_failures"] == 1
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_hedge_waits_for_colab_when_local_has_no_result():
+    async def scenario():
+        async with StandInServer(mode="ok", delay=0.2) as server:
+            client = make_client(server.url)
+
+            async def no_local_result():
+                return None
+
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, colab_images,
+                                        no_local_result, delay_s=0.05)
+            assert result["source"] == "colab"
+            assert client.search_stats["abandoned"] == 0
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_hedge_colab_answered_but_slow_search_is_not_a_failure():
+    async def scenario():
+        async with StandInServer(mode="ok") as server:
+            client = make_client(server.url)
+
+            async def slow_colab_search(colab_data):
+                await asyncio.sleep(1.0)
+                return await colab_images(colab_data)
+
+            # 첫 호출의 클라이언트 생성 비용이 헤징 지연에 섞이지 않도록 연결을 미리 맺어 둠
+            await client.post_json("/fashion-query", {})
+            result = await client.hedge("/fashion-query", {"query": "셔츠"}, slow_colab_search,
+                                        local_search(), delay_s=0.1)
+            assert result["source"] == "local"
+            # Colab HTTP 호출은 응답했으므로 서킷 실패가 아님
+            assert client.search_stats["abandoned"] == 0
+            assert client.breaker.metrics()["consecutive_failures"] == 0
+            await client.aclose()
+
+    run(scenario())